@@ -1,8 +1,21 @@
 # path: ai/prompt_builder.py
 from __future__ import annotations
-from typing import Any, Dict, Iterable, List, Optional
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
+import os
 import json
+import logging
+
+from src.section_cache import SectionCache, listing_version
+from src.tokens import count_tokens, truncate_tokens
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2500"))  # User prompt, all sections
+MIN_SECTION_TOKENS = 40  # Below this a section is dropped rather than compressed
+
+_prompts: Counter = Counter()
+_section_totals: Dict[str, Counter] = defaultdict(Counter)  # section -> tokens sent/cut, actions
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Friendly, guest-first system prompt
@@ -28,6 +41,15 @@ OUTPUT:
 - Do not invent unprovided facts. Prefer “I can confirm that for you” over placeholders.
 """
 
+# Closing rules used to trail every user prompt; they are identical on every
+# call, so they live in the system prompt (part of the cacheable prefix).
+REPLY_RULES = (
+    "Write a brief, factual, and warm reply to the most recent guest message using ALL provided context. "
+    "Preserve concrete facts (beds, bedrooms, amenities, codes, times) from the context. "
+    "Never output placeholders (e.g., [insert …])—if a specific fact is not present, say you'll confirm it. "
+    "No emojis, no sign-offs. If a next step exists, state it clearly in one short sentence or a short list."
+)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Builders for each context section
 # ──────────────────────────────────────────────────────────────────────────────
@@ -50,8 +72,8 @@ def build_examples_section(similar_examples: Iterable[Iterable[str]] | None) ->
     lines = ["Previous similar guest Q&A:"]
     for ex in list(similar_examples)[:3]:
         # Your schema: (guest_message, ai_suggestion, user_reply)
-        q = str(ex[0])[:220].replace("\n", " ").strip()
-        a = str(ex[2])[:220].replace("\n", " ").strip()
+        q = truncate_tokens(str(ex[0]).replace("\n", " ").strip(), 55)
+        a = truncate_tokens(str(ex[2]).replace("\n", " ").strip(), 55)
         lines.append(f"Q: {q}")
         lines.append(f"A: {a}")
     return "\n" + "\n".join(lines)
@@ -73,6 +95,25 @@ def build_reservation_section(reservation: Optional[Dict[str, Any]]) -> str:
     parts = _kv_if(reservation, *fields)
     return ("\nReservation: " + ", ".join(parts)) if parts else ""
 
+LISTING_HIGHLIGHT_FIELDS = (
+    "bedroomsNumber", "bedsNumber", "bathroomsNumber",
+    "personCapacity", "roomType", "bathroomType",
+    "checkInTimeStart", "checkInTimeEnd", "checkOutTime",
+    "wifiUsername", "wifiPassword",
+)
+
+def _listing_result(listing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The listing object, from either a raw API response ({"result": ...}) or the object itself."""
+    return (listing or {}).get("result") or listing or {}
+
+def _listing_fields(listing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Only what build_listing_section reads (the full payload carries images etc.)."""
+    result = _listing_result(listing)
+    amen = result.get("listingAmenities") or result.get("amenities")
+    fields = {k: result.get(k) for k in ("name", "externalListingName", "address") + LISTING_HIGHLIGHT_FIELDS}
+    fields["amenities_count"] = len(amen) if isinstance(amen, list) else 0
+    return fields
+
 def build_listing_section(listing: Optional[Dict[str, Any]]) -> str:
     """
     Show listing highlights from Hostaway (fallback if amenities_index/property_details
@@ -80,16 +121,10 @@ def build_listing_section(listing: Optional[Dict[str, Any]]) -> str:
     """
     if not listing:
         return ""
-    result = listing.get("result", listing)  # tolerate either shape
+    result = _listing_result(listing)  # tolerate either shape
     name = result.get("name") or result.get("externalListingName") or "Listing"
     # Prefer Hostaway canonical numeric fields when present
-    hl_parts = _kv_if(
-        result,
-        "bedroomsNumber", "bedsNumber", "bathroomsNumber",
-        "personCapacity", "roomType", "bathroomType",
-        "checkInTimeStart", "checkInTimeEnd", "checkOutTime",
-        "wifiUsername", "wifiPassword",
-    )
+    hl_parts = _kv_if(result, *LISTING_HIGHLIGHT_FIELDS)
     addr = result.get("address")
     addr_line = ""
     if isinstance(addr, dict):
@@ -127,7 +162,7 @@ def build_amenities_index_section(amenities_index: Optional[Dict[str, Any]]) ->
     if not amenities_index:
         return ""
     # Keep it compact but structured
-    compact = json.dumps(amenities_index, ensure_ascii=False)
+    compact = json.dumps(amenities_index, ensure_ascii=False, sort_keys=True)  # byte-stable for prompt caching
     return "\nAmenities index (normalized JSON): " + compact
 
 def build_calendar_section(calendar_summary: Optional[str]) -> str:
@@ -144,6 +179,161 @@ def build_voice_section(core_identity: Optional[Dict[str, Any]]) -> str:
         return ""
     return f"\nProperty voice: {voice}"
 
+# ──────────────────────────────────────────────────────────────────────────────
+# Token-budgeted assembly
+# ──────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class Section:
+    name: str
+    text: str
+    priority: int               # 0 = never cut; the highest number is cut first when over budget
+    cap: Optional[int] = None   # Token cap for this section on its own
+    keep: str = "head"          # What survives compression: "head" lines, or "tail" (newest) lines
+    tokens: Optional[int] = None           # Precomputed count of text (compiled sections)
+    original_tokens: Optional[int] = None  # Count before a precompiled cap was applied
+    static: bool = False        # Per-listing prefix: cut only after every volatile section
+
+def _shrink(text: str, max_tokens: int, keep: str = "head") -> str:
+    """Whole lines of text within max_tokens; the first line stays as the header for "tail"."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.split("\n")
+    lead = 0
+    while lead < len(lines) and not lines[lead].strip():
+        lead += 1  # sections start with a blank line separator
+    if keep == "tail" and lead < len(lines):
+        head, rest = lines[: lead + 1], lines[lead + 1:]
+        used = count_tokens("\n".join(head))
+        kept: List[str] = []
+        for line in reversed(rest):
+            cost = count_tokens(line) + 1
+            if used + cost > max_tokens:
+                break
+            kept.insert(0, line)
+            used += cost
+        if kept:
+            return "\n".join(head + kept)
+    else:
+        kept, used = [], 0
+        for line in lines:
+            cost = count_tokens(line) + 1
+            if used + cost > max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        if len(kept) > lead + 1:
+            return "\n".join(kept)
+    return truncate_tokens(text, max_tokens)
+
+def assemble_sections(sections: List[Section], budget: int = PROMPT_TOKEN_BUDGET) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Join sections (in the given order) within budget tokens.
+
+    Each section is first held to its own cap; if the total is still over
+    budget, sections are compressed - or dropped when little would be left -
+    from the highest priority number down, volatile sections before static
+    ones so the cached prefix keeps its length. Priority 0 sections are never cut.
+
+    Returns:
+        (text, report) - report has one row per section: name, priority,
+        original and final tokens, and the action taken (kept/compressed/dropped)
+    """
+    texts = {s.name: s.text for s in sections}
+    tokens = {s.name: s.tokens if s.tokens is not None else count_tokens(s.text) for s in sections}
+    report = {}
+    for s in sections:
+        original = s.original_tokens if s.original_tokens is not None else tokens[s.name]
+        action = "empty" if not s.text else "compressed" if original > tokens[s.name] else "kept"
+        report[s.name] = {"section": s.name, "priority": s.priority, "original_tokens": original,
+                          "tokens": tokens[s.name], "action": action}
+
+    def _set(s: Section, text: str, action: str) -> None:
+        texts[s.name], tokens[s.name] = text, count_tokens(text)
+        report[s.name].update(tokens=tokens[s.name], action=action)
+
+    for s in sections:
+        if s.priority and s.cap is not None and tokens[s.name] > s.cap:
+            _set(s, _shrink(s.text, s.cap, s.keep), "compressed")
+
+    overflow = sum(tokens.values()) - budget
+    for s in sorted((s for s in sections if s.priority and tokens[s.name]), key=lambda s: (s.static, -s.priority)):
+        if overflow <= 0:
+            break
+        before = tokens[s.name]
+        target = before - overflow
+        if target >= MIN_SECTION_TOKENS:
+            _set(s, _shrink(texts[s.name], target, s.keep), "compressed")
+        else:
+            _set(s, "", "dropped")
+        overflow -= before - tokens[s.name]
+
+    rows = [report[s.name] for s in sections]
+    total = sum(tokens.values())
+    _prompts["prompts"] += 1
+    _prompts["tokens"] += total
+    for r in rows:
+        if r["action"] != "empty":
+            _section_totals[r["section"]].update(
+                {"tokens": r["tokens"], "cut_tokens": r["original_tokens"] - r["tokens"], r["action"]: 1}
+            )
+    logging.info(
+        f"[prompt] {total}/{budget} tokens: "
+        + ", ".join(f"{r['section']} {r['tokens']}" + (f" ({r['action']})" if r["action"] in ("compressed", "dropped") else "")
+                    for r in rows if r["action"] != "empty")
+    )
+    return "".join(texts[s.name] for s in sections), rows
+
+def prompt_section_stats() -> Dict[str, Any]:
+    """Where assembled prompt tokens go: totals and the average per prompt, per section."""
+    prompts = _prompts["prompts"]
+    return {
+        "prompts": prompts,
+        "tokens": _prompts["tokens"],
+        "sections": {
+            name: {**totals, "avg_tokens": round(totals["tokens"] / prompts, 1) if prompts else 0.0}
+            for name, totals in sorted(_section_totals.items(), key=lambda kv: -kv[1]["tokens"])
+        },
+    }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Per-listing sections, compiled once per listing version
+# ──────────────────────────────────────────────────────────────────────────────
+
+listing_section_cache = SectionCache("prompt_listing_sections")
+
+def _compiled(name: str, text: str, priority: int, cap: int) -> Section:
+    original = count_tokens(text)
+    if original > cap:
+        text = _shrink(text, cap)
+    return Section(name, text, priority, cap, tokens=count_tokens(text), original_tokens=original, static=True)
+
+def compile_listing_sections(
+    listing_id: Any,
+    listing: Optional[Dict[str, Any]],
+    property_details: Optional[Dict[str, Any]],
+    amenities_index: Optional[Dict[str, Any]],
+    core_identity: Optional[Dict[str, Any]],
+) -> List[Section]:
+    """
+    The static per-listing sections (formatted, capped and token-counted),
+    reused until the listing payload, meta or config/listings/<id>.json change.
+    """
+    def build() -> List[Section]:
+        return [
+            _compiled("property_details", build_property_details_section(property_details), 2, 250),
+            _compiled("amenities", build_amenities_index_section(amenities_index), 4, 600),
+            _compiled("listing", build_listing_section(listing or {}), 2, 300),
+            _compiled("voice", build_voice_section(core_identity), 5, 60),
+        ]
+
+    if not listing_id:
+        return build()
+    # The listing's updatedOn, when Hostaway sent it, saves hashing its fields
+    updated_on = _listing_result(listing).get("updatedOn")
+    version = listing_version(listing_id, updated_on or _listing_fields(listing), property_details, amenities_index, core_identity)
+    return listing_section_cache.get(str(listing_id), version, build)
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Public builder
 # ──────────────────────────────────────────────────────────────────────────────
@@ -158,11 +348,18 @@ def build_full_prompt(
     similar_examples: Iterable[Iterable[str]] | None,
     meta_for_ai: Optional[Dict[str, Any]] = None,
     extra_instructions: Optional[str] = None,
-) -> Dict[str, str]:
+    token_budget: Optional[int] = None,
+) -> Dict[str, Any]:
     """
     Returns a dict with:
-      - system: ENHANCED_SYSTEM_PROMPT
-      - user:   composed user prompt including listing+amenities+reservation context
+      - system: ENHANCED_SYSTEM_PROMPT + REPLY_RULES
+      - user:   composed user prompt including listing+amenities+reservation context,
+                held to token_budget (default PROMPT_TOKEN_BUDGET) by assemble_sections
+      - token_report: per-section tokens and what was compressed or dropped
+
+    Sections run from most to least stable (listing facts, reservation and
+    calendar, then examples, thread, intent and the new message), so calls for
+    the same listing share a long prefix that provider prompt caching reuses.
 
     NOTE: This is designed to be fed to OpenAI *without* additional boilerplate.
     """
@@ -172,25 +369,23 @@ def build_full_prompt(
     amenities_index = meta.get("amenities_index") or {}
     core_identity = meta.get("core_identity") or {}
 
-    user = (
-        build_examples_section(similar_examples)
-        + build_thread_section(thread_msgs or [])
-        + build_reservation_section(reservation or {})
-        + build_property_details_section(property_details)
-        + build_amenities_index_section(amenities_index)
-        + build_listing_section(listing or {})
-        + build_calendar_section(calendar_summary)
-        + build_voice_section(core_identity)
-        + build_intent_section(intent)
-        + f"\n\nGuest’s latest message: \"{(guest_message or '').strip()}\"\n"
-        + "---\n"
-        + "Write a brief, factual, and warm reply to the most recent guest message using ALL provided context. "
-          "Preserve concrete facts (beds, bedrooms, amenities, codes, times) from the context. "
-          "Never output placeholders (e.g., [insert …])—if a specific fact is not present, say you'll confirm it. "
-          "No emojis, no sign-offs. If a next step exists, state it clearly in one short sentence or a short list."
-    )
-
+    # Layout: static per listing, static per reservation, then volatile per message
+    listing_id = meta.get("listing_id") or _listing_result(listing).get("id")
+    sections = compile_listing_sections(listing_id, listing, property_details, amenities_index, core_identity) + [
+        Section("reservation", build_reservation_section(reservation or {}), priority=1, cap=120),
+        Section("calendar", build_calendar_section(calendar_summary), priority=3, cap=150),
+        Section("examples", build_examples_section(similar_examples), priority=6, cap=350),
+        Section("thread", build_thread_section(thread_msgs or []), priority=3, cap=900, keep="tail"),
+        Section("intent", build_intent_section(intent), priority=0),
+        Section("guest_message", f"\n\nGuest’s latest message: \"{(guest_message or '').strip()}\"\n", priority=0),
+    ]
     if extra_instructions:
-        user += f"\n{extra_instructions.strip()}"
+        sections.append(Section("extra_instructions", f"---\n{extra_instructions.strip()}", priority=0))
+
+    user, token_report = assemble_sections(sections, token_budget or PROMPT_TOKEN_BUDGET)
 
-    return {"system": ENHANCED_SYSTEM_PROMPT.strip(), "user": user.strip()}
+    return {
+        "system": f"{ENHANCED_SYSTEM_PROMPT.strip()}\n\n{REPLY_RULES}",
+        "user": user.strip(),
+        "token_report": token_report,
+    }
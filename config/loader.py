@@ -31,3 +31,18 @@ def load_listing_config(listing_id: int | str | None) -> Dict[str, Any]:
         return default_cfg
     specific = _read_json(os.path.join(base, f"{listing_id}.json"))
     return _deep_merge(default_cfg, specific)
+
+def listing_config_version(listing_id: int | str | None) -> str:
+    """
+    Cheap change stamp (mtime + size, no read) of the files load_listing_config
+    would merge for listing_id, for invalidating anything derived from them.
+    """
+    names = ["default.json"] + ([f"{listing_id}.json"] if listing_id else [])
+    stamps = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(CONFIG_DIR, name))
+            stamps.append(f"{name}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            stamps.append(f"{name}:-")
+    return "|".join(stamps)
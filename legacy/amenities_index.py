@@ -1,7 +1,30 @@
 # path: amenities_index.py
+"""
+Normalized amenity/meta index over a Hostaway listing, with keyword search.
+
+search() runs against an inverted token index (term -> corpus rows, with the
+label-match weight precomputed). Query tokens match by substring, so each
+token is first expanded to the indexed terms containing it through an n-gram
+index over the terms (1-3 character grams; longer tokens intersect their
+trigrams and verify the candidates) rather than a scan of every term; the
+expansion is memoized per token, evicting the oldest entries past 4096.
+
+for_listing() builds the index once per listing version and keeps it in
+memory and on disk (AMENITIES_INDEX_DIR), so warm starts load it without
+re-ingesting. Callers that know the listing's updatedOn should pass it as
+the version; otherwise the payload is content-hashed on every call.
+"""
 from __future__ import annotations
 from typing import Any, Dict, List, Optional, Tuple
-import os, json, re
+import os, json, re, heapq, hashlib, logging
+from collections import defaultdict
+
+AMENITIES_INDEX_DIR = os.getenv("AMENITIES_INDEX_DIR", "amenities_index_cache")
+AMENITIES_INDEX_MEMORY = int(os.getenv("AMENITIES_INDEX_MEMORY", "200"))  # Listings kept in process
+_INDEX_FORMAT = 1  # Bump when ingestion or the index layout changes
+_TERM_RE = re.compile(r"[a-z0-9]+")
+_GRAM = 3  # Longest gram in the term index used for substring expansion
+_EXPANDED_MAX = 4096  # Memoized query tokens per index
 
 def _load_id_map(path_env: str) -> Dict[int, str]:
     p = os.getenv(path_env, "").strip()
@@ -29,6 +52,8 @@ def _load_id_map(path_env: str) -> Dict[int, str]:
 
 _AMENITY_ID_NAME = _load_id_map("AMENITY_ID_MAP_PATH")
 _BEDTYPE_ID_NAME = _load_id_map("BEDTYPE_ID_MAP_PATH")
+# The id maps change what ingestion produces, so they are part of every index version
+_MAPS_DIGEST = hashlib.sha1(json.dumps([sorted(_AMENITY_ID_NAME.items()), sorted(_BEDTYPE_ID_NAME.items())]).encode()).hexdigest()[:12]
 
 _SYN_MAP = {
     "wifi": {"wifi","wi fi","wi-fi","internet"},
@@ -88,6 +113,10 @@ class AmenitiesIndex:
         self.images: List[Dict[str, Any]] = []
         self.custom_fields: Dict[str, Any] = {}
         self._corpus: List[Tuple[str, str, str]] = []
+        self._postings: Dict[str, List[int]] = {}  # term -> [row * 2 + in_label]
+        self._expanded: Dict[str, Dict[int, float]] = {}  # query token -> {row: weight}
+        self._terms: List[str] = []
+        self._grams: Optional[Dict[str, List[int]]] = None  # 1.._GRAM-char gram -> term ids, built on first use
 
         self._ingest_meta_scalars()
         self._ingest_times_wifi_pets_parking_text()
@@ -96,6 +125,39 @@ class AmenitiesIndex:
         self._ingest_images()
         self._ingest_custom_fields()
         self._build_corpus()
+        self._build_postings()
+
+    @classmethod
+    def for_listing(
+        cls,
+        listing_result: Dict[str, Any],
+        cache_dir: Optional[str] = AMENITIES_INDEX_DIR,
+        version: Optional[str] = None,
+    ) -> "AmenitiesIndex":
+        """
+        Index for listing_result, built once per listing version: served from
+        memory, else from cache_dir, else ingested and saved.
+
+        version: anything that changes when the listing does (e.g. its
+        updatedOn); without it the whole payload is hashed on every call.
+        """
+        raw = listing_result or {}
+        version = listing_version(raw, version)
+        key = str(raw.get("id") or version)
+        hit = _memory.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+
+        path = os.path.join(cache_dir, f"{_slug(key)}.json") if cache_dir else None
+        idx = cls._load(raw, path, version) if path else None
+        if idx is None:
+            idx = cls(raw)
+            if path:
+                idx._save(path, version)
+        if len(_memory) >= AMENITIES_INDEX_MEMORY and key not in _memory:
+            _memory.pop(next(iter(_memory)))
+        _memory[key] = (version, idx)
+        return idx
 
     def _ingest_meta_scalars(self) -> None:
         for k, v in (self.raw or {}).items():
@@ -198,6 +260,101 @@ class AmenitiesIndex:
             if cap:
                 self._corpus.append(("image:caption", "image", cap))
 
+    def _build_postings(self) -> None:
+        # A query token matches a row when it is a substring of the row's text and
+        # scores 1.5 instead of 1.0 when it is in the label; tokens never contain
+        # separators, so "substring of the text" == "substring of one of its terms".
+        # Postings are flat ints (row * 2 + 1 if the term is in the label) so they
+        # load from disk as plain lists.
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for row, (_, label, val) in enumerate(self._corpus):
+            label_terms = set(_TERM_RE.findall(label.lower()))
+            for term in label_terms:
+                postings[term].append(2 * row + 1)
+            for term in set(_TERM_RE.findall(val.lower())) - label_terms:
+                postings[term].append(2 * row)
+        self._postings = dict(postings)
+        self._expanded = {}
+        self._grams = None
+
+    def _terms_containing(self, tok: str) -> List[str]:
+        """Indexed terms that contain tok, via the gram index instead of a scan."""
+        if self._grams is None:
+            self._terms = list(self._postings)
+            grams: Dict[str, set] = defaultdict(set)
+            for term_id, term in enumerate(self._terms):
+                for n in range(1, _GRAM + 1):
+                    for i in range(len(term) - n + 1):
+                        grams[term[i:i + n]].add(term_id)
+            self._grams = {g: sorted(ids) for g, ids in grams.items()}
+        if len(tok) <= _GRAM:  # tok is itself a gram: exact
+            return [self._terms[i] for i in self._grams.get(tok, ())]
+        candidates = None
+        for i in range(len(tok) - _GRAM + 1):
+            ids = self._grams.get(tok[i:i + _GRAM])
+            if not ids:
+                return []
+            candidates = set(ids) if candidates is None else candidates.intersection(ids)
+            if not candidates:
+                return []
+        return [self._terms[i] for i in sorted(candidates) if tok in self._terms[i]]
+
+    def _rows_for(self, tok: str) -> Dict[int, float]:
+        """{row: weight} for a query token, via every indexed term containing it (memoized)."""
+        hit = self._expanded.get(tok)
+        if hit is None:
+            hit = {}
+            for term in self._terms_containing(tok):
+                for code in self._postings[term]:
+                    row = code >> 1
+                    if code & 1:
+                        hit[row] = 1.5
+                    elif row not in hit:
+                        hit[row] = 1.0
+            if len(self._expanded) >= _EXPANDED_MAX:  # free-text queries: evict the oldest token
+                self._expanded.pop(next(iter(self._expanded)))
+            self._expanded[tok] = hit
+        return hit
+
+    def _save(self, path: str, version: str) -> None:
+        state = dict(self.to_api(), version=version, corpus=self._corpus, postings=self._postings)
+        tmp = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"), default=str)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.warning(f"[amenities_index] could not save {path}: {e}")
+
+    @classmethod
+    def _load(cls, raw: Dict[str, Any], path: str, version: str) -> Optional["AmenitiesIndex"]:
+        """Index saved at path for this version, or None (missing, stale or unreadable)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"[amenities_index] could not load {path}: {e}")
+            return None
+        if state.get("version") != version:
+            return None
+        idx = cls.__new__(cls)
+        idx.raw = raw
+        idx.amenities = state["amenities"]
+        idx.amenity_labels = state["amenity_labels"]
+        idx.meta = state["meta"]
+        idx.bed_types = state["bed_types"]
+        idx.images = state["images"]
+        idx.custom_fields = state["custom_fields"]
+        idx._corpus = [tuple(row) for row in state["corpus"]]
+        idx._postings = state["postings"]
+        idx._expanded = {}
+        idx._terms = []
+        idx._grams = None
+        return idx
+
     def supports(self, key_or_name: str) -> Optional[bool]:
         k = _canonical_from_name(key_or_name)
         if k in self.amenities:
@@ -231,17 +388,26 @@ class AmenitiesIndex:
         toks = [t for t in re.split(r"[^a-z0-9]+", q) if t]
         if not toks:
             return []
-        scored: List[Tuple[float, Tuple[str,str,str]]] = []
-        for key, label, val in self._corpus:
-            text = f"{label} {val}".lower()
-            score = 0.0
-            for t in toks:
-                if t and t in text:
-                    score += 1.0 + (0.5 if t in (label.lower()) else 0.0)
-            if score > 0:
-                scored.append((score, (key, label, val)))
-        scored.sort(key=lambda x: -x[0])
+        scores: Dict[int, float] = {}
+        for t in toks:
+            for row, weight in self._rows_for(t).items():
+                scores[row] = scores.get(row, 0.0) + weight
+        best = heapq.nsmallest(topk, scores.items(), key=lambda x: (-x[1], x[0]))  # ties keep corpus order
         out = []
-        for s, (k, l, v) in scored[:topk]:
+        for row, _ in best:
+            k, l, v = self._corpus[row]
             out.append({"key": k, "label": l, "value": v})
         return out
+
+# ---------- Per-listing cache ----------
+_memory: Dict[str, Tuple[str, AmenitiesIndex]] = {}  # listing id -> (version, index), oldest first
+
+def listing_version(listing_result: Dict[str, Any], version: Optional[str] = None) -> str:
+    """
+    Index version: the caller's listing version (e.g. updatedOn) if given, else
+    a content hash of the payload - plus the id maps and index format either way.
+    """
+    if version is not None:
+        return f"{_INDEX_FORMAT}:{_MAPS_DIGEST}:v:{version}"
+    blob = json.dumps(listing_result or {}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(f"{_INDEX_FORMAT}:{_MAPS_DIGEST}:{blob}".encode("utf-8")).hexdigest()
@@ -16,6 +16,10 @@ import requests
 from pydantic import BaseModel, Field, ValidationError, conlist
 from openai import OpenAI
 
+from utils import hostaway_request
+from intent_classifier import classify
+from fanout import Step, run_steps
+
 logging.basicConfig(level=logging.INFO)
 
 # ---------- Env / Clients ----------
@@ -25,8 +29,6 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1")
 client = OpenAI(api_key=OPENAI_API_KEY)
 
 HOSTAWAY_API_BASE = os.getenv("HOSTAWAY_API_BASE", "https://api.hostaway.com/v1")
-HOSTAWAY_CLIENT_ID = os.getenv("HOSTAWAY_CLIENT_ID")
-HOSTAWAY_CLIENT_SECRET = os.getenv("HOSTAWAY_CLIENT_SECRET")
 LEARNING_DB_PATH = os.getenv("LEARNING_DB_PATH", "learning.db")
 
 DEFAULT_CHECKIN = os.getenv("DEFAULT_CHECKIN_TIME", "4:00 PM")
@@ -88,6 +90,8 @@ class Intent(str, Enum):
     food_recs = "food_recs"
     other = "other"
 
+_INTENT_VALUES = {i.value for i in Intent}
+
 class Actions(BaseModel):
     check_calendar: bool = False
     create_hostaway_offer: bool = False
@@ -256,35 +260,11 @@ def _parse_extra_nights(text: str) -> Optional[int]:
     return None
 
 # ---------- Hostaway helpers ----------
-def _token() -> Optional[str]:
-    if not HOSTAWAY_CLIENT_ID or not HOSTAWAY_CLIENT_SECRET:
-        return None
-    try:
-        url = f"{HOSTAWAY_API_BASE}/accessTokens"
-        r = requests.post(
-            url,
-            data={
-                "grant_type": "client_credentials",
-                "client_id": HOSTAWAY_CLIENT_ID,
-                "client_secret": HOSTAWAY_CLIENT_SECRET,
-                "scope": "general",
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=15,
-        )
-        r.raise_for_status()
-        return r.json().get("access_token")
-    except Exception as e:
-        logging.error(f"Hostaway token error: {e}")
-        return None
-
 def _api_get(path: str, params: Dict[str, Any] | None = None) -> Optional[Dict[str, Any]]:
-    t = _token()
-    if not t:
-        return None
+    # Token caching, background refresh and 401 replay live in utils.hostaway_request
     try:
         url = f"{HOSTAWAY_API_BASE}{path}"
-        r = requests.get(url, headers={"Authorization": f"Bearer {t}"}, params=params, timeout=15)
+        r = hostaway_request("GET", url, params=params, timeout=15)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -461,6 +441,9 @@ def _is_cleaning_issue(msg: str) -> bool:
     return False
 
 def _detect_intent(msg: str) -> Intent:
+    local = classify(msg, allowed=_INTENT_VALUES)
+    if local:
+        return Intent(local)
     m = (msg or "").lower()
     if any(w in m for w in _ECI):
         return Intent.early_check_in
@@ -604,7 +587,6 @@ def _format_food_recs(recs: List[Dict[str, Any]]) -> str:
 def _context(guest_message: str, history: List[Dict[str, str]], meta: Dict[str, Any]) -> Dict[str, Any]:
     prof = _profile(meta)
     pol = _policies(meta)
-    learned = _similar_examples(guest_message, 3)
 
     latest_guest_msg = None
     for m in reversed(history or []):
@@ -629,38 +611,11 @@ def _context(guest_message: str, history: List[Dict[str, str]], meta: Dict[str,
     pet_fee = pol.get("pet_fee")
     pet_deposit_refundable = pol.get("pet_deposit_refundable")
 
-    # Calendar facts
-    calendar: Dict[str, Any] = {"looked_up": False}
     listing_id = meta.get("listing_id")
     ci = meta.get("check_in")
     co = meta.get("check_out")
-
-    if listing_id and ci and co:
-        cal_payload = _fetch_calendar(str(listing_id), ci, co)
-        calendar["looked_up"] = bool(cal_payload.get("ok"))
-        calendar["checkin_available"] = _is_available(cal_payload, ci) if calendar["looked_up"] else None
-        calendar["checkout_available"] = _is_available(cal_payload, co) if calendar["looked_up"] else None
-
-        day_before = _day_before(ci)
-        day_after = _day_after(co)
-        if day_before or day_after:
-            span_start = day_before or ci
-            span_end = day_after or co
-            span_payload = _fetch_calendar(str(listing_id), span_start, span_end)
-            calendar["looked_up_span"] = bool(span_payload.get("ok"))
-            if day_before:
-                calendar["day_before_available"] = _is_available(span_payload, day_before)
-            if day_after:
-                calendar["day_after_available"] = _is_available(span_payload, day_after)
-
-    # Payments / deposit
     reservation_id = meta.get("reservation_id")
     listing_map_id = meta.get("listing_map_id") or listing_id
-    charges_payload = _fetch_guest_charges(int(reservation_id) if reservation_id else None,
-                                           int(listing_map_id) if listing_map_id else None)
-    charges = charges_payload.get("result", [])
-    deposit_facts = _extract_deposit_facts(charges)
-    payments_summary = _summarize_charges(charges)
 
     status = (meta.get("reservation_status") or "").strip()
     intent_guess = _detect_intent(latest_guest_msg or guest_message)
@@ -670,11 +625,6 @@ def _context(guest_message: str, history: List[Dict[str, str]], meta: Dict[str,
     lat = loc.get("lat")
     lng = loc.get("lng")
 
-    # Build food recs if asked and we have location + keys
-    food_recs: List[Dict[str, Any]] = []
-    if intent_guess == Intent.food_recs and lat and lng and GOOGLE_PLACES_API_KEY:
-        food_recs = _build_food_recs(float(lat), float(lng))
-
     # --- Dates & extension context ---
     ci_iso = (str(ci)[:10] if isinstance(ci, str) else (str(ci)[:10] if ci else ""))
     co_iso = (str(co)[:10] if isinstance(co, str) else (str(co)[:10] if co else ""))
@@ -695,15 +645,64 @@ def _context(guest_message: str, history: List[Dict[str, str]], meta: Dict[str,
         except Exception:
             pass
 
-    # --- Extension pricing (best-effort nightly-rate lookup) ---
+    # --- Lookups: run concurrently, each with its own timeout; misses fall back to defaults ---
+    no_calendar = {"ok": False, "data": {}}
+    steps: Dict[str, Step] = {
+        "learned": Step(lambda _: _similar_examples(guest_message, 3), default=[]),
+        "charges": Step(lambda _: _fetch_guest_charges(int(reservation_id) if reservation_id else None,
+                                                       int(listing_map_id) if listing_map_id else None),
+                        default={"ok": False, "result": []}),
+    }
+    day_before = day_after = None
+    if listing_id and ci and co:
+        steps["calendar"] = Step(lambda _: _fetch_calendar(str(listing_id), ci, co), default=no_calendar)
+        day_before = _day_before(ci)
+        day_after = _day_after(co)
+        if day_before or day_after:
+            span_start = day_before or ci
+            span_end = day_after or co
+            steps["calendar_span"] = Step(lambda _: _fetch_calendar(str(listing_id), span_start, span_end),
+                                          default=no_calendar)
+    # Build food recs if asked and we have location + keys
+    if intent_guess == Intent.food_recs and lat and lng and GOOGLE_PLACES_API_KEY:
+        steps["food_recs"] = Step(lambda _: _build_food_recs(float(lat), float(lng)), default=[])
+    # Extension pricing (best-effort nightly-rate lookup)
+    if extra_nights and co_iso and new_co_iso and listing_id:
+        steps["extension_quote"] = Step(lambda _: _estimate_extension_from_calendar(str(listing_id), co_iso, new_co_iso),
+                                        default={})
+    facts = run_steps("context", steps)
+
+    learned = facts["learned"]
+
+    # Calendar facts
+    calendar: Dict[str, Any] = {"looked_up": False}
+    if "calendar" in facts:
+        cal_payload = facts["calendar"]
+        calendar["looked_up"] = bool(cal_payload.get("ok"))
+        calendar["checkin_available"] = _is_available(cal_payload, ci) if calendar["looked_up"] else None
+        calendar["checkout_available"] = _is_available(cal_payload, co) if calendar["looked_up"] else None
+    if "calendar_span" in facts:
+        span_payload = facts["calendar_span"]
+        calendar["looked_up_span"] = bool(span_payload.get("ok"))
+        if day_before:
+            calendar["day_before_available"] = _is_available(span_payload, day_before)
+        if day_after:
+            calendar["day_after_available"] = _is_available(span_payload, day_after)
+
+    # Payments / deposit
+    charges_payload = facts["charges"]
+    charges = charges_payload.get("result", [])
+    deposit_facts = _extract_deposit_facts(charges)
+    payments_summary = _summarize_charges(charges)
+
+    food_recs: List[Dict[str, Any]] = facts.get("food_recs") or []
+
     currency_guess = (deposit_facts.get("currency") if isinstance(deposit_facts, dict) else None) or "USD"
     ext_quote: Dict[str, Any] = {"subtotal": None, "nightly_breakdown": [], "currency": currency_guess}
-
-    if extra_nights and co_iso and new_co_iso and listing_id:
-        cal_quote = _estimate_extension_from_calendar(str(listing_id), co_iso, new_co_iso)
-        if cal_quote.get("ok") and cal_quote.get("subtotal") is not None:
-            ext_quote["subtotal"] = float(cal_quote["subtotal"])
-            ext_quote["nightly_breakdown"] = cal_quote["breakdown"]
+    cal_quote = facts.get("extension_quote") or {}
+    if cal_quote.get("ok") and cal_quote.get("subtotal") is not None:
+        ext_quote["subtotal"] = float(cal_quote["subtotal"])
+        ext_quote["nightly_breakdown"] = cal_quote["breakdown"]
 
     return {
         "profile": prof,
@@ -0,0 +1,106 @@
+# path: fanout.py
+"""
+Concurrent fact gathering for reply generation.
+
+Steps form a small dependency graph: each Step runs on a thread as soon as
+the steps it comes `after` have finished, and receives their results. A step
+that raises or runs past its timeout (counted from when it starts running)
+yields its `default`, so the writer still gets whatever facts did arrive. One
+log line per run gives the per-step timing breakdown.
+
+Each run gets its own pool with a thread per step: a step never queues behind
+another, and a hung upstream call left running after its timeout only holds
+its own thread, never one a later run needs.
+
+    results = run_steps("smart_intel", {
+        "reservation": Step(lambda r: fetch_hostaway_reservation(rid)),
+        "upsells": Step(lambda r: early_late_available(...r["reservation"]...), after=("reservation",)),
+        "price": Step(lambda r: price_details_v2(...), timeout=8),
+    })
+"""
+from __future__ import annotations
+
+import os
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple
+
+FANOUT_STEP_TIMEOUT = float(os.getenv("FANOUT_STEP_TIMEOUT", "10"))  # seconds per step
+_START_POLL = 0.05  # seconds between checks while submitted steps have not started yet
+
+
+@dataclass
+class Step:
+    fn: Callable[[Dict[str, Any]], Any]  # gets the results so far (its dependencies included)
+    after: Tuple[str, ...] = ()
+    timeout: float = FANOUT_STEP_TIMEOUT
+    default: Any = None
+
+
+def _started(fn: Callable[[Dict[str, Any]], Any], name: str, started: Dict[str, float]) -> Callable[[Dict[str, Any]], Any]:
+    """fn, recording when it actually starts running (its timeout counts from there)."""
+    def run(results: Dict[str, Any]) -> Any:
+        started[name] = time.perf_counter()
+        return fn(results)
+    return run
+
+
+def run_steps(label: str, steps: Dict[str, Step]) -> Dict[str, Any]:
+    """Run steps concurrently in dependency order; returns {name: result or default}."""
+    t_run = time.perf_counter()
+    results: Dict[str, Any] = {}
+    timings: Dict[str, str] = {}
+    pending = dict(steps)
+    running: Dict[Future, str] = {}
+    started: Dict[str, float] = {}  # written by the worker threads
+    # Not shut down with wait=True: a timed-out step finishes in the background and its result is dropped
+    executor = ThreadPoolExecutor(max_workers=max(1, len(steps)), thread_name_prefix=f"fanout-{label}")
+
+    try:
+        while pending or running:
+            for name, step in list(pending.items()):
+                if all(dep in results for dep in step.after):
+                    running[executor.submit(_started(step.fn, name, started), dict(results))] = name
+                    del pending[name]
+            if not running:
+                for name, step in pending.items():  # depends on a step that doesn't exist
+                    results[name] = step.default
+                    timings[name] = "skipped"
+                break
+
+            now = time.perf_counter()
+            deadlines = [started[name] + steps[name].timeout for name in running.values() if name in started]
+            if len(deadlines) < len(running):
+                deadlines.append(now + _START_POLL)
+            done, _ = wait(list(running), timeout=max(0.0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+
+            now = time.perf_counter()
+            for fut in list(running):
+                name = running[fut]
+                step = steps[name]
+                t0 = started.get(name)
+                if fut in done:
+                    try:
+                        value = fut.result()
+                        results[name] = step.default if value is None else value
+                        timings[name] = f"{1000 * (now - t0):.0f}ms"
+                    except Exception as e:
+                        logging.warning(f"[{label}] {name} failed: {e}")
+                        results[name] = step.default
+                        timings[name] = "error"
+                elif t0 is not None and now - t0 >= step.timeout:
+                    logging.warning(f"[{label}] {name} timed out after {step.timeout:g}s")
+                    results[name] = step.default
+                    timings[name] = "timeout"
+                else:
+                    continue
+                del running[fut]
+    finally:
+        executor.shutdown(wait=False)
+
+    if timings:
+        breakdown = ", ".join(f"{name} {timings[name]}" for name in steps if name in timings)
+        logging.info(f"[{label}] facts in {1000 * (time.perf_counter() - t_run):.0f}ms: {breakdown}")
+    return results
@@ -0,0 +1,179 @@
+# path: intent_classifier.py
+"""
+Local intent classifier: multinomial naive Bayes over word unigrams + bigrams.
+
+Trained offline from logged ai_exchanges / learning_examples (rows that carry
+an intent label) and saved as JSON, so scoring is a few dict lookups per
+message (tens of microseconds) with no network call. Callers use the label
+only when confidence >= INTENT_CLASSIFIER_THRESHOLD and fall back to the LLM
+(or their old rules) otherwise.
+
+One model serves several label sets (detect_intent, route_message and
+assistant_core_smart each have their own), so classify() scores only the
+caller's labels and renormalises the posterior over them.
+
+    python intent_classifier.py train --db learning.db --out intent_model.json
+    python intent_classifier.py predict "can we check in early?"
+"""
+from __future__ import annotations
+
+import os
+import re
+import json
+import math
+import sqlite3
+import logging
+import argparse
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEARNING_DB_PATH = os.getenv("LEARNING_DB_PATH", "learning.db")
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "intent_model.json")
+INTENT_CLASSIFIER_THRESHOLD = float(os.getenv("INTENT_CLASSIFIER_THRESHOLD", "0.7"))
+ALPHA = 1.0  # Laplace smoothing
+MIN_EXAMPLES_PER_LABEL = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# ---------- Features ----------
+def features(text: str) -> List[str]:
+    words = _TOKEN_RE.findall((text or "").lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+# ---------- Model ----------
+class IntentClassifier:
+    def __init__(self, model: Dict[str, Any]):
+        self.labels: List[str] = model["labels"]
+        self.log_prior: Dict[str, float] = model["log_prior"]
+        self.log_prob: Dict[str, Dict[str, float]] = model["log_prob"]
+        self.log_unseen: Dict[str, float] = model["log_unseen"]
+        self.vocab = set().union(*(p.keys() for p in self.log_prob.values())) if self.log_prob else set()
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]]) -> "IntentClassifier":
+        counts: Dict[str, Counter] = defaultdict(Counter)
+        docs: Counter = Counter()
+        for text, label in examples:
+            if text and label:
+                counts[label].update(features(text))
+                docs[label] += 1
+        labels = sorted(l for l in docs if docs[l] >= MIN_EXAMPLES_PER_LABEL)
+        if not labels:
+            raise ValueError("no intent has enough labelled examples to train on")
+        vocab = set().union(*(counts[l].keys() for l in labels))
+        total_docs = sum(docs[l] for l in labels)
+        model: Dict[str, Any] = {"labels": labels, "log_prior": {}, "log_prob": {}, "log_unseen": {}}
+        for l in labels:
+            denom = sum(counts[l].values()) + ALPHA * (len(vocab) + 1)
+            model["log_prior"][l] = math.log(docs[l] / total_docs)
+            model["log_prob"][l] = {f: math.log((c + ALPHA) / denom) for f, c in counts[l].items()}
+            model["log_unseen"][l] = math.log(ALPHA / denom)
+        return cls(model)
+
+    def predict(self, text: str, labels: Optional[Iterable[str]] = None) -> Tuple[str, float]:
+        """
+        Returns (label, confidence) where confidence is the posterior of the
+        label among `labels` (default: every trained label).
+        """
+        feats = [f for f in features(text) if f in self.vocab]  # unknown words carry no signal
+        scores = {}
+        for l in (self.labels if labels is None else labels):
+            probs, unseen = self.log_prob[l], self.log_unseen[l]
+            scores[l] = self.log_prior[l] + sum(probs.get(f, unseen) for f in feats)
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        z = sum(math.exp(s - top) for s in scores.values())
+        return best, 1.0 / z
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"labels": self.labels, "log_prior": self.log_prior,
+                "log_prob": self.log_prob, "log_unseen": self.log_unseen}
+
+# ---------- Persistence ----------
+_cached: Dict[str, Any] = {"path": None, "mtime": None, "clf": None}
+
+def load_classifier(path: Optional[str] = None) -> Optional[IntentClassifier]:
+    """Model at path (default INTENT_MODEL_PATH), reloaded when the file changes; None if there is no model yet."""
+    path = path or INTENT_MODEL_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _cached["path"] != path or _cached["mtime"] != mtime:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                _cached.update(path=path, mtime=mtime, clf=IntentClassifier(json.load(f)))
+        except Exception as e:
+            logging.error(f"[intent] could not load {path}: {e}")
+            _cached.update(path=path, mtime=mtime, clf=None)
+    return _cached["clf"]
+
+def classify(text: str, allowed: Optional[Iterable[str]] = None,
+             threshold: float = INTENT_CLASSIFIER_THRESHOLD) -> Optional[str]:
+    """
+    Confident local label for text among `allowed`, or None (no model, fewer
+    than two of the allowed labels trained, or low confidence) - the caller
+    then uses its LLM/rule fallback.
+    """
+    clf = load_classifier()
+    if clf is None or not text:
+        return None
+    labels = clf.labels
+    if allowed is not None:
+        allowed = set(allowed)
+        labels = [l for l in clf.labels if l in allowed]
+    if len(labels) < 2:  # nothing to choose between: the posterior would always be 1.0
+        return None
+    label, confidence = clf.predict(text, labels)
+    return label if confidence >= threshold else None
+
+# ---------- Training data ----------
+def load_examples(db_path: str = LEARNING_DB_PATH) -> List[Tuple[str, str]]:
+    """(message, intent) pairs from ai_exchanges and learning_examples."""
+    conn = sqlite3.connect(db_path)
+    out: List[Tuple[str, str]] = []
+    try:
+        for table, text_cols in (("ai_exchanges", ("guest_message",)),
+                                 ("learning_examples", ("question", "guest_message"))):
+            cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            text_col = next((c for c in text_cols if c in cols), None)
+            if "intent" not in cols or not text_col:
+                continue
+            for text, intent in conn.execute(
+                f"SELECT {text_col}, intent FROM {table} WHERE intent IS NOT NULL AND intent != ''"
+            ):
+                if text:
+                    out.append((text, intent.strip().lower()))
+    finally:
+        conn.close()
+    return out
+
+# ---------- CLI ----------
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Train or query the local intent classifier.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("train", help="train from logged exchanges and save the model")
+    t.add_argument("--db", default=LEARNING_DB_PATH)
+    t.add_argument("--out", default=INTENT_MODEL_PATH)
+    p = sub.add_parser("predict", help="classify a message with the saved model")
+    p.add_argument("text")
+    args = parser.parse_args()
+
+    if args.cmd == "train":
+        examples = load_examples(args.db)
+        clf = IntentClassifier.train(examples)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(clf.to_json(), f)
+        per_label = Counter(label for _, label in examples)
+        print(f"Trained on {len(examples)} examples -> {args.out}")
+        for label in clf.labels:
+            print(f"  {label:<24}{per_label[label]:>6}")
+    else:
+        clf = load_classifier()
+        if clf is None:
+            raise SystemExit(f"No model at {INTENT_MODEL_PATH} - run `train` first")
+        label, confidence = clf.predict(args.text)
+        print(f"{label} ({confidence:.2f})")
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,261 @@
+# path: rule_planner.py
+"""
+Deterministic planner for smart_intel.generate_reply.
+
+Extracts the same plan JSON as PLANNER_SYSTEM (availability/price flags,
+dates, guest count, distance destinations, recommendations, info questions)
+with regexes, plus a confidence score. generate_reply only calls the LLM
+planner when the score is below RULE_PLANNER_MIN_CONFIDENCE, which saves one
+round trip for most messages ("what's the wifi", "can we check in early on
+the 12th").
+"""
+from __future__ import annotations
+
+import os
+import re
+import calendar
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+RULE_PLANNER_MIN_CONFIDENCE = float(os.getenv("RULE_PLANNER_MIN_CONFIDENCE", "0.75"))
+
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_name) if m}
+_MONTHS.update({m.lower(): i for i, m in enumerate(calendar.month_abbr) if m})
+_MONTHS["sept"] = 9
+_WEEKDAYS = {d.lower(): i for i, d in enumerate(calendar.day_name)}
+_NUMBER_WORDS = {w: i for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve".split())}
+
+_MONTH_RE = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_NUM = r"(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+
+_ISO_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_SLASH_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_COUNT_NOUN = r"(?:guests?|people|persons|adults?|kids|children|of us|nights?)\b"
+# "May 2 of us check in?" / "May 3 nights work?": the number is a count, not a day
+_MONTH_DAY_RE = re.compile(rf"\b({_MONTH_RE})\.?\s+{_DAY}\b(?!\s*{_COUNT_NOUN})(?:\s*(?:-|–|to|through|thru|until)\s*{_DAY}\b(?!\s*{_COUNT_NOUN}))?", re.I)
+_DAY_MONTH_RE = re.compile(rf"\b{_DAY}\s+(?:of\s+)?({_MONTH_RE})\b", re.I)
+# "may" followed by one of these is the verb ("we are 2 may we...", "the 5th may be late")
+_MAY_COUNT_RE = re.compile(rf"\s+{_NUM}\s+{_COUNT_NOUN}", re.I)
+_MODAL_MAY_RE = re.compile(r"\s+(?:i|we|you|they|he|she|it|be|have|not|also|need|want|get|bring|come|arrive|check|leave|stay)\b", re.I)
+_ORDINAL_RE = re.compile(r"\b(?:the\s+)(\d{1,2})(?:st|nd|rd|th)\b", re.I)
+_NIGHTS_RE = re.compile(rf"\b{_NUM}\s+(?:more\s+|extra\s+|additional\s+)?nights?\b", re.I)
+_IN_DAYS_RE = re.compile(rf"\bin\s+{_NUM}\s+days?\b", re.I)
+_WEEKDAY_RE = re.compile(r"\b(this|next|on)?\s*(" + "|".join(_WEEKDAYS) + r")\b", re.I)
+_GUESTS_RE = re.compile(rf"\b{_NUM}\s+(?:guests?|people|persons|adults?|kids|children|of us)\b", re.I)
+_PARTY_RE = re.compile(rf"\b(?:party of|group of|we are|we're|there are|there will be)\s+{_NUM}\b", re.I)
+_DISTANCE_RE = re.compile(
+    r"\b(?:how far(?: away)?(?: is| are)?|distance (?:to|from)|drive time to|how long (?:does it take |is the drive |would it take )?to (?:get|drive|walk) to)\s+(?:the\s+)?(?P<dest>[^?.!,]+)",
+    re.I,
+)
+_VAGUE_DESTINATIONS = {"it", "that", "this", "there", "here", "everything", "things"}
+_DEST_TAIL_RE = re.compile(r"\s+(?:from|to)\s+(?:the |your )?(?:house|property|place|home|condo|here|rental|unit|cabin)\b.*$", re.I)
+_DATEISH_RE = re.compile(rf"\b(?:{_MONTH_RE}|" + "|".join(_WEEKDAYS) + r"|weekend|week|month|\d{1,2}(?:st|nd|rd|th))\b", re.I)
+
+def _words(*phrases: str) -> "re.Pattern[str]":
+    """Whole-word match of any phrase (optional plural), so "rate" doesn't fire on "grateful"."""
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")s?\b", re.I)
+
+_EXTEND = _words("extend", "extension", "extra night", "stay longer", "another night", "more night")
+_AVAILABILITY = _words("available", "availability", "book", "booking", "reserve", "open for", "vacancy",
+                       "extend", "extra night", "stay longer", "another night", "more night")
+_OPEN = _words("open", "free")  # "is Dec 20-23 open?": availability only when dates are mentioned
+_PRICE = _words("price", "pricing", "cost", "rate", "how much", "quote", "total for", "charge for")
+_RECS = _words("recommend", "recommendation", "suggest", "suggestion", "things to do", "what to do", "places to eat",
+               "restaurant", "bar", "coffee", "breakfast", "dinner", "lunch", "nearby", "activities", "activity",
+               "attraction")
+_INFO = {
+    "bedrooms": _words("bedroom"),
+    "bathrooms": _words("bathroom", "bath"),
+    "beds": _words("how many beds", "beds are", "bed sizes", "king bed", "queen bed"),
+    "check_in": _words("check in", "check-in", "checkin", "early arrival", "arrive early"),
+    "check_out": _words("check out", "check-out", "checkout", "leave late"),
+    "guest_count": _words("how many guests", "how many people", "max occupancy", "maximum occupancy", "sleeps how many"),
+    "address": _words("address", "where is the house", "where is the property", "where is the place", "location of the"),
+}
+_DISTANCE_WORDS = _words("how far", "distance", "drive time", "walking distance")
+
+
+def _num(s: str) -> Optional[int]:
+    s = (s or "").lower()
+    return int(s) if s.isdigit() else _NUMBER_WORDS.get(s)
+
+def _safe_date(y: int, m: int, d: int) -> Optional[date]:
+    try:
+        return date(y, m, d)
+    except ValueError:
+        return None
+
+def _upcoming(month: int, day: int, today: date) -> Optional[date]:
+    """Next occurrence of month/day on or after today (guests talk about upcoming dates)."""
+    d = _safe_date(today.year, month, day)
+    if d and d < today - timedelta(days=1):
+        d = _safe_date(today.year + 1, month, day)
+    return d
+
+def _upcoming_day_of_month(day: int, today: date) -> Optional[date]:
+    d = _safe_date(today.year, today.month, day)
+    if d and d >= today:
+        return d
+    nxt = today.replace(day=1) + timedelta(days=32)
+    return _safe_date(nxt.year, nxt.month, day)
+
+
+def _modal_may(text: str, m: "re.Match[str]") -> bool:
+    """True if a matched "may" is the verb ("may we...", "May 2 of us...") rather than the month."""
+    return m[0].lower() == "may" and bool(_MODAL_MAY_RE.match(text, m.end()) or _MAY_COUNT_RE.match(text, m.end()))
+
+def _extract_dates(text: str, today: date) -> Tuple[List[date], Optional[int], bool]:
+    """Returns (dates found in order, nights mentioned, whether anything date-like went unparsed)."""
+    found: List[Tuple[int, date]] = []
+    spans: List[Tuple[int, int]] = []
+
+    def add(pos: int, d: Optional[date], span: Tuple[int, int]) -> None:
+        if d:
+            found.append((pos, d)); spans.append(span)
+
+    for m in _ISO_RE.finditer(text):
+        add(m.start(), _safe_date(int(m[1]), int(m[2]), int(m[3])), m.span())
+    for m in _MONTH_DAY_RE.finditer(text):
+        month = _MONTHS[m[1].lower()]
+        add(m.start(), _upcoming(month, int(m[2]), today), m.span())
+        if m[3]:
+            add(m.start() + 1, _upcoming(month, int(m[3]), today), m.span())
+    for m in _DAY_MONTH_RE.finditer(text):
+        if m[2].lower() == "may" and _MODAL_MAY_RE.match(text, m.end()):
+            continue
+        add(m.start(), _upcoming(_MONTHS[m[2].lower()], int(m[1]), today), m.span())
+    for m in _SLASH_RE.finditer(text):
+        year = int(m[3]) if m[3] else None
+        if year is not None and year < 100:
+            year += 2000
+        d = _safe_date(year, int(m[1]), int(m[2])) if year else _upcoming(int(m[1]), int(m[2]), today)
+        add(m.start(), d, m.span())
+    for m in _ORDINAL_RE.finditer(text):
+        if not any(a <= m.start() < b for a, b in spans):
+            add(m.start(), _upcoming_day_of_month(int(m[1]), today), m.span())
+
+    low = text.lower()
+    for word, offset in (("day after tomorrow", 2), ("tomorrow", 1), ("tonight", 0), ("today", 0)):
+        i = low.find(word)
+        if i >= 0:
+            add(i, today + timedelta(days=offset), (i, i + len(word)))
+            break
+    for m in _IN_DAYS_RE.finditer(text):
+        n = _num(m[1])
+        if n is not None:
+            add(m.start(), today + timedelta(days=n), m.span())
+    previous: Optional[date] = None
+    for m in _WEEKDAY_RE.finditer(text):
+        ahead = (_WEEKDAYS[m[2].lower()] - today.weekday()) % 7
+        if (m[1] or "").lower() == "next" and ahead == 0:
+            ahead = 7
+        d = today + timedelta(days=ahead)
+        while previous and d <= previous:  # "next Friday through Sunday"
+            d += timedelta(days=7)
+        add(m.start(), d, m.span())
+        previous = d
+    if "weekend" in low:
+        i = low.find("weekend")
+        friday = today + timedelta(days=(4 - today.weekday()) % 7)
+        if "next weekend" in low:
+            friday += timedelta(days=7)
+        add(i, friday, (i, i + 7)); add(i + 1, friday + timedelta(days=2), (i, i + 7))
+
+    nights = None
+    m = _NIGHTS_RE.search(text)
+    if m:
+        nights = _num(m[1]); spans.append(m.span())
+
+    # Date-like words we did not turn into a date mean the LLM may do better
+    unparsed = any(
+        not any(a <= w.start() < b for a, b in spans) and not _modal_may(text, w)
+        for w in _DATEISH_RE.finditer(text)
+    )
+    dates = [d for _, d in sorted(found, key=lambda x: x[0])]
+    return dates, nights, unparsed
+
+
+def rule_plan(guest_message: str, core: Dict[str, Any], today: Optional[date] = None) -> Tuple[Dict[str, Any], float]:
+    """
+    Plan for guest_message in the PLANNER_SYSTEM shape, and a 0..1 confidence.
+    core is smart_intel's fact dict (check_in/check_out are used for extensions).
+    """
+    text = guest_message or ""
+    today = today or datetime.now(timezone.utc).date()
+    confidence = 1.0
+
+    def _d(s: Any) -> Optional[date]:
+        try:
+            return date.fromisoformat(str(s)[:10]) if s else None
+        except ValueError:
+            return None
+
+    check_out = _d(core.get("check_out"))
+    dates, nights, unparsed = _extract_dates(text, today)
+    if unparsed:
+        confidence -= 0.4
+
+    wants_availability = bool(_AVAILABILITY.search(text) or (dates and _OPEN.search(text)))
+    wants_price = bool(_PRICE.search(text))
+    extending = bool(_EXTEND.search(text))
+
+    if len(dates) > 2:
+        confidence -= 0.4  # "the weekend of the 14th": several readings, let the LLM pick
+    start = dates[0] if dates else None
+    end = dates[1] if len(dates) > 1 else None
+    if extending and not dates and check_out:
+        start = check_out  # extension starts at the current check-out
+    if start and not end and nights:
+        end = start + timedelta(days=nights)
+    if start and end and end < start:
+        start, end = end, start
+    if (wants_availability or wants_price) and not (start and end):
+        confidence -= 0.3  # the LLM may resolve dates we can't
+
+    guests = None
+    counts = [_num(m[1]) for m in _GUESTS_RE.finditer(text)]
+    counts = [c for c in counts if c]
+    if counts:
+        guests = sum(counts)  # "2 adults and 2 kids"
+    else:
+        m = _PARTY_RE.search(text)
+        guests = _num(m[1]) if m else None
+
+    destinations = []
+    wants_distance = False
+    for m in _DISTANCE_RE.finditer(text):
+        wants_distance = True
+        dest = _DEST_TAIL_RE.sub("", m["dest"]).strip()
+        if dest and dest.lower() not in _VAGUE_DESTINATIONS:
+            destinations.append({"text": dest})
+    if not wants_distance and _DISTANCE_WORDS.search(text):
+        wants_distance = True
+    if wants_distance and not destinations:
+        confidence -= 0.5  # asked about distance but we couldn't find the destination
+
+    info = [key for key, words in _INFO.items() if words.search(text)]
+    wants_recs = bool(_RECS.search(text))
+    if dates and not (wants_availability or wants_price or info or wants_recs or wants_distance):
+        confidence -= 0.4  # dates but no recognised question: "is the 20th ok?", let the LLM read it
+
+    matched = wants_availability or wants_price or wants_distance or wants_recs or info or dates or guests
+    words = len(text.split())
+    if not matched and words > 12:
+        confidence -= 0.4  # long message and nothing recognised: probably something we don't model
+    elif words > 60:
+        confidence -= 0.2
+
+    plan = {
+        "wants_availability": bool(wants_availability),
+        "wants_price_quote": bool(wants_price),
+        "dates": {"start": start.isoformat() if start else None, "end": end.isoformat() if end else None},
+        "guests": guests,
+        "wants_distance": wants_distance,
+        "destinations": destinations,
+        "wants_recommendations": wants_recs,
+        "info_questions": info,
+        "clarifications": [],
+    }
+    return plan, max(0.0, round(confidence, 2))
@@ -3,8 +3,9 @@
 import os
 import json
 import logging
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, Tuple, List, Union
+from typing import Callable, Dict, Any, Optional, Tuple, List, Union
 
 try:
     from openai import OpenAI
@@ -16,12 +17,20 @@ except Exception:
 
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# Deterministic planner; the LLM planner is the fallback for low-confidence messages
+from rule_planner import rule_plan, RULE_PLANNER_MIN_CONFIDENCE
+
+planner_stats: Counter = Counter()  # "rules" / "llm": which planner produced each plan
+
 # Generic place + distance helpers (no hardcoded venues)
 from places import (
     text_search_place,                   # resolves any free-text destination
     get_drive_distance_duration,         # accepts address or (lat,lng) for origin/dest
 )
 
+# Concurrent fact gathering (dependency graph + per-step timeouts)
+from fanout import Step, run_steps
+
 # Hostaway + reply cleanup helpers
 from utils import (
     get_calendar,
@@ -223,32 +232,26 @@ Output only the final message text.
 def generate_reply(guest_message: str, ctx: Dict[str, Any]) -> str:
     """
     Two-pass flow:
-      1) Planner: extract intents, dates, guests, destinations.
+      1) Planner: extract intents, dates, guests, destinations (rule_planner;
+         the LLM planner only when its confidence is low).
       2) Hostaway: availability, price v2, upsells.
       3) Places: resolve destinations + distances using address/(lat,lng).
+         (2 and 3 run concurrently via fanout.run_steps; slow steps are dropped.)
       4) Writer: compose decisive reply (no clarifying questions).
     """
     core = _collect_core_facts(ctx)
 
     # ----- Pass 1: Planner -----
+    # Rules first; the LLM planner only runs when they aren't confident
+    plan, confidence = rule_plan(guest_message, core)
+    path = "rules"
     planner_input = {
         "guest_message": guest_message,
         "available_facts": {k: v for k, v in core.items() if v is not None}
     }
-    plan = {
-        "wants_availability": False,
-        "wants_price_quote": False,
-        "dates": {"start": None, "end": None},
-        "guests": None,
-        "wants_distance": False,
-        "destinations": [],
-        "wants_recommendations": False,
-        "info_questions": [],
-        "clarifications": [],
-    }
 
     try:
-        if _has_client and _client:
+        if confidence < RULE_PLANNER_MIN_CONFIDENCE and _has_client and _client:
             p = _client.chat.completions.create(
                 model=OPENAI_MODEL,
                 temperature=0.0,
@@ -259,8 +262,11 @@ def generate_reply(guest_message: str, ctx: Dict[str, Any]) -> str:
                 response_format={"type": "json_object"},
             )
             plan = json.loads(p.choices[0].message.content or "{}")
+            path = "llm"
     except Exception as e:
-        logging.warning(f"Planner call failed, falling back: {e}")
+        logging.warning(f"Planner call failed, using rule plan: {e}")
+    planner_stats[path] += 1
+    logging.info(f"[planner] {path} (rule confidence {confidence:.2f})")
 
     # Normalize dates/guests
     start = _coerce_date_str(((plan.get("dates") or {}).get("start"))) or None
@@ -274,97 +280,106 @@ def generate_reply(guest_message: str, ctx: Dict[str, Any]) -> str:
     listing_id = core.get("listing_id")
     reservation_id = core.get("reservation_id")
 
-    # ----- Hostaway: Availability & Price (if requested and data present) -----
     writer_facts: Dict[str, Any] = {k: v for k, v in core.items() if v is not None}
 
+    # ----- Fact steps: Hostaway availability, price v2, upsells -----
+
+    def _availability(_: Dict[str, Any]) -> Dict[str, Any]:
+        days = get_calendar(listing_id, start, end, 0)
+        is_open, window = calendar_window_is_available(days, start, end)
+        return {
+            "is_open": bool(is_open),
+            "min_stay": derive_min_stay(window),
+            "start": start,
+            "end": end
+        }
+
+    def _price_quote(_: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        priced = price_details_v2(listing_id, start, end, int(guests))
+        if not (priced and "totalPrice" in priced):
+            return None
+        comps = priced.get("components") or []
+        key = []
+        for c in comps:
+            title = (c.get("title") or c.get("name") or "").lower()
+            if any(k in title for k in ("base", "cleaning", "tax")) and len(key) < 2:
+                key.append({"title": c.get("title") or c.get("name"), "amount": c.get("total")})
+        return {
+            "total": priced["totalPrice"],
+            "components": key,
+            "start": start, "end": end, "guests": int(guests)
+        }
+
+    def _upsells(done: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        r = ((done.get("reservation") or {}).get("result") or {})
+        ups = early_late_available(listing_id, r.get("arrivalDate"), r.get("departureDate"))
+        if not ups:
+            return None
+        return {
+            "early_checkin_ok": bool(ups.get("early_checkin_ok")),
+            "late_checkout_ok": bool(ups.get("late_checkout_ok")),
+            "early_fee": os.getenv("EARLY_CHECKIN_FEE") or 0,
+            "late_fee": os.getenv("LATE_CHECKOUT_FEE") or 0,
+        }
+
+    # ----- Fact gathering: Hostaway + Places lookups run concurrently -----
+    steps: Dict[str, Step] = {}
     if plan.get("wants_availability") and listing_id and start and end:
-        try:
-            days = get_calendar(listing_id, start, end, 0)
-            is_open, window = calendar_window_is_available(days, start, end)
-            min_stay = derive_min_stay(window)
-            writer_facts["availability"] = {
-                "is_open": bool(is_open),
-                "min_stay": min_stay,
-                "start": start,
-                "end": end
-            }
-        except Exception as e:
-            logging.warning(f"[availability] {e}")
-
+        steps["availability"] = Step(_availability)
     if plan.get("wants_price_quote") and listing_id and start and end:
-        try:
-            priced = price_details_v2(listing_id, start, end, int(guests))
-            if priced and "totalPrice" in priced:
-                comps = priced.get("components") or []
-                key = []
-                for c in comps:
-                    title = (c.get("title") or c.get("name") or "").lower()
-                    if any(k in title for k in ("base", "cleaning", "tax")) and len(key) < 2:
-                        key.append({"title": c.get("title") or c.get("name"), "amount": c.get("total")})
-                writer_facts["price_quote"] = {
-                    "total": priced["totalPrice"],
-                    "components": key,
-                    "start": start, "end": end, "guests": int(guests)
-                }
-        except Exception as e:
-            logging.warning(f"[pricing] {e}")
-
-    # ----- Hostaway: Upsells (early/late) if reservation exists -----
+        steps["price_quote"] = Step(_price_quote)
+    # Upsells (early/late) if reservation exists
     if listing_id and reservation_id:
-        try:
-            rj = fetch_hostaway_reservation(int(reservation_id)) or {}
-            r = (rj.get("result") or {})
-            ups = early_late_available(listing_id, r.get("arrivalDate"), r.get("departureDate"))
-            if ups:
-                writer_facts["upsells"] = {
-                    "early_checkin_ok": bool(ups.get("early_checkin_ok")),
-                    "late_checkout_ok": bool(ups.get("late_checkout_ok")),
-                    "early_fee": os.getenv("EARLY_CHECKIN_FEE") or 0,
-                    "late_fee": os.getenv("LATE_CHECKOUT_FEE") or 0,
-                }
-        except Exception as e:
-            logging.debug(f"[upsells] {e}")
+        steps["reservation"] = Step(lambda _: fetch_hostaway_reservation(int(reservation_id)), default={})
+        steps["upsells"] = Step(_upsells, after=("reservation",))
 
-    # ----- Resolve distances (your original logic, kept) -----
-    distances: List[Dict[str, Any]] = []
+    # Distances: resolve each destination, then its drive time
     origin = _pick_origin(ctx)
-
+    dest_texts: List[str] = []
     if plan.get("wants_distance") and origin is not None:
-        dest_items = plan.get("destinations") or []
         bias_lat = core.get("latitude") if isinstance(core.get("latitude"), (int, float)) else None
         bias_lng = core.get("longitude") if isinstance(core.get("longitude"), (int, float)) else None
         city = core.get("city"); state = core.get("state")
+        dest_texts = [(d or {}).get("text") for d in (plan.get("destinations") or []) if (d or {}).get("text")]
 
-        for d in dest_items:
-            dest_text = (d or {}).get("text")
-            if not dest_text:
-                continue
-            place = text_search_place(
+        def _place(dest_text: str) -> Callable[[Dict[str, Any]], Any]:
+            return lambda _: text_search_place(
                 query=dest_text,
                 bias_lat=bias_lat,
                 bias_lng=bias_lng,
                 city=city,
                 state=state,
             )
-            if not place:
-                continue
 
-            try:
+        def _distance(i: int) -> Callable[[Dict[str, Any]], Any]:
+            def run(done: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+                place = done.get(f"place:{i}")
+                if not place:
+                    return None
                 if isinstance(origin, tuple):
                     dist = get_drive_distance_duration(origin, (place["lat"], place["lng"]))
                 else:
                     dist = get_drive_distance_duration(origin, place["formatted_address"] or place["name"])
-            except Exception as e:
-                logging.warning(f"Distance calc failed for {dest_text}: {e}")
-                dist = None
-
-            if dist:
-                distances.append({
+                if not dist:
+                    return None
+                return {
                     "to_name": place["name"],
                     "to_address": place["formatted_address"],
                     "distance_text": dist.get("distance_text"),
                     "duration_text": dist.get("duration_text"),
-                })
+                }
+            return run
+
+        for i, dest_text in enumerate(dest_texts):
+            steps[f"place:{i}"] = Step(_place(dest_text))
+            steps[f"distance:{i}"] = Step(_distance(i), after=(f"place:{i}",))
+
+    # Failed or slow steps come back as None: the writer gets the facts that did arrive
+    facts = run_steps("smart_intel", steps) if steps else {}
+    for key in ("availability", "price_quote", "upsells"):
+        if facts.get(key):
+            writer_facts[key] = facts[key]
+    distances = [facts[f"distance:{i}"] for i in range(len(dest_texts)) if facts.get(f"distance:{i}")]
 
     if distances:
         writer_facts["distances"] = distances
@@ -8,18 +8,21 @@ import logging
 import sqlite3
 from datetime import datetime, timedelta, date as _date
 from difflib import get_close_matches
-from typing import Any, Dict, List, Optional, Tuple, Literal, Union  # << added Union
+from typing import Any, Dict, List, Optional, Tuple, Literal, Union, get_args  # << added Union
 
+import httpx
 import requests
 from openai import OpenAI
 
 from places import should_fetch_local_recs, build_local_recs
+from intent_classifier import classify
 
-# --------------------------- Config / Env ---------------------------
+# Shared with the FastAPI app: run legacy with the repo root and legacy/ on the
+# path (PYTHONPATH=.:legacy), see readme
+from src.model_router import route as route_model, timed_create
+from src.hostaway_http import HOSTAWAY_API_BASE, hostaway_request_sync, token_manager
 
-HOSTAWAY_API_BASE = os.getenv("HOSTAWAY_API_BASE", "https://api.hostaway.com/v1")
-HOSTAWAY_CLIENT_ID = os.getenv("HOSTAWAY_CLIENT_ID")
-HOSTAWAY_CLIENT_SECRET = os.getenv("HOSTAWAY_CLIENT_SECRET")
+# --------------------------- Config / Env ---------------------------
 
 LEARNING_DB_PATH = os.getenv("LEARNING_DB_PATH", "learning.db")
 
@@ -31,7 +34,7 @@ if not OPENAI_API_KEY:
 GOOGLE_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY") or ""
 GOOGLE_DISTANCE_MATRIX_API_KEY = os.getenv("GOOGLE_DISTANCE_MATRIX_API_KEY") or ""
 
-if not HOSTAWAY_CLIENT_ID or not HOSTAWAY_CLIENT_SECRET:
+if not token_manager.configured:
     logging.warning("HOSTAWAY client env vars are missing; API calls will fail.")
 if not GOOGLE_API_KEY:
     logging.info("GOOGLE_PLACES_API_KEY not set; places features disabled.")
@@ -49,8 +52,11 @@ PrimaryIntent = Literal[
 def route_message(msg: str) -> Dict[str, Any]:
     """
     Returns { "summary": str, "primary_intent": PrimaryIntent, "secondary": [..] }.
-    JSON-only. No chain-of-thought.
+    JSON-only. No chain-of-thought. A confident local classifier label skips the LLM.
     """
+    local = classify(msg, allowed=get_args(PrimaryIntent))
+    if local:
+        return {"summary": (msg or "")[:280], "primary_intent": local, "secondary": []}
     if not openai_client:
         text = (msg or "").lower()
         if any(k in text for k in ["restaurant","eat","dinner","breakfast","coffee","food"]) \
@@ -73,8 +79,9 @@ def route_message(msg: str) -> Dict[str, Any]:
     )
     user = f"Guest message:\n{msg}\n\nReturn JSON only."
     try:
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+        resp = timed_create(
+            openai_client.chat.completions.create,
+            route_model("classification").model,
             response_format={"type": "json_object"},
             messages=[{"role":"system","content":sys},{"role":"user","content":user}],
             temperature=0
@@ -276,8 +283,9 @@ def make_suggested_reply(guest_message: str, context: Dict[str, Any]) -> Tuple[s
     reply_text = ""
     if openai_client:
         try:
-            resp = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
+            resp = timed_create(
+                openai_client.chat.completions.create,
+                route_model("reply", guest_message, intent=intent).model,
                 messages=[{"role": "system", "content": sys}, {"role": "user", "content": user}],
                 temperature=0.2,
             )
@@ -317,43 +325,25 @@ def make_suggested_reply(guest_message: str, context: Dict[str, Any]) -> Tuple[s
     reply_text = sanitize_ai_reply(reply_text, guest_message)
     return reply_text, intent
 
-# --------------------------- Hostaway auth/cache ---------------------------
+# --------------------------- Hostaway requests ---------------------------
 
-_HOSTAWAY_TOKEN_CACHE: Dict[str, Any] = {"access_token": None, "expires_at": 0.0}
-
-def get_hostaway_access_token() -> Optional[str]:
-    now = time.time()
-    if _HOSTAWAY_TOKEN_CACHE["access_token"] and now < _HOSTAWAY_TOKEN_CACHE["expires_at"]:
-        return _HOSTAWAY_TOKEN_CACHE["access_token"]
-    if not (HOSTAWAY_CLIENT_ID and HOSTAWAY_CLIENT_SECRET):
-        return None
-    url = f"{HOSTAWAY_API_BASE}/accessTokens"
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": HOSTAWAY_CLIENT_ID,
-        "client_secret": HOSTAWAY_CLIENT_SECRET,
-        "scope": "general",
-    }
-    try:
-        r = requests.post(url, data=data, headers={"Content-Type": "application/x-www-form-urlencoded"}, timeout=15)
-        r.raise_for_status()
-        resp = r.json()
-        _HOSTAWAY_TOKEN_CACHE["access_token"] = resp.get("access_token")
-        _HOSTAWAY_TOKEN_CACHE["expires_at"] = now + 3480  # ~58 minutes
-        return _HOSTAWAY_TOKEN_CACHE["access_token"]
-    except Exception as e:
-        logging.error(f"❌ Hostaway token error: {e}")
-        return None
+def hostaway_request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """
+    Authenticated Hostaway request over the shared src/ client and token
+    manager (token caching, proactive refresh, one replay after a 401, 429
+    backoff). url may be absolute (HOSTAWAY_API_BASE/...) or a path.
+    """
+    path = url[len(HOSTAWAY_API_BASE):] if url.startswith(HOSTAWAY_API_BASE) else url
+    resource = path.lstrip("/").split("/")[0].split("?")[0]
+    endpoint = resource[:-1] if resource.endswith("s") else resource or "hostaway"
+    return hostaway_request_sync(method, path, endpoint, **kwargs)
 
 # --------------------------- Hostaway API helpers ---------------------------
 
 def fetch_hostaway_resource(resource: str, resource_id: int) -> Optional[Dict[str, Any]]:
-    t = get_hostaway_access_token()
-    if not t:
-        return None
     url = f"{HOSTAWAY_API_BASE}/{resource}/{resource_id}"
     try:
-        r = requests.get(url, headers={"Authorization": f"Bearer {t}"}, timeout=15)
+        r = hostaway_request("GET", url, timeout=15)
         r.raise_for_status()
         return r.json()
     except Exception as e:
@@ -363,12 +353,9 @@ def fetch_hostaway_resource(resource: str, resource_id: int) -> Optional[Dict[st
 def fetch_hostaway_listing(listing_id: Optional[int], fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
     if not listing_id:
         return None
-    t = get_hostaway_access_token()
-    if not t:
-        return None
     url = f"{HOSTAWAY_API_BASE}/listings/{listing_id}?includeResources=1&attachObjects[]=bookingEngineUrls"
     try:
-        r = requests.get(url, headers={"Authorization": f"Bearer {t}"}, timeout=15)
+        r = hostaway_request("GET", url, timeout=15)
         r.raise_for_status()
         result = r.json()
         if fields:
@@ -385,12 +372,11 @@ def fetch_hostaway_reservation(reservation_id: Optional[int]) -> Optional[Dict[s
     return fetch_hostaway_resource("reservations", reservation_id)
 
 def fetch_hostaway_conversation(conversation_id: Optional[int]) -> Optional[Dict[str, Any]]:
-    t = get_hostaway_access_token()
-    if not t or not conversation_id:
+    if not conversation_id:
         return None
     url = f"{HOSTAWAY_API_BASE}/conversations/{conversation_id}?includeScheduledMessages=1"
     try:
-        r = requests.get(url, headers={"Authorization": f"Bearer {t}"}, timeout=15)
+        r = hostaway_request("GET", url, timeout=15)
         r.raise_for_status()
         logging.info(f"✅ Conversation {conversation_id} fetched with messages.")
         return r.json()
@@ -405,22 +391,13 @@ def fetch_conversation_messages(conversation_id: Optional[int]) -> List[Dict[str
     return []
 
 def send_reply_to_hostaway(conversation_id: str, reply_text: str, communication_type: str = "email") -> bool:
-    t = get_hostaway_access_token()
-    if not t or not conversation_id or not reply_text:
+    if not conversation_id or not reply_text:
         return False
     url = f"{HOSTAWAY_API_BASE}/conversations/{conversation_id}/messages"
     payload = {"body": reply_text, "isIncoming": 0, "communicationType": communication_type}
-    headers = {"Authorization": f"Bearer {t}", "Content-Type": "application/json; charset=utf-8"}
+    headers = {"Content-Type": "application/json; charset=utf-8"}
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=15)
-        if r.status_code == 401:
-            # token likely expired mid-flight — refresh once
-            t = get_hostaway_access_token()
-            if not t:
-                logging.error("Failed to refresh Hostaway token after 401")
-                return False
-            headers["Authorization"] = f"Bearer {t}"
-            r = requests.post(url, headers=headers, json=payload, timeout=15)
+        r = hostaway_request("POST", url, headers=headers, json=payload, timeout=15)
         r.raise_for_status()
         logging.info(f"✅ Sent to Hostaway: {r.text}")
         return True
@@ -630,6 +607,10 @@ INTENT_LABELS = [
 ]
 
 def detect_intent(message: str) -> str:
+    # Local classifier first (<1 ms); the LLM only for low-confidence messages
+    local = classify(message, allowed=INTENT_LABELS)
+    if local:
+        return local
     if not openai_client:
         return "other"
     system_prompt = (
@@ -639,8 +620,9 @@ def detect_intent(message: str) -> str:
     )
     user_prompt = f"Message: {message}"
     try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = timed_create(
+            openai_client.chat.completions.create,
+            route_model("classification").model,
             messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
             max_tokens=10,
             temperature=0,
@@ -656,18 +638,6 @@ def detect_intent(message: str) -> str:
 
 # --------------------------- NEW: Hostaway calendar + pricing helpers ---------------------------
 
-def _hostaway_headers_for_read() -> Dict[str, str]:
-    """Bearer header via your token cache; used for GETs."""
-    t = get_hostaway_access_token()
-    if not t:
-        raise RuntimeError("Hostaway token unavailable")
-    return {"Authorization": f"Bearer {t}"}
-
-def _hostaway_headers_for_write() -> Dict[str, str]:
-    h = _hostaway_headers_for_read()
-    h["Content-Type"] = "application/json"
-    return h
-
 def get_calendar(listing_id: Union[int, str], start_date: str, end_date: str, include_resources: int = 0) -> List[Dict[str, Any]]:
     """
     GET /v1/listings/{listingId}/calendar
@@ -675,9 +645,7 @@ def get_calendar(listing_id: Union[int, str], start_date: str, end_date: str, in
     url = f"{HOSTAWAY_API_BASE}/listings/{listing_id}/calendar"
     params = {"startDate": start_date, "endDate": end_date, "includeResources": include_resources}
     try:
-        r = requests.get(url, headers=_hostaway_headers_for_read(), params=params, timeout=20)
-        if r.status_code == 401:
-            r = requests.get(url, headers=_hostaway_headers_for_read(), params=params, timeout=20)
+        r = hostaway_request("GET", url, params=params, timeout=20)
         r.raise_for_status()
         j = r.json()
         return (j.get("result") if isinstance(j, dict) else j) or []
@@ -692,9 +660,7 @@ def update_calendar(listing_id: Union[int, str], payload: Dict[str, Any]) -> Opt
     """
     url = f"{HOSTAWAY_API_BASE}/listings/{listing_id}/calendar"
     try:
-        r = requests.put(url, headers=_hostaway_headers_for_write(), json=payload, timeout=30)
-        if r.status_code == 401:
-            r = requests.put(url, headers=_hostaway_headers_for_write(), json=payload, timeout=30)
+        r = hostaway_request("PUT", url, headers={"Content-Type": "application/json"}, json=payload, timeout=30)
         r.raise_for_status()
         j = r.json()
         return (j.get("result") if isinstance(j, dict) else j) or []
@@ -751,9 +717,7 @@ def price_details_v2(listing_id: Union[int, str], start_date: str, end_date: str
     if reservation_coupon_id is not None: body["reservationCouponId"] = reservation_coupon_id
     if markup is not None: body["markup"] = markup
     try:
-        r = requests.post(url, headers=_hostaway_headers_for_write(), json=body, timeout=30)
-        if r.status_code == 401:
-            r = requests.post(url, headers=_hostaway_headers_for_write(), json=body, timeout=30)
+        r = hostaway_request("POST", url, headers={"Content-Type": "application/json"}, json=body, timeout=30)
         r.raise_for_status()
         j = r.json()
         return (j.get("result") if isinstance(j, dict) else j) or None
@@ -1,12 +1,17 @@
 import os
+import asyncio
 import logging
 from fastapi import FastAPI, Request
 from fastapi.responses import PlainTextResponse, JSONResponse
 
 # Import modular routers
 from src.slack_interactions import slack_interactions_bp
-from src.message_handler import message_handler_bp, unified_webhook
-from src.ai_assistant_enhanced import initialize_enhanced_assistant
+from src.message_handler import message_handler_bp, unified_webhook, process_guest_message
+from src.ai_assistant_enhanced import start_assistant_initialization
+from src.admin import admin_bp
+from src.webhook_queue import WEBHOOK_QUEUE_ENABLED, start_workers, stop_workers
+from src.hostaway_http import close_clients
+from src.tokens import load_encoding
 
 # ---------------- Logging ----------------
 logging.basicConfig(level=logging.INFO)
@@ -17,17 +22,31 @@ app = FastAPI(title="Hostaway Autoreply")
 # Register routers with prefixes
 app.include_router(slack_interactions_bp, prefix="/slack", tags=["slack"])
 app.include_router(message_handler_bp, prefix="/webhook", tags=["webhook"])
+app.include_router(admin_bp, prefix="/admin", tags=["admin"])
 
 # ---------------- Startup Event ----------------
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the Enhanced OpenAI Assistant on startup"""
+    """Initialize the Enhanced OpenAI Assistant on startup (network checks run in the background)"""
     logging.info("🚀 Starting Hostaway AutoReply (Enhanced)...")
-    assistant_id = initialize_enhanced_assistant()
+    # tiktoken downloads its encoding on first use - keep that off the event loop
+    if not await asyncio.to_thread(load_encoding):
+        logging.info("Token counts are estimated (tiktoken unavailable)")
+    assistant_id = start_assistant_initialization()
     if assistant_id:
-        logging.info(f"✅ OpenAI Assistant initialized: {assistant_id}")
+        logging.info(f"✅ OpenAI Assistant ready from disk: {assistant_id}")
     else:
-        logging.warning("⚠️ Failed to initialize OpenAI Assistant - check OPENAI_API_KEY")
+        logging.info("⏳ OpenAI Assistant initializing in the background")
+
+    if WEBHOOK_QUEUE_ENABLED:
+        start_workers(process_guest_message)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Let queued webhooks finish before the worker exits"""
+    if WEBHOOK_QUEUE_ENABLED:
+        await stop_workers()
+    await close_clients()
 
 # ---------------- Alias Route ----------------
 @app.post("/unified-webhook")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy/amenities_index.py build and search.
+
+Builds a synthetic large listing (many amenities, custom fields and image
+captions) and reports:
+
+- cold build (ingest + inverted index), warm start from the on-disk index,
+  and in-process hits of AmenitiesIndex.for_listing, content-hashed vs.
+  keyed on the listing's updatedOn
+- per-query search latency: the previous linear corpus scan vs. the
+  inverted index, after checking both return the same results
+
+Usage:
+    python scripts/bench_amenities_index.py --custom-fields 400 --images 300 --queries 2000
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "legacy")))
+
+import amenities_index  # noqa: E402
+from amenities_index import AmenitiesIndex, _norm_text  # noqa: E402
+
+WORDS = ("pool hot tub wifi parking garage kitchen coffee maker towels linens beach chairs umbrella "
+         "grill patio balcony view ocean mountain crib high chair washer dryer iron hair dryer fireplace "
+         "smart tv netflix speaker games board desk monitor ev charger elevator gym sauna bikes kayak").split()
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def synthetic_listing(custom_fields: int, images: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    phrase = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))  # noqa: E731
+    return {
+        "id": 9001,
+        "name": "Big Synthetic Villa",
+        "updatedOn": "2026-01-15 10:30:00",
+        "description": phrase(300), "houseRules": "No parties. Pets allowed. " + phrase(40),
+        "checkInTimeStart": 16, "checkInTimeEnd": 22, "checkOutTime": 11,
+        "wifiUsername": "Villa", "wifiPassword": "secret", "maxPetsAllowed": 2,
+        **{f"field{i}": phrase(3) for i in range(60)},
+        "listingAmenities": [{"amenityName": phrase(2).title()} for _ in range(120)],
+        "listingBedTypes": [{"bedTypeId": i, "quantity": 1 + i % 3} for i in range(8)],
+        "customFieldValues": [{"name": f"Custom {phrase(2)} {i}", "value": phrase(12)} for i in range(custom_fields)],
+        "listingImages": [{"url": f"https://cdn.example.com/{i}.jpg", "caption": phrase(6), "sortOrder": i}
+                          for i in range(images)],
+    }
+
+
+def scan_search(idx: AmenitiesIndex, query: str, topk: int = 5) -> list:
+    """The previous AmenitiesIndex.search: substring-match every token against every corpus row."""
+    q = _norm_text(query).lower()
+    toks = [t for t in re.split(r"[^a-z0-9]+", q) if t]
+    if not toks:
+        return []
+    scored = []
+    for key, label, val in idx._corpus:
+        text = f"{label} {val}".lower()
+        score = 0.0
+        for t in toks:
+            if t and t in text:
+                score += 1.0 + (0.5 if t in (label.lower()) else 0.0)
+        if score > 0:
+            scored.append((score, (key, label, val)))
+    scored.sort(key=lambda x: -x[0])
+    return [{"key": k, "label": l, "value": v} for s, (k, l, v) in scored[:topk]]
+
+
+def timed(fn, runs: int) -> list:
+    out = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        out.append(1e6 * (time.perf_counter() - t0))
+    return out
+
+
+def main(custom_fields: int, images: int, queries: int, seed: int) -> None:
+    listing = synthetic_listing(custom_fields, images, seed)
+    cache_dir = tempfile.mkdtemp(prefix="amenities_index_")
+    try:
+        cold = timed(lambda: AmenitiesIndex(listing), 20)
+        AmenitiesIndex.for_listing(listing, cache_dir)  # writes the on-disk index
+
+        def warm_start():
+            amenities_index._memory.clear()  # a fresh process: nothing in memory
+            AmenitiesIndex.for_listing(listing, cache_dir)
+
+        warm = timed(warm_start, 20)
+        hot = timed(lambda: AmenitiesIndex.for_listing(listing, cache_dir), 200)
+        AmenitiesIndex.for_listing(listing, cache_dir, version=listing["updatedOn"])
+        hot_versioned = timed(lambda: AmenitiesIndex.for_listing(listing, cache_dir, version=listing["updatedOn"]), 200)
+        size_kb = sum(os.path.getsize(os.path.join(cache_dir, f)) for f in os.listdir(cache_dir)) / 1024
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    idx = AmenitiesIndex(listing)
+    rng = random.Random(seed + 1)
+    qs = [" ".join(rng.choice(WORDS + ["is", "there", "a", "do", "you", "have"]) for _ in range(rng.randint(1, 6)))
+          for _ in range(queries)] + ["wif", "hot tub?", "check_in_start", "custom 12"]
+    mismatches = sum(scan_search(idx, q) != idx.search(q) for q in qs)
+
+    old = [t for q in qs for t in timed(lambda: scan_search(idx, q), 1)]
+    idx._expanded.clear()
+    idx._grams = None
+    first = [t for q in qs for t in timed(lambda: idx.search(q), 1)]  # gram index built, token memo filling up
+    new = [t for q in qs for t in timed(lambda: idx.search(q), 1)]
+
+    print(f"Corpus: {len(idx._corpus)} rows, {len(idx._postings)} terms, on-disk index {size_kb:.0f} KB")
+    print(f"Build (ingest + index):      p50 {percentile(cold, 0.5) / 1000:7.2f} ms")
+    print(f"Warm start from disk:        p50 {percentile(warm, 0.5) / 1000:7.2f} ms")
+    print(f"In-process for_listing hit:  p50 {percentile(hot, 0.5) / 1000:7.2f} ms  (content hash of the payload)")
+    print(f"  ... with version=updatedOn: p50 {percentile(hot_versioned, 0.5) / 1000:7.2f} ms")
+    print(f"Search, linear scan:         p50 {percentile(old, 0.5):8.1f} us   p99 {percentile(old, 0.99):8.1f} us")
+    print(f"Search, inverted (1st pass): p50 {percentile(first, 0.5):8.1f} us   p99 {percentile(first, 0.99):8.1f} us")
+    print(f"Search, inverted (warm):     p50 {percentile(new, 0.5):8.1f} us   p99 {percentile(new, 0.99):8.1f} us")
+    print(f"Result mismatches vs. scan:  {mismatches} of {len(qs)} queries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--custom-fields", type=int, default=400, help="customFieldValues in the listing")
+    parser.add_argument("--images", type=int, default=300, help="listingImages with captions")
+    parser.add_argument("--queries", type=int, default=2000, help="Search queries timed")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.custom_fields, args.images, args.queries, args.seed)
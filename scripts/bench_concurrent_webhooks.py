@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: N concurrent webhooks on one event loop.
+
+Replaces the Hostaway, OpenAI and Slack calls in src.message_handler with
+fakes that sleep for a fixed latency, then processes N guest messages
+serially and concurrently. With a non-blocking pipeline the concurrent run
+should finish in roughly one pipeline latency instead of N of them.
+
+Usage:
+    python scripts/bench_concurrent_webhooks.py --webhooks 20 --latency 0.2
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import message_handler, request_context  # noqa: E402
+
+
+def install_fakes(latency: float) -> None:
+    """Swap upstream calls for sleeps of `latency` seconds."""
+
+    async def fake_fetch(_id):
+        await asyncio.sleep(latency)
+        return {"result": {}}
+
+    async def fake_messages(_conv_id):
+        await asyncio.sleep(latency)
+        return []
+
+    async def fake_analyze(_conv_id, _messages):
+        await asyncio.sleep(latency)
+        return "Neutral", "Benchmark conversation"
+
+    async def fake_reply(_ctx, **_kwargs):
+        await asyncio.sleep(latency)
+        return "Benchmark reply"
+
+    class FakeSlack:
+        async def chat_postMessage(self, **_kwargs):
+            await asyncio.sleep(latency)
+            return {"ok": True}
+
+    request_context.fetch_hostaway_reservation = fake_fetch
+    request_context.fetch_hostaway_listing = fake_fetch
+    request_context.get_conversation_history = fake_messages
+    message_handler.analyze_conversation_thread = fake_analyze
+    message_handler.generate_smart_reply = fake_reply
+    message_handler.log_ai_exchange = lambda **_kwargs: None
+    message_handler.client = FakeSlack()
+    message_handler.SLACK_CHANNEL = "CBENCH"
+
+
+def _event(i: int) -> dict:
+    return {"id": i, "conversationId": 1000 + i, "reservationId": 2000 + i, "listingMapId": 3000, "body": "What time is check-in?"}
+
+
+async def run(webhooks: int) -> None:
+    start = time.perf_counter()
+    await message_handler.process_guest_message(_event(0))
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(webhooks):
+        await message_handler.process_guest_message(_event(i))
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(message_handler.process_guest_message(_event(i)) for i in range(webhooks)))
+    concurrent = time.perf_counter() - start
+
+    print(f"Single webhook latency:       {single:.2f}s")
+    print(f"{webhooks} webhooks, serial:       {serial:.2f}s  (≈ sum of latencies)")
+    print(f"{webhooks} webhooks, concurrent:   {concurrent:.2f}s  (≈ max latency)")
+    print(f"Speedup:                      {serial / concurrent:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--webhooks", type=int, default=20, help="Number of webhooks to process")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake latency per upstream call (seconds)")
+    args = parser.parse_args()
+
+    install_fakes(args.latency)
+    asyncio.run(run(args.webhooks))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local intent classifier accuracy and latency.
+
+Loads labelled messages from the learning database (ai_exchanges and
+learning_examples rows with an intent), holds out a test split, trains
+legacy/intent_classifier.py on the rest and reports:
+
+- accuracy on the held-out messages
+- coverage at the confidence threshold (share answered locally, i.e. LLM
+  calls saved) and accuracy on that share
+- per-message scoring latency
+
+Usage:
+    python scripts/bench_intent_classifier.py --db /var/data/learning.db --test-share 0.2
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "legacy")))
+
+from intent_classifier import INTENT_CLASSIFIER_THRESHOLD, IntentClassifier, load_examples  # noqa: E402
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def main(db: str, test_share: float, threshold: float, seed: int) -> None:
+    examples = load_examples(db)
+    if len(examples) < 20:
+        sys.exit(f"Only {len(examples)} labelled examples in {db} - not enough to benchmark")
+
+    random.Random(seed).shuffle(examples)
+    cut = int(len(examples) * (1 - test_share))
+    train, test = examples[:cut], examples[cut:]
+
+    started = time.perf_counter()
+    clf = IntentClassifier.train(train)
+    train_ms = 1000 * (time.perf_counter() - started)
+    test = [(text, label) for text, label in test if label in clf.labels]
+
+    correct = confident = confident_correct = 0
+    latencies = []
+    for text, label in test:
+        t0 = time.perf_counter()
+        predicted, confidence = clf.predict(text)
+        latencies.append(1e6 * (time.perf_counter() - t0))
+        correct += predicted == label
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += predicted == label
+
+    print(f"Examples: {len(train)} train / {len(test)} test, {len(clf.labels)} intents (trained in {train_ms:.0f} ms)")
+    print(f"Label counts: {dict(Counter(label for _, label in examples).most_common())}")
+    print(f"Accuracy (all):              {correct / len(test):.1%}")
+    print(f"Coverage at >= {threshold:.2f}:        {confident / len(test):.1%}  (LLM calls saved)")
+    if confident:
+        print(f"Accuracy on covered share:   {confident_correct / confident:.1%}")
+    print(f"Latency per message:         p50 {percentile(latencies, 0.5):.1f} us   p99 {percentile(latencies, 0.99):.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("LEARNING_DB_PATH", "learning.db"), help="Learning database")
+    parser.add_argument("--test-share", type=float, default=0.2, help="Share of examples held out")
+    parser.add_argument("--threshold", type=float, default=INTENT_CLASSIFIER_THRESHOLD, help="Confidence cut-off")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.db, args.test_share, args.threshold, args.seed)
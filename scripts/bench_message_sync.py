@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upstream bytes per webhook, full refetch vs. incremental sync.
+
+Replays a long-stay conversation against scripts/fake_hostaway.py: it
+starts with some history, then each "webhook" adds a guest message (and
+a host reply). For each webhook we load the history two ways and count
+the response bytes:
+
+- before: one 50-message page per webhook, the old per-webhook fetch
+- after:  message_store.get_conversation_history(), watermark sync + disk
+
+Usage:
+    python scripts/bench_message_sync.py --history 120 --webhooks 30
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+
+# Client modules refuse to build without credentials; nothing here talks to them
+os.environ.setdefault("OPENAI_API_KEY", "sk-local-bench")
+os.environ.setdefault("HOSTAWAY_ACCESS_TOKEN", "local-bench")
+os.environ.setdefault("HOSTAWAY_RATE_LIMITS", "global=1000/1000")
+os.environ["MESSAGE_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "messages.db")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+
+from fake_hostaway import FakeHostaway  # noqa: E402
+from src import hostaway_http  # noqa: E402
+from src.api_client import fetch_conversation_messages_page  # noqa: E402
+from src.message_store import get_conversation_history, message_store_stats  # noqa: E402
+from src.upstream import track_upstream_calls, _current_bytes  # noqa: E402
+
+CONVERSATION_ID = 777
+
+
+async def measure(load) -> tuple:
+    """Run one history load in a fresh tracking scope; return (messages, bytes, calls)."""
+    calls = track_upstream_calls()
+    messages = await load()
+    return messages, sum(_current_bytes.get().values()), sum(calls.values())
+
+
+async def main(history: int, webhooks: int) -> None:
+    fake = FakeHostaway(latency=0)
+    hostaway_http._async_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake.app), base_url="http://fake-hostaway"
+    )
+    for i in range(history):
+        fake.add_message(CONVERSATION_ID, f"Earlier message {i} " + "lorem ipsum " * 10, incoming=i % 2 == 0)
+
+    before_bytes, after_bytes, after_calls = [], [], []
+    for i in range(webhooks):
+        fake.add_message(CONVERSATION_ID, f"Host reply {i} " + "lorem ipsum " * 10, incoming=False)
+        fake.add_message(CONVERSATION_ID, f"Guest question {i} " + "lorem ipsum " * 10, incoming=True)
+
+        old, old_bytes, _ = await measure(lambda: fetch_conversation_messages_page(CONVERSATION_ID, limit=50))
+        old.sort(key=lambda m: m.get("insertedOn", ""))  # pages are newest first
+        new, new_bytes, new_calls = await measure(lambda: get_conversation_history(CONVERSATION_ID, limit=50))
+        assert [m["id"] for m in old] == [m["id"] for m in new], "store diverged from Hostaway"
+
+        before_bytes.append(old_bytes)
+        after_bytes.append(new_bytes)
+        after_calls.append(new_calls)
+
+    await hostaway_http.close_clients()
+
+    def avg(xs):
+        return sum(xs) / len(xs)
+
+    print(f"Conversation: {history} messages of history, {webhooks} webhooks")
+    print(f"First webhook (cold store):  before {before_bytes[0]:>7,} B   after {after_bytes[0]:>7,} B")
+    print(f"Steady state (avg of rest):  before {avg(before_bytes[1:]):>7,.0f} B   after {avg(after_bytes[1:]):>7,.0f} B")
+    print(f"Total:                       before {sum(before_bytes):>7,} B   after {sum(after_bytes):>7,} B")
+    print(f"Requests per webhook after the first: {avg(after_calls[1:]):.2f}")
+    print(f"Store: {message_store_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=120, help="Messages already in the conversation")
+    parser.add_argument("--webhooks", type=int, default=30, help="Guest messages to replay")
+    args = parser.parse_args()
+    asyncio.run(main(args.history, args.webhooks))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-message cost of the per-listing prompt sections.
+
+Builds a synthetic large listing (Hostaway-shaped payload with images and
+amenities, plus property_details / amenities_index meta) and times, per
+message:
+
+- ai/prompt_builder.py listing sections: formatted from scratch vs. served
+  from compile_listing_sections' cache (version check only)
+- src/ai_assistant_enhanced.py build_rich_context's PROPERTY DETAILS block:
+  formatted from scratch vs. cached
+
+Usage:
+    python scripts/bench_prompt_sections.py --messages 2000 --amenities 150
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ai import prompt_builder  # noqa: E402
+from src import ai_assistant_enhanced as enhanced  # noqa: E402
+from src.percentiles import percentile  # noqa: E402
+
+
+def synthetic_listing(amenities: int) -> tuple:
+    listing = {
+        "id": 424242,
+        "updatedOn": "2024-05-01 09:30:00",
+        "name": "Harbor View Loft",
+        "address": {"address": "12 Pier St", "city": "Portland", "state": "ME", "zip": "04101", "country": "US"},
+        "city": "Portland", "state": "ME",
+        "bedroomsNumber": 3, "bedsNumber": 4, "bathroomsNumber": 2, "personCapacity": 8,
+        "roomType": "entire_home", "bathroomType": "private",
+        "checkInTimeStart": 16, "checkInTimeEnd": 22, "checkOutTime": 11,
+        "wifiUsername": "HarborLoft", "wifiPassword": "sea-breeze-2024",
+        "specialInstruction": "Park in spot 4. " * 10,
+        "keyPickup": "Lockbox by the side door.",
+        "doorSecurityCode": "4821",
+        "houseRules": "No smoking. No parties. Quiet hours 10pm-8am. " * 8,
+        "description": "A bright loft above the harbor. " * 60,
+        "listingAmenities": [{"amenityId": i, "amenityName": f"Amenity {i}"} for i in range(amenities)],
+        "listingImages": [{"url": f"https://cdn.example.com/img/{i}.jpg", "caption": f"Room {i}"} for i in range(40)],
+    }
+    meta = {
+        "listing_id": listing["id"],
+        "property_details": {
+            "bedrooms": 3, "beds": 4, "bathrooms": 2, "max_guests": 8, "room_type": "entire_home",
+            "check_in_start": 16, "check_in_end": 22, "check_out_time": 11, "wifi_username": "HarborLoft",
+        },
+        "amenities_index": {
+            "amenities": {f"amenity_{i}": {"available": i % 3 != 0, "notes": f"Located in room {i % 7}"} for i in range(amenities)},
+            "categories": {"kitchen": [f"amenity_{i}" for i in range(0, amenities, 5)]},
+        },
+        "core_identity": {"tone": "warm, concise", "sign_off": "- The Harbor Loft team"},
+    }
+    return listing, meta
+
+
+def time_per_message(fn, messages: int) -> list:
+    latencies = []
+    for _ in range(messages):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(1e6 * (time.perf_counter() - t0))
+    return latencies
+
+
+def report(label: str, uncached: list, cached: list) -> None:
+    p50u, p50c = percentile(uncached, 0.5), percentile(cached, 0.5)
+    print(f"{label:<34} uncached p50 {p50u:8.1f} us  p99 {percentile(uncached, 0.99):8.1f} us"
+          f"   cached p50 {p50c:7.1f} us  p99 {percentile(cached, 0.99):7.1f} us   ({p50u / max(p50c, 1e-9):.1f}x)")
+
+
+def main(messages: int, amenities: int) -> None:
+    listing, meta = synthetic_listing(amenities)
+    args = (meta["property_details"], meta["amenities_index"], meta["core_identity"])
+
+    def prompt_uncached():
+        prompt_builder.listing_section_cache.clear()
+        prompt_builder.compile_listing_sections(listing["id"], listing, *args)
+
+    def prompt_cached():
+        prompt_builder.compile_listing_sections(listing["id"], listing, *args)
+
+    def context_uncached():
+        enhanced.listing_context_cache.clear()
+        enhanced.build_listing_context(listing["id"], listing)
+
+    def context_cached():
+        enhanced.build_listing_context(listing["id"], listing)
+
+    prompt_cached(); context_cached()  # warm imports and the tokenizer
+    sections = prompt_builder.compile_listing_sections(listing["id"], listing, *args)
+    print(f"Listing: {amenities} amenities, sections {[(s.name, s.tokens) for s in sections]} tokens")
+    report("prompt_builder listing sections", time_per_message(prompt_uncached, messages), time_per_message(prompt_cached, messages))
+    report("build_rich_context listing block", time_per_message(context_uncached, messages), time_per_message(context_cached, messages))
+    print(f"Cache stats: {prompt_builder.listing_section_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000, help="Messages timed per variant")
+    parser.add_argument("--amenities", type=int, default=150, help="Amenities in the synthetic listing")
+    args = parser.parse_args()
+    main(args.messages, args.amenities)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Assistants engine vs. stateless Chat Completions engine.
+
+Replays recorded conversations from a message store database (see
+src/message_store.py) through generate_smart_reply with each engine. For
+every guest message we rebuild the context as it was when the message
+arrived (history up to that point), then generate a reply with both
+engines and record wall-clock latency, prompt/completion tokens and cost.
+Each call is priced by the model the router actually picked for it.
+
+Talks to the real OpenAI API: needs OPENAI_API_KEY, and creates an assistant
+unless OPENAI_ASSISTANT_ID is set. The database is copied first, so the
+rolling summaries written during the run don't touch the original, and the
+assistant and its threads are recorded in a throwaway state database rather
+than the live ASSISTANT_STATE_PATH.
+
+Usage:
+    python scripts/bench_reply_engines.py --db /var/data/messages.db --conversations 5 --replay 4
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+
+ENGINES = ("assistants", "chat")
+
+
+def load_conversations(db_path: str, count: int, min_messages: int) -> dict:
+    """Longest recorded conversations: {conversation_id: [messages oldest first]}."""
+    with sqlite3.connect(db_path) as conn:
+        ids = [
+            row[0]
+            for row in conn.execute(
+                """SELECT conversation_id FROM messages GROUP BY conversation_id
+                   HAVING COUNT(*) >= ? ORDER BY COUNT(*) DESC LIMIT ?""",
+                (min_messages, count),
+            )
+        ]
+        return {
+            conv: [
+                json.loads(row[0])
+                for row in conn.execute(
+                    "SELECT payload FROM messages WHERE conversation_id = ? ORDER BY inserted_on, message_id",
+                    (conv,),
+                )
+            ]
+            for conv in ids
+        }
+
+
+async def main(args: argparse.Namespace) -> None:
+    conversations = load_conversations(args.db, args.conversations, args.min_messages)
+    if not conversations:
+        sys.exit(f"No conversations with at least {args.min_messages} messages in {args.db}")
+
+    # Rolling summaries are written to the store; keep the original untouched.
+    # Bench assistants and threads go to a throwaway state DB, not the live one.
+    workdir = tempfile.mkdtemp()
+    os.environ["MESSAGE_STORE_PATH"] = os.path.join(workdir, "messages.db")
+    os.environ["ASSISTANT_STATE_PATH"] = os.path.join(workdir, "assistant_state.db")
+    shutil.copy(args.db, os.environ["MESSAGE_STORE_PATH"])
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+    from src import ai_assistant_enhanced as enhanced
+    from src.assistant_runs import token_usage
+    from src.model_router import router_stats
+    from src.percentiles import percentile
+    from src.request_context import GuestMessageContext
+
+    if not await enhanced.initialize_enhanced_assistant():
+        sys.exit("Could not initialize the assistant - check OPENAI_API_KEY")
+
+    latencies = defaultdict(list)
+    for conv, messages in conversations.items():
+        guest_positions = [i for i, m in enumerate(messages) if m.get("isIncoming") == 1][-args.replay:]
+        for pos in guest_positions:
+            for engine in ENGINES:
+                ctx = GuestMessageContext(
+                    conversation_id=f"bench-{engine}-{conv}",
+                    reservation_id=None,
+                    listing_id=None,
+                    guest_message=messages[pos].get("body", ""),
+                    messages=messages[: pos + 1],
+                )
+                started = time.perf_counter()
+                await enhanced.generate_smart_reply(ctx, engine=engine)
+                latencies[engine].append(time.perf_counter() - started)
+        print(f"Conversation {conv}: replayed {len(guest_positions)} guest messages")
+
+    # Assistants usage arrives with the run's completion event, after the text
+    await asyncio.sleep(2)
+    usage = token_usage()
+    models = {model: stats["calls"] for model, stats in router_stats()["models"].items()}
+
+    print(f"\nModels (calls): {models}")
+    print(f"{'engine':<12}{'calls':>6}{'p50 s':>8}{'p95 s':>8}{'in tok/call':>13}{'out tok/call':>14}{'$ / 1k replies':>16}")
+    for engine in ENGINES:
+        totals = usage.get(f"reply:{engine}", {})
+        calls = len(latencies[engine])
+        prompt = totals.get("prompt_tokens", 0) / max(1, totals.get("calls", 0))
+        completion = totals.get("completion_tokens", 0) / max(1, totals.get("calls", 0))
+        cost = 1000 * totals.get("est_cost_usd", 0.0) / max(1, totals.get("calls", 0))
+        if totals.get("unpriced_calls"):
+            print(f"  note: {totals['unpriced_calls']} {engine} calls used a model without a price in MODEL_PRICES")
+        print(
+            f"{engine:<12}{calls:>6}{percentile(latencies[engine], 0.5):>8.2f}"
+            f"{percentile(latencies[engine], 0.95):>8.2f}{prompt:>13.0f}{completion:>14.0f}{cost:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("MESSAGE_STORE_PATH", "/var/data/messages.db"),
+                        help="Message store database with recorded conversations")
+    parser.add_argument("--conversations", type=int, default=5, help="Conversations to replay")
+    parser.add_argument("--min-messages", type=int, default=6, help="Skip shorter conversations")
+    parser.add_argument("--replay", type=int, default=4, help="Last N guest messages per conversation")
+    asyncio.run(main(parser.parse_args()))
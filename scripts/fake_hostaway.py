@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Fake Hostaway API for local checks.
+
+Serves the handful of endpoints the app calls (reservations, listings,
+conversation messages) from in-memory state, and emits Hostaway-style
+reservation webhooks whenever that state changes. Counts every request so
+checks can assert how often the app actually went upstream.
+
+Used by tests/test_reservation_cache.py and scripts/bench_message_sync.py;
+mount it on an httpx.ASGITransport or run it standalone with:
+    uvicorn scripts.fake_hostaway:app --port 8765
+"""
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Form, Header, HTTPException
+
+Deliver = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class FakeHostaway:
+    def __init__(self, deliver: Optional[Deliver] = None, latency: float = 0.01):
+        self.deliver = deliver                  # Receives each emitted webhook payload
+        self.latency = latency                  # Seconds each API request takes
+        self.reservations: Dict[str, Dict[str, Any]] = {}
+        self.listings: Dict[str, Dict[str, Any]] = {}
+        self.messages: Dict[str, List[Dict[str, Any]]] = {}
+        self.requests: Counter = Counter()
+        self.require_auth = False               # When True, API calls need a token from /accessTokens
+        self.tokens: set = set()
+        self.token_ttl = 3600
+        self._clock = datetime(2025, 1, 1, 12, 0, 0)
+        self.app = self._build_app()
+
+    # -------------------- State changes (emit webhooks) --------------------
+
+    def _tick(self) -> str:
+        self._clock += timedelta(seconds=1)
+        return self._clock.strftime("%Y-%m-%d %H:%M:%S")
+
+    def _webhook(self, event: str, reservation: Dict[str, Any]) -> Dict[str, Any]:
+        return {"object": "reservation", "event": event, "data": dict(reservation)}
+
+    async def _emit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.deliver is not None:
+            await self.deliver(payload)
+        return payload
+
+    async def create_reservation(self, reservation_id: int, **fields: Any) -> Dict[str, Any]:
+        reservation = {"id": reservation_id, "status": "new", "updatedOn": self._tick(), **fields}
+        self.reservations[str(reservation_id)] = reservation
+        return await self._emit(self._webhook("reservation.created", reservation))
+
+    async def update_reservation(self, reservation_id: int, **changes: Any) -> Dict[str, Any]:
+        reservation = self.reservations[str(reservation_id)]
+        reservation.update(changes, updatedOn=self._tick())
+        return await self._emit(self._webhook("reservation.updated", reservation))
+
+    async def cancel_reservation(self, reservation_id: int) -> Dict[str, Any]:
+        reservation = self.reservations[str(reservation_id)]
+        reservation.update(status="cancelled", updatedOn=self._tick())
+        return await self._emit(self._webhook("reservation.cancelled", reservation))
+
+    def update_silently(self, reservation_id: int, **changes: Any) -> Dict[str, Any]:
+        """Change state without a webhook, i.e. a missed event."""
+        reservation = self.reservations[str(reservation_id)]
+        reservation.update(changes, updatedOn=self._tick())
+        return self._webhook("reservation.updated", reservation)
+
+    def add_message(self, conversation_id: Any, body: str, incoming: bool = True) -> Dict[str, Any]:
+        """Append a message to a conversation (guest message if incoming)."""
+        conversation = self.messages.setdefault(str(conversation_id), [])
+        message = {
+            "id": sum(len(c) for c in self.messages.values()) + 1,
+            "conversationId": int(conversation_id),
+            "body": body,
+            "isIncoming": int(incoming),
+            "insertedOn": self._tick(),
+        }
+        conversation.append(message)
+        return message
+
+    def revoke_tokens(self) -> None:
+        """Expire every issued token, as if they all lapsed at once."""
+        self.tokens.clear()
+
+    def _authorize(self, authorization: Optional[str]) -> None:
+        if self.require_auth and (authorization or "").removeprefix("Bearer ") not in self.tokens:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+
+    # -------------------- API --------------------
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Fake Hostaway")
+
+        @app.post("/accessTokens")
+        async def access_tokens(client_id: str = Form(...), client_secret: str = Form(...)):
+            self.requests["access_token"] += 1
+            await asyncio.sleep(self.latency)
+            token = f"token-{self.requests['access_token']}"
+            self.tokens.add(token)
+            return {"token_type": "Bearer", "expires_in": self.token_ttl, "access_token": token}
+
+        @app.get("/reservations/{reservation_id}")
+        async def get_reservation(reservation_id: str, authorization: Optional[str] = Header(None)):
+            self.requests["reservation"] += 1
+            await asyncio.sleep(self.latency)
+            self._authorize(authorization)
+            if reservation_id not in self.reservations:
+                raise HTTPException(status_code=404, detail="Reservation not found")
+            return {"status": "success", "result": dict(self.reservations[reservation_id])}
+
+        @app.get("/listings/{listing_id}")
+        async def get_listing(listing_id: str, authorization: Optional[str] = Header(None)):
+            self.requests["listing"] += 1
+            await asyncio.sleep(self.latency)
+            self._authorize(authorization)
+            listing = self.listings.get(listing_id, {"id": int(listing_id), "name": f"Listing {listing_id}"})
+            return {"status": "success", "result": listing}
+
+        @app.get("/conversations/{conversation_id}/messages")
+        async def get_messages(
+            conversation_id: str, limit: int = 100, offset: int = 0, authorization: Optional[str] = Header(None)
+        ):
+            self.requests["messages"] += 1
+            await asyncio.sleep(self.latency)
+            self._authorize(authorization)
+            # Newest first, like Hostaway
+            newest_first = sorted(self.messages.get(conversation_id, []), key=lambda m: (m["insertedOn"], m["id"]), reverse=True)
+            return {"status": "success", "result": newest_first[offset:offset + limit]}
+
+        @app.post("/conversations/{conversation_id}/messages")
+        async def post_message(conversation_id: str, body: Dict[str, Any], authorization: Optional[str] = Header(None)):
+            self.requests["send_message"] += 1
+            await asyncio.sleep(self.latency)
+            self._authorize(authorization)
+            message = self.add_message(conversation_id, body.get("body"), incoming=False)
+            return {"status": "success", "result": message}
+
+        return app
+
+
+app = FakeHostaway().app
@@ -0,0 +1,68 @@
+# file: src/admin.py
+"""
+Admin Endpoints for Hostaway AutoReply
+--------------------------------------
+Handles:
+- Token-protected operational metrics (queue depth, stage timings, upstream calls,
+  Hostaway connection reuse, listing, reservation and analysis caches, reply token usage
+  and its split across prompt sections)
+"""
+
+import os
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+
+from ai.prompt_builder import prompt_section_stats
+from src.ai_assistant import analysis_cache
+from src.ai_assistant_enhanced import listing_context_cache
+from src.api_client import listing_cache, reservation_cache
+from src.assistant_runs import run_stats
+from src.conversation_context import context_stats
+from src.hostaway_http import http_stats, token_manager
+from src.hostaway_rate_limit import rate_limiter
+from src.instant_answers import instant_answer_stats
+from src.message_store import message_store_stats
+from src.model_router import router_stats
+from src.reservation_events import reservation_event_stats
+from src.upstream import upstream_stats
+from src.webhook_queue import queue_stats
+
+admin_bp = APIRouter()
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def verify_admin_token(token: Optional[str]) -> bool:
+    """Check the X-Admin-Token header against ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        logging.warning("ADMIN_TOKEN not set - admin endpoints are unprotected (dev mode)")
+        return True
+    return bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+@admin_bp.get("/metrics")
+async def admin_metrics(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Operational metrics for the webhook pipeline."""
+    if not verify_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    return {
+        "webhook_queue": queue_stats(),
+        "upstream": upstream_stats(),
+        "assistant_runs": run_stats(),
+        "model_router": router_stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "instant_answers": instant_answer_stats(),
+        "reply_context": context_stats(),
+        "prompt_sections": prompt_section_stats(),
+        "listing_context_cache": listing_context_cache.stats(),
+        "hostaway_http": http_stats(),
+        "hostaway_auth": token_manager.stats(),
+        "hostaway_rate_limit": rate_limiter.stats(),
+        "listing_cache": listing_cache.stats(),
+        "message_store": message_store_stats(),
+        "reservation_cache": {**reservation_cache.stats(), "events": reservation_event_stats()},
+    }
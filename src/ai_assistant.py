@@ -7,16 +7,19 @@ Each Hostaway conversation gets its own OpenAI thread for persistent memory.
 """
 
 import os
+import asyncio
 import logging
-import time
 from typing import Dict, Any, Optional, Tuple
-from openai import OpenAI
+from openai import AsyncOpenAI
 
+from src.analysis_cache import AnalysisCache
+from src.assistant_runs import chat_to_text, run_assistant_to_text
+from src.model_router import route
 from src.db import get_thread_id, save_thread_id
 
 # Initialize OpenAI client
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
 # Assistant configuration
 ASSISTANT_ID = None  # Will be set on initialization
@@ -79,7 +82,7 @@ Common topics:
 
 # -------------------- Assistant Management --------------------
 
-def initialize_assistant() -> Optional[str]:
+async def initialize_assistant() -> Optional[str]:
     """
     Initialize or retrieve the OpenAI Assistant.
     This should be called once on application startup.
@@ -100,7 +103,7 @@ def initialize_assistant() -> Optional[str]:
         if stored_assistant_id:
             # Verify the assistant still exists
             try:
-                assistant = client.beta.assistants.retrieve(stored_assistant_id)
+                assistant = await client.beta.assistants.retrieve(stored_assistant_id)
                 ASSISTANT_ID = assistant.id
                 logging.info(f"[assistant] Using existing assistant: {ASSISTANT_ID}")
                 return ASSISTANT_ID
@@ -108,9 +111,9 @@ def initialize_assistant() -> Optional[str]:
                 logging.warning(f"[assistant] Stored assistant {stored_assistant_id} not found: {e}")
 
         # Create a new assistant
-        assistant = client.beta.assistants.create(
+        assistant = await client.beta.assistants.create(
             name="Hostaway Guest Reply Assistant",
-            instructions=DEFAULT_INSTRUCTIONS,
+            instructions=YOUR_VOICE_INSTRUCTIONS,
             model=ASSISTANT_MODEL,
             tools=[],  # Can add file_search, code_interpreter if needed
         )
@@ -128,7 +131,7 @@ def initialize_assistant() -> Optional[str]:
 
 # -------------------- Thread Management --------------------
 
-def get_or_create_thread(conversation_id: str) -> Optional[str]:
+async def get_or_create_thread(conversation_id: str) -> Optional[str]:
     """
     Get existing thread for a conversation or create a new one.
 
@@ -142,7 +145,7 @@ def get_or_create_thread(conversation_id: str) -> Optional[str]:
         return None
 
     # Check if we already have a thread for this conversation
-    thread_id = get_thread_id(conversation_id)
+    thread_id = await asyncio.to_thread(get_thread_id, conversation_id)
 
     if thread_id:
         logging.info(f"[assistant] Using existing thread {thread_id} for conversation {conversation_id}")
@@ -150,11 +153,11 @@ def get_or_create_thread(conversation_id: str) -> Optional[str]:
 
     try:
         # Create a new thread
-        thread = client.beta.threads.create()
+        thread = await client.beta.threads.create()
         thread_id = thread.id
 
         # Save the mapping
-        save_thread_id(conversation_id, thread_id)
+        await asyncio.to_thread(save_thread_id, conversation_id, thread_id)
 
         logging.info(f"[assistant] Created new thread {thread_id} for conversation {conversation_id}")
         return thread_id
@@ -166,7 +169,7 @@ def get_or_create_thread(conversation_id: str) -> Optional[str]:
 
 # -------------------- Message Processing --------------------
 
-def add_message_to_thread(thread_id: str, message: str, role: str = "user") -> bool:
+async def add_message_to_thread(thread_id: str, message: str, role: str = "user") -> bool:
     """
     Add a message to an existing thread.
 
@@ -182,7 +185,7 @@ def add_message_to_thread(thread_id: str, message: str, role: str = "user") -> b
         return False
 
     try:
-        client.beta.threads.messages.create(
+        await client.beta.threads.messages.create(
             thread_id=thread_id,
             role=role,
             content=message
@@ -195,7 +198,7 @@ def add_message_to_thread(thread_id: str, message: str, role: str = "user") -> b
         return False
 
 
-def run_assistant(thread_id: str, context: Dict[str, Any]) -> Optional[str]:
+async def run_assistant(thread_id: str, context: Dict[str, Any]) -> Optional[str]:
     """
     Run the assistant on a thread and get the response.
 
@@ -214,18 +217,15 @@ def run_assistant(thread_id: str, context: Dict[str, Any]) -> Optional[str]:
         # Build additional instructions with context
         additional_instructions = _build_context_instructions(context)
 
-        # Create and run
-        run = client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=ASSISTANT_ID,
-            additional_instructions=additional_instructions
+        # Run and wait for the reply text
+        return await run_assistant_to_text(
+            client, thread_id, ASSISTANT_ID, label="reply",
+            additional_instructions=additional_instructions,
+            model=route(
+                "reply", str(context.get("guest_message") or ""), intent=context.get("intent"), mood=context.get("mood")
+            ).model,
         )
 
-        # Wait for completion
-        response_text = _wait_for_run_completion(thread_id, run.id)
-
-        return response_text
-
     except Exception as e:
         logging.error(f"[assistant] Failed to run assistant: {e}")
         return None
@@ -264,65 +264,9 @@ def _build_context_instructions(context: Dict[str, Any]) -> str:
     return ""
 
 
-def _wait_for_run_completion(thread_id: str, run_id: str, timeout: int = 30) -> Optional[str]:
-    """
-    Wait for an assistant run to complete and retrieve the response.
-
-    Args:
-        thread_id: OpenAI thread ID
-        run_id: Run ID
-        timeout: Maximum seconds to wait
-
-    Returns:
-        Assistant's response text, or None if timeout/error
-    """
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        try:
-            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
-
-            if run.status == "completed":
-                # Get the assistant's response
-                messages = client.beta.threads.messages.list(thread_id=thread_id, order="desc", limit=1)
-
-                if messages.data:
-                    message = messages.data[0]
-                    if message.role == "assistant" and message.content:
-                        # Extract text from content
-                        for content_block in message.content:
-                            if content_block.type == "text":
-                                return content_block.text.value
-
-                logging.warning("[assistant] Run completed but no assistant message found")
-                return None
-
-            elif run.status == "failed":
-                logging.error(f"[assistant] Run failed: {run.last_error}")
-                return None
-
-            elif run.status == "cancelled":
-                logging.warning("[assistant] Run was cancelled")
-                return None
-
-            elif run.status == "expired":
-                logging.warning("[assistant] Run expired")
-                return None
-
-            # Still in progress, wait a bit
-            time.sleep(0.5)
-
-        except Exception as e:
-            logging.error(f"[assistant] Error checking run status: {e}")
-            return None
-
-    logging.error(f"[assistant] Run timed out after {timeout}s")
-    return None
-
-
 # -------------------- High-Level Interface --------------------
 
-def generate_reply(
+async def generate_reply(
     conversation_id: str,
     guest_message: str,
     context: Dict[str, Any]
@@ -348,18 +292,18 @@ def generate_reply(
 
     try:
         # Get or create thread for this conversation
-        thread_id = get_or_create_thread(conversation_id)
+        thread_id = await get_or_create_thread(conversation_id)
         if not thread_id:
             logging.error("[assistant] Failed to get/create thread")
             return fallback
 
         # Add the guest's message to the thread
-        if not add_message_to_thread(thread_id, guest_message, role="user"):
+        if not await add_message_to_thread(thread_id, guest_message, role="user"):
             logging.error("[assistant] Failed to add message to thread")
             return fallback
 
         # Run the assistant and get response
-        response = run_assistant(thread_id, context)
+        response = await run_assistant(thread_id, context)
 
         if response:
             logging.info(f"[assistant] Generated reply for conversation {conversation_id}")
@@ -373,10 +317,12 @@ def generate_reply(
         return fallback
 
 
-def analyze_conversation_thread(conversation_id: str, messages: list) -> Tuple[str, str]:
+async def analyze_conversation_thread(conversation_id: str, messages: list) -> Tuple[str, str]:
     """
     Analyze a conversation thread to determine mood and summary.
-    Uses the assistant for consistency with reply generation.
+    One stateless Chat Completions call on the summary model (no assistant or
+    thread needed). Results are cached per message set; a few new messages
+    update the cached analysis instead of re-reading the whole conversation.
 
     Args:
         conversation_id: Hostaway conversation ID
@@ -385,57 +331,79 @@ def analyze_conversation_thread(conversation_id: str, messages: list) -> Tuple[s
     Returns:
         Tuple of (mood, summary)
     """
-    if not client or not ASSISTANT_ID:
+    if not client:
         return "Neutral", "No summary available."
 
     try:
-        # Build conversation text
-        conversation_text = "\n".join(
-            [f"{m.get('sender', 'Guest')}: {m.get('body', '')}" for m in messages]
-        )
+        result = await analysis_cache.get(str(conversation_id), messages)
+        if result:
+            return result
+    except Exception as e:
+        logging.error(f"[assistant] Error analyzing conversation: {e}")
 
-        # Create a temporary thread for analysis
-        thread = client.beta.threads.create()
-        thread_id = thread.id
+    return "Neutral", "No summary available."
 
-        # Add analysis request
-        client.beta.threads.messages.create(
-            thread_id=thread_id,
-            role="user",
-            content=f"""Analyze this guest conversation and provide:
+
+def _conversation_text(messages: list) -> str:
+    return "\n".join([f"{m.get('sender', 'Guest')}: {m.get('body', '')}" for m in messages])
+
+
+async def _analyze_full(messages: list) -> Optional[Tuple[str, str]]:
+    return await _run_analysis(f"""Analyze this guest conversation and provide:
 1. The guest's mood (one word: happy, confused, frustrated, excited, concerned, etc.)
 2. A brief summary (one sentence)
 
 Conversation:
-{conversation_text}
+{_conversation_text(messages)}
 
 Format your response as:
 Mood: [mood]
-Summary: [summary]"""
-        )
+Summary: [summary]""")
 
-        # Run assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=ASSISTANT_ID
-        )
 
-        # Get response
-        response_text = _wait_for_run_completion(thread_id, run.id)
+async def _analyze_incremental(previous: Tuple[str, str], new_messages: list) -> Optional[Tuple[str, str]]:
+    mood, summary = previous
+    return await _run_analysis(f"""Update the analysis of a guest conversation.
 
-        if response_text:
-            # Parse mood and summary
-            mood, summary = "Neutral", response_text
-            if "Mood:" in response_text and "Summary:" in response_text:
-                try:
-                    mood = response_text.split("Mood:")[1].split("Summary:")[0].strip()
-                    summary = response_text.split("Summary:")[1].strip()
-                except Exception:
-                    pass
+Previous analysis:
+Mood: {mood}
+Summary: {summary}
 
-            return mood, summary
+New messages since then:
+{_conversation_text(new_messages)}
 
-    except Exception as e:
-        logging.error(f"[assistant] Error analyzing conversation: {e}")
+Provide the guest's current mood (one word) and a one-sentence summary of the whole conversation.
 
-    return "Neutral", "No summary available."
+Format your response as:
+Mood: [mood]
+Summary: [summary]""")
+
+
+async def _run_analysis(content: str) -> Optional[Tuple[str, str]]:
+    """Run an analysis prompt and parse Mood/Summary."""
+    response_text = await chat_to_text(
+        client,
+        [
+            {"role": "system", "content": "You analyze guest conversations for a vacation rental host."},
+            {"role": "user", "content": content},
+        ],
+        route("summary").model,
+        label="analysis",
+        max_tokens=200,
+    )
+    if not response_text:
+        return None
+
+    # Parse mood and summary
+    mood, summary = "Neutral", response_text
+    if "Mood:" in response_text and "Summary:" in response_text:
+        try:
+            mood = response_text.split("Mood:")[1].split("Summary:")[0].strip()
+            summary = response_text.split("Summary:")[1].strip()
+        except Exception:
+            pass
+
+    return mood, summary
+
+
+analysis_cache = AnalysisCache(_analyze_full, _analyze_incremental)
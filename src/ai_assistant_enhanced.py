@@ -6,25 +6,41 @@ This version pulls real data from Hostaway API and responds in your voice.
 """
 
 import os
-import logging
 import time
+import asyncio
+import hashlib
+import logging
 from typing import Dict, Any, Optional, Tuple
-from openai import OpenAI
-
-from src.db import get_thread_id, save_thread_id
-from src.api_client import (
-    fetch_hostaway_reservation,
-    fetch_hostaway_listing,
-    fetch_hostaway_conversation
+from openai import AsyncOpenAI
+
+from ai.prompt_builder import Section, assemble_sections
+from src.assistant_runs import chat_to_text, run_assistant_to_text
+from src.conversation_context import (
+    CONTEXT_TOKEN_BUDGET,
+    build_compact_history,
+    legacy_layout_tokens,
+    record_usage,
+    truncation_strategy,
 )
+from src.db import get_assistant_record, get_thread_id, save_assistant_record, save_thread_id
+from src.model_router import atimed_create, route
+from src.request_context import GuestMessageContext
+from src.section_cache import SectionCache, content_version
+from src.tokens import count_tokens, truncate_tokens
 
 # Initialize OpenAI client
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
 # Assistant configuration
 ASSISTANT_ID = None
+ASSISTANT_NAME = "Hostaway Smart Reply (Your Voice)"
+ASSISTANT_INIT_WAIT = 5  # seconds a reply waits for background initialization
+ASSISTANT_INIT_RETRY = 30  # seconds between initialization attempts after a failure
+_init_task: Optional[asyncio.Task] = None
+_init_started_at = 0.0
 ASSISTANT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+REPLY_ENGINE = os.getenv("REPLY_ENGINE", "assistants")  # assistants | chat
 
 # Your personal voice and business context
 YOUR_VOICE_INSTRUCTIONS = """
@@ -111,9 +127,64 @@ Remember: You ARE the host. The guest is talking to YOU, not an AI assistant.
 
 # -------------------- Assistant Management --------------------
 
-def initialize_enhanced_assistant() -> Optional[str]:
+def _instructions_hash() -> str:
+    """Changes whenever the assistant would be created differently."""
+    spec = f"{ASSISTANT_NAME}\n{ASSISTANT_MODEL}\n{YOUR_VOICE_INSTRUCTIONS}"
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()
+
+
+def start_assistant_initialization() -> Optional[str]:
+    """
+    Non-blocking startup: use the assistant persisted on disk right away (if
+    its instructions are unchanged) and verify/create/update it in the background.
+
+    Returns:
+        The assistant id already usable, or None until the background task sets it
+    """
+    global ASSISTANT_ID
+    record = get_assistant_record(ASSISTANT_NAME)
+    if not os.getenv("OPENAI_ASSISTANT_ID") and record and record["instructions_hash"] == _instructions_hash():
+        ASSISTANT_ID = record["assistant_id"]
+        logging.info(f"[assistant] Using persisted assistant: {ASSISTANT_ID}")
+    if client:
+        _start_init_task()
+    return ASSISTANT_ID
+
+
+def _start_init_task() -> None:
+    global _init_task, _init_started_at
+    _init_started_at = time.monotonic()
+    _init_task = asyncio.create_task(initialize_enhanced_assistant())
+
+
+async def ensure_assistant(timeout: float = ASSISTANT_INIT_WAIT) -> Optional[str]:
+    """
+    ASSISTANT_ID, waiting up to timeout for background initialization if it isn't set yet.
+
+    A finished initialization that left no assistant (API down at startup) is
+    started again, at most once per ASSISTANT_INIT_RETRY seconds.
+    """
+    if ASSISTANT_ID or _init_task is None:
+        return ASSISTANT_ID
+    if _init_task.done():
+        if time.monotonic() - _init_started_at < ASSISTANT_INIT_RETRY:
+            return ASSISTANT_ID
+        logging.info("[assistant] Previous initialization failed - retrying")
+        _start_init_task()
+    try:
+        await asyncio.wait_for(asyncio.shield(_init_task), timeout)
+    except Exception as e:
+        logging.warning(f"[assistant] Still initializing after {timeout}s: {e!r}")
+    return ASSISTANT_ID
+
+
+async def initialize_enhanced_assistant() -> Optional[str]:
     """
     Initialize or retrieve the enhanced OpenAI Assistant with your voice.
+
+    Order: OPENAI_ASSISTANT_ID, then the assistant persisted on disk (updated
+    in place if the instructions changed), then a new assistant. The result is
+    persisted with the instructions hash, so restarts don't create new ones.
     """
     global ASSISTANT_ID
 
@@ -121,30 +192,51 @@ def initialize_enhanced_assistant() -> Optional[str]:
         logging.error("[assistant] OpenAI client not initialized - check OPENAI_API_KEY")
         return None
 
+    instructions_hash = _instructions_hash()
     try:
         # Check if we have an assistant ID stored
         stored_assistant_id = os.getenv("OPENAI_ASSISTANT_ID")
 
         if stored_assistant_id:
             try:
-                assistant = client.beta.assistants.retrieve(stored_assistant_id)
+                assistant = await client.beta.assistants.retrieve(stored_assistant_id)
                 ASSISTANT_ID = assistant.id
                 logging.info(f"[assistant] Using existing assistant: {ASSISTANT_ID}")
                 return ASSISTANT_ID
             except Exception as e:
                 logging.warning(f"[assistant] Stored assistant not found: {e}")
 
+        record = await asyncio.to_thread(get_assistant_record, ASSISTANT_NAME)
+        if record:
+            try:
+                if record["instructions_hash"] == instructions_hash:
+                    assistant = await client.beta.assistants.retrieve(record["assistant_id"])
+                    logging.info(f"[assistant] Persisted assistant verified: {assistant.id}")
+                else:
+                    assistant = await client.beta.assistants.update(
+                        record["assistant_id"],
+                        name=ASSISTANT_NAME,
+                        instructions=YOUR_VOICE_INSTRUCTIONS,
+                        model=ASSISTANT_MODEL,
+                    )
+                    logging.info(f"[assistant] Instructions changed - updated assistant {assistant.id}")
+                ASSISTANT_ID = assistant.id
+                await asyncio.to_thread(save_assistant_record, ASSISTANT_NAME, ASSISTANT_ID, instructions_hash)
+                return ASSISTANT_ID
+            except Exception as e:
+                logging.warning(f"[assistant] Persisted assistant unusable, creating a new one: {e}")
+
         # Create new assistant with enhanced instructions
-        assistant = client.beta.assistants.create(
-            name="Hostaway Smart Reply (Your Voice)",
+        assistant = await client.beta.assistants.create(
+            name=ASSISTANT_NAME,
             instructions=YOUR_VOICE_INSTRUCTIONS,
             model=ASSISTANT_MODEL,
             tools=[],
         )
 
         ASSISTANT_ID = assistant.id
-        logging.info(f"[assistant] Created new assistant: {ASSISTANT_ID}")
-        logging.warning(f"[assistant] Set OPENAI_ASSISTANT_ID={ASSISTANT_ID} in environment")
+        await asyncio.to_thread(save_assistant_record, ASSISTANT_NAME, ASSISTANT_ID, instructions_hash)
+        logging.info(f"[assistant] Created new assistant: {ASSISTANT_ID} (persisted)")
 
         return ASSISTANT_ID
 
@@ -155,223 +247,302 @@ def initialize_enhanced_assistant() -> Optional[str]:
 
 # -------------------- Context Building --------------------
 
-def build_rich_context(context: Dict[str, Any]) -> str:
+# Listing fields build_listing_context reads; without an updatedOn the cache version hashes these
+LISTING_CONTEXT_FIELDS = (
+    "name", "address", "city", "state", "bedroomsNumber", "bedsNumber", "bathroomsNumber",
+    "personCapacity", "roomType", "checkInTimeStart", "checkInTimeEnd", "checkOutTime",
+    "wifiUsername", "wifiPassword", "specialInstruction", "keyPickup", "doorSecurityCode", "houseRules",
+)
+listing_context_cache = SectionCache("rich_context_listing")
+
+
+def build_listing_section(listing_id: Any, prop: Dict[str, Any]) -> Section:
     """
-    Build comprehensive context from Hostaway data.
-    This fetches real listing and reservation details.
+    The PROPERTY DETAILS block as a static prompt section, formatted and
+    token-counted once per listing update (its updatedOn; a hash of the
+    fields it reads if Hostaway didn't send one).
     """
+    if not prop:
+        return Section("listing", "", priority=2, static=True, tokens=0)
+    version = prop.get("updatedOn") or content_version(
+        [prop.get(field) for field in LISTING_CONTEXT_FIELDS], len(prop.get("listingAmenities") or [])
+    )
+
+    def build() -> Section:
+        text = _format_listing_context(prop)
+        return Section("listing", text, priority=2, static=True, tokens=count_tokens(text))
+
+    return listing_context_cache.get(str(listing_id), version, build)
+
+
+def build_listing_context(listing_id: Any, prop: Dict[str, Any]) -> str:
+    """The PROPERTY DETAILS block (see build_listing_section)."""
+    return build_listing_section(listing_id, prop).text
+
+
+def _format_listing_context(prop: Dict[str, Any]) -> str:
     parts = []
+    parts.append("=== PROPERTY DETAILS ===")
+    parts.append(f"Property: {prop.get('name', 'N/A')}")
+    parts.append(f"Address: {prop.get('address', 'N/A')}")
+    parts.append(f"City: {prop.get('city', 'N/A')}, {prop.get('state', 'N/A')}")
     
-    # === RESERVATION DETAILS ===
-    reservation_id = context.get("reservation_id")
-    if reservation_id:
-        try:
-            res_data = fetch_hostaway_reservation(reservation_id)
-            if res_data and res_data.get("result"):
-                r = res_data["result"]
-                
-                parts.append("=== CURRENT RESERVATION ===")
-                parts.append(f"Guest: {r.get('guestFirstName', '')} {r.get('guestLastName', '')}")
-                parts.append(f"Email: {r.get('guestEmail', '')}")
-                parts.append(f"Check-in: {r.get('arrivalDate', '')}")
-                parts.append(f"Check-out: {r.get('departureDate', '')}")
-                parts.append(f"Guests: {r.get('numberOfGuests', 'N/A')}")
-                parts.append(f"Status: {r.get('status', 'N/A')}")
-                parts.append(f"Total Price: {r.get('currency', '')} {r.get('totalPrice', 'N/A')}")
-                
-                # Important notes
-                if r.get('guestNote'):
-                    parts.append(f"Guest Note: {r['guestNote']}")
-                if r.get('doorCode'):
-                    parts.append(f"Door Code: {r['doorCode']}")
-                if r.get('phone'):
-                    parts.append(f"Phone: {r['phone']}")
-                
-                # Store listing_id for next section
-                context['listing_id'] = r.get('listingMapId')
-        except Exception as e:
-            logging.error(f"Error fetching reservation: {e}")
+    # Key property features
+    parts.append(f"Bedrooms: {prop.get('bedroomsNumber', 'N/A')}")
+    parts.append(f"Beds: {prop.get('bedsNumber', 'N/A')}")
+    parts.append(f"Bathrooms: {prop.get('bathroomsNumber', 'N/A')}")
+    parts.append(f"Max Guests: {prop.get('personCapacity', 'N/A')}")
+    parts.append(f"Room Type: {prop.get('roomType', 'N/A')}")
+    
+    # Check-in/out times
+    check_in_start = prop.get('checkInTimeStart')
+    check_in_end = prop.get('checkInTimeEnd')
+    check_out = prop.get('checkOutTime')
+    
+    if check_in_start is not None:
+        parts.append(f"Check-in: {check_in_start}:00 - {check_in_end}:00" if check_in_end else f"Check-in: After {check_in_start}:00")
+    if check_out is not None:
+        parts.append(f"Check-out: {check_out}:00")
+    
+    # WiFi
+    if prop.get('wifiUsername') or prop.get('wifiPassword'):
+        wifi_info = []
+        if prop.get('wifiUsername'):
+            wifi_info.append(f"Network: {prop['wifiUsername']}")
+        if prop.get('wifiPassword'):
+            wifi_info.append(f"Password: {prop['wifiPassword']}")
+        parts.append(f"WiFi: {' | '.join(wifi_info)}")
     
-    # === LISTING/PROPERTY DETAILS ===
-    listing_id = context.get("listing_id")
-    if listing_id:
-        try:
-            listing_data = fetch_hostaway_listing(listing_id)
-            if listing_data and listing_data.get("result"):
-                prop = listing_data["result"]
-                
-                parts.append("\n=== PROPERTY DETAILS ===")
-                parts.append(f"Property: {prop.get('name', 'N/A')}")
-                parts.append(f"Address: {prop.get('address', 'N/A')}")
-                parts.append(f"City: {prop.get('city', 'N/A')}, {prop.get('state', 'N/A')}")
-                
-                # Key property features
-                parts.append(f"Bedrooms: {prop.get('bedroomsNumber', 'N/A')}")
-                parts.append(f"Beds: {prop.get('bedsNumber', 'N/A')}")
-                parts.append(f"Bathrooms: {prop.get('bathroomsNumber', 'N/A')}")
-                parts.append(f"Max Guests: {prop.get('personCapacity', 'N/A')}")
-                parts.append(f"Room Type: {prop.get('roomType', 'N/A')}")
-                
-                # Check-in/out times
-                check_in_start = prop.get('checkInTimeStart')
-                check_in_end = prop.get('checkInTimeEnd')
-                check_out = prop.get('checkOutTime')
-                
-                if check_in_start is not None:
-                    parts.append(f"Check-in: {check_in_start}:00 - {check_in_end}:00" if check_in_end else f"Check-in: After {check_in_start}:00")
-                if check_out is not None:
-                    parts.append(f"Check-out: {check_out}:00")
-                
-                # WiFi
-                if prop.get('wifiUsername') or prop.get('wifiPassword'):
-                    wifi_info = []
-                    if prop.get('wifiUsername'):
-                        wifi_info.append(f"Network: {prop['wifiUsername']}")
-                    if prop.get('wifiPassword'):
-                        wifi_info.append(f"Password: {prop['wifiPassword']}")
-                    parts.append(f"WiFi: {' | '.join(wifi_info)}")
-                
-                # Special instructions
-                if prop.get('specialInstruction'):
-                    parts.append(f"Special Instructions: {prop['specialInstruction']}")
-                if prop.get('keyPickup'):
-                    parts.append(f"Key Pickup: {prop['keyPickup']}")
-                if prop.get('doorSecurityCode'):
-                    parts.append(f"Door Code: {prop['doorSecurityCode']}")
-                
-                # House rules
-                if prop.get('houseRules'):
-                    parts.append(f"House Rules: {prop['houseRules']}")
-                
-                # Amenities (if available)
-                if prop.get('listingAmenities'):
-                    amenity_count = len(prop['listingAmenities'])
-                    parts.append(f"Amenities: {amenity_count} available")
-                    # You can fetch full amenity names via /v1/amenities if needed
-                
-        except Exception as e:
-            logging.error(f"Error fetching listing: {e}")
+    # Special instructions
+    if prop.get('specialInstruction'):
+        parts.append(f"Special Instructions: {prop['specialInstruction']}")
+    if prop.get('keyPickup'):
+        parts.append(f"Key Pickup: {prop['keyPickup']}")
+    if prop.get('doorSecurityCode'):
+        parts.append(f"Door Code: {prop['doorSecurityCode']}")
+    
+    # House rules
+    if prop.get('houseRules'):
+        parts.append(f"House Rules: {prop['houseRules']}")
+    
+    # Amenities (if available)
+    if prop.get('listingAmenities'):
+        amenity_count = len(prop['listingAmenities'])
+        parts.append(f"Amenities: {amenity_count} available")
+        # You can fetch full amenity names via /v1/amenities if needed
+
+    return "\n".join(parts)
+
+
+def build_reservation_context(r: Optional[Dict[str, Any]]) -> str:
+    """The CURRENT RESERVATION block."""
+    if not r:
+        return ""
+    parts = ["=== CURRENT RESERVATION ==="]
+    parts.append(f"Guest: {r.get('guestFirstName', '')} {r.get('guestLastName', '')}")
+    parts.append(f"Email: {r.get('guestEmail', '')}")
+    parts.append(f"Check-in: {r.get('arrivalDate', '')}")
+    parts.append(f"Check-out: {r.get('departureDate', '')}")
+    parts.append(f"Guests: {r.get('numberOfGuests', 'N/A')}")
+    parts.append(f"Status: {r.get('status', 'N/A')}")
+    parts.append(f"Total Price: {r.get('currency', '')} {r.get('totalPrice', 'N/A')}")
+
+    # Important notes
+    if r.get('guestNote'):
+        parts.append(f"Guest Note: {r['guestNote']}")
+    if r.get('doorCode'):
+        parts.append(f"Door Code: {r['doorCode']}")
+    if r.get('phone'):
+        parts.append(f"Phone: {r['phone']}")
+    return "\n".join(parts)
+
+
+def build_rich_context(ctx: GuestMessageContext, include_messages: bool = True) -> str:
+    """
+    Build comprehensive context from Hostaway data.
+    Uses the reservation, listing and messages already loaded for this webhook.
+    Set include_messages=False when the prompt carries its own history.
+
+    Most stable first (listing, then reservation, then messages), so prompts
+    for the same listing share a prefix the provider can cache.
+    """
+    parts = []
     
+    # === LISTING/PROPERTY DETAILS === (compiled once per listing version)
+    listing_context = build_listing_context(ctx.listing_id, ctx.listing)
+    if listing_context:
+        parts.append(listing_context)
+
+    # === RESERVATION DETAILS ===
+    reservation_context = build_reservation_context(ctx.reservation)
+    if reservation_context:
+        parts.append("\n" + reservation_context)
+
     # === CONVERSATION CONTEXT ===
-    conversation_id = context.get("conversation_id")
-    if conversation_id:
-        try:
-            conv_data = fetch_hostaway_conversation(conversation_id)
-            if conv_data and conv_data.get("result"):
-                conv = conv_data["result"]
-                
-                # Get recent messages for context
-                messages = conv.get("conversationMessages", [])
-                if messages:
-                    parts.append("\n=== RECENT CONVERSATION ===")
-                    # Show last 5 messages
-                    for msg in messages[-5:]:
-                        sender = "Guest" if msg.get("isIncoming") else "You (Host)"
-                        body = msg.get("body", "")[:200]  # Limit length
-                        parts.append(f"{sender}: {body}")
-        except Exception as e:
-            logging.error(f"Error fetching conversation: {e}")
+    if include_messages and ctx.messages:
+        parts.append("\n=== RECENT CONVERSATION ===")
+        # Show last 5 messages
+        for msg in ctx.messages[-5:]:
+            sender = "Guest" if msg.get("isIncoming") else "You (Host)"
+            body = truncate_tokens(msg.get("body", ""), 50)  # Limit length
+            parts.append(f"{sender}: {body}")
     
     return "\n".join(parts) if parts else ""
 
 
 # -------------------- Reply Generation --------------------
 
-def generate_smart_reply(
-    conversation_id: str,
-    guest_message: str,
-    context: Dict[str, Any]
+async def generate_smart_reply(
+    ctx: GuestMessageContext,
+    engine: Optional[str] = None,
+    intent: Optional[str] = None,
+    mood: Optional[str] = None,
 ) -> str:
     """
-    Generate a reply using the enhanced assistant with FULL conversation history.
+    Generate a reply in your voice from a compact conversation history
+    (rolling summary + recent messages, see src/conversation_context.py).
+
+    Args:
+        ctx: Request-scoped context already loaded for this webhook
+        engine: "assistants" (persistent thread + run) or "chat" (one stateless
+            Chat Completions call); defaults to REPLY_ENGINE
+        intent: Known intent, if any (model routing escalates sensitive ones)
+        mood: Guest's last known mood, if any (negative moods escalate)
     """
     fallback = "Thanks for reaching out! Let me look into that and get back to you shortly."
+    engine = engine or REPLY_ENGINE
 
-    if not client or not ASSISTANT_ID:
+    if not client or (engine == "assistants" and not await ensure_assistant()):
         logging.warning("[assistant] Assistant not initialized")
         return fallback
 
-    try:
-        # Get or create thread
-        thread_id = get_or_create_thread(conversation_id)
-        if not thread_id:
-            logging.error("[assistant] Failed to get/create thread")
-            return fallback
+    conversation_id = str(ctx.conversation_id)
 
-        # 🆕 FETCH FULL CONVERSATION HISTORY FROM HOSTAWAY
-        from src.api_client import fetch_conversation_messages
-        
-        messages = fetch_conversation_messages(int(conversation_id))
-        conversation_history = format_conversation_history(messages)
-        
-        logging.info(f"[assistant] Loaded {len(messages)} messages from Hostaway")
+    try:
+        prompt = await build_reply_prompt(ctx)
+        model = route("reply", ctx.guest_message, intent=intent, mood=mood).model
+
+        if engine == "chat":
+            response = await chat_to_text(
+                client,
+                [
+                    {"role": "system", "content": YOUR_VOICE_INSTRUCTIONS},
+                    {"role": "user", "content": prompt},
+                ],
+                model,
+                label="reply",
+                temperature=0.7,
+            )
+        else:
+            response = await _reply_via_assistant(conversation_id, prompt, model)
 
-        # Build rich context from Hostaway API
-        rich_context = build_rich_context(context)
-        
-        # Combine everything
-        full_message = f"""{conversation_history}
+        if response:
+            logging.info(f"[assistant] Generated reply for conversation {conversation_id} via {engine}")
+            return response
+        else:
+            logging.error("[assistant] Failed to get response")
+            return fallback
 
-{rich_context}
+    except Exception as e:
+        logging.error(f"[assistant] Error generating reply: {e}")
+        return fallback
 
-=== GUEST'S NEW MESSAGE (needs reply) ===
-{guest_message}
 
----
-IMPORTANT CONTEXT:
+REPLY_GUIDANCE = """IMPORTANT CONTEXT:
 - You are responding as the property manager/host
-- The conversation history above shows ALL previous messages
+- The summary and recent messages below cover the conversation so far
 - Consider the full context when crafting your reply
 - Reference earlier topics if relevant
 - Keep your reply natural and conversational
-- Use REAL information from the context above
+- Use REAL information from the context above"""
 
-Remember: You are the HOST responding to this guest. No placeholders - use actual details."""
 
-        # Add message to thread
-        client.beta.threads.messages.create(
-            thread_id=thread_id,
-            role="user",
-            content=full_message
-        )
+async def build_reply_prompt(ctx: GuestMessageContext) -> str:
+    """
+    Assemble the reply prompt within CONTEXT_TOKEN_BUDGET (ai/prompt_builder.assemble_sections,
+    which logs the per-section token report and keeps totals for admin metrics).
 
-        # Run assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread_id,
-            assistant_id=ASSISTANT_ID
-        )
+    Layout is static-first for provider prompt caching: listing facts,
+    reservation facts and the fixed guidance form a prefix that repeats across
+    calls; the conversation history and the new message come last.
+    """
+    guest_message = ctx.guest_message
 
-        # Wait for completion
-        response = _wait_for_run_completion(thread_id, run.id)
+    listing = build_listing_section(ctx.listing_id, ctx.listing)
+    reservation_context = build_reservation_context(ctx.reservation)
+    new_message = f"""=== GUEST'S NEW MESSAGE (needs reply) ===
+{guest_message}
 
-        if response:
-            logging.info(f"[assistant] Generated reply for conversation {conversation_id}")
-            return response
-        else:
-            logging.error("[assistant] Failed to get response")
-            return fallback
+Remember: You are the HOST responding to this guest. No placeholders - use actual details."""
 
-    except Exception as e:
-        logging.error(f"[assistant] Error generating reply: {e}")
-        return fallback
+    fixed_tokens = listing.tokens + sum(count_tokens(text) for text in (reservation_context, REPLY_GUIDANCE, new_message))
+    # Rolling summary + last few messages, instead of the full history every time
+    conversation_history = await build_compact_history(
+        ctx.conversation_id,
+        ctx.messages,
+        guest_message=guest_message,
+        reserved_tokens=fixed_tokens,
+    )
+
+    # The listing block (cached, token count included) leads; the rest joins with blank lines
+    sections = [listing]
+    separator = "\n\n" if listing.text else ""
+    for name, text, priority in (
+        ("reservation", reservation_context, 1),
+        ("guidance", REPLY_GUIDANCE, 0),
+        ("history", conversation_history, 3),
+        ("guest_message", new_message, 0),
+    ):
+        if text:
+            text, separator = separator + text, "\n\n"
+        sections.append(Section(name, text, priority, keep="tail" if name == "history" else "head"))
+    prompt, report = assemble_sections(sections, CONTEXT_TOKEN_BUDGET)
+
+    record_usage(
+        ctx.conversation_id,
+        sum(row["tokens"] for row in report),
+        legacy_layout_tokens(ctx.messages, fixed_tokens),
+    )
+    return prompt
+
+
+async def _reply_via_assistant(conversation_id: str, prompt: str, model: Optional[str] = None) -> Optional[str]:
+    """Append the prompt to the conversation's thread and run the assistant on it (on `model` if given)."""
+    thread_id = await get_or_create_thread(conversation_id)
+    if not thread_id:
+        logging.error("[assistant] Failed to get/create thread")
+        return None
+
+    await client.beta.threads.messages.create(
+        thread_id=thread_id,
+        role="user",
+        content=prompt
+    )
+
+    # Run assistant (streams; resolves as soon as the reply text is complete).
+    # It reads only the message just added - that already carries the history.
+    run_params: Dict[str, Any] = {"truncation_strategy": truncation_strategy()}
+    if model:
+        run_params["model"] = model
+    return await run_assistant_to_text(client, thread_id, ASSISTANT_ID, label="reply", **run_params)
 
 
 # -------------------- Helper Functions --------------------
 
-def get_or_create_thread(conversation_id: str) -> Optional[str]:
+async def get_or_create_thread(conversation_id: str) -> Optional[str]:
     """Get or create OpenAI thread for conversation."""
     if not client:
         return None
 
-    thread_id = get_thread_id(conversation_id)
+    thread_id = await asyncio.to_thread(get_thread_id, conversation_id)
     if thread_id:
         logging.info(f"[assistant] Using thread {thread_id}")
         return thread_id
 
     try:
-        thread = client.beta.threads.create()
+        thread = await client.beta.threads.create()
         thread_id = thread.id
-        save_thread_id(conversation_id, thread_id)
+        await asyncio.to_thread(save_thread_id, conversation_id, thread_id)
         logging.info(f"[assistant] Created thread {thread_id}")
         return thread_id
     except Exception as e:
@@ -379,43 +550,6 @@ def get_or_create_thread(conversation_id: str) -> Optional[str]:
         return None
 
 
-def _wait_for_run_completion(thread_id: str, run_id: str, timeout: int = 30) -> Optional[str]:
-    """Wait for assistant run to complete and return response."""
-    start_time = time.time()
-
-    while time.time() - start_time < timeout:
-        try:
-            run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
-
-            if run.status == "completed":
-                messages = client.beta.threads.messages.list(
-                    thread_id=thread_id,
-                    order="desc",
-                    limit=1
-                )
-
-                if messages.data:
-                    message = messages.data[0]
-                    if message.role == "assistant" and message.content:
-                        for content_block in message.content:
-                            if content_block.type == "text":
-                                return content_block.text.value
-
-                return None
-
-            elif run.status in ["failed", "cancelled", "expired"]:
-                logging.error(f"[assistant] Run {run.status}: {getattr(run, 'last_error', 'N/A')}")
-                return None
-
-            time.sleep(0.5)
-
-        except Exception as e:
-            logging.error(f"[assistant] Error checking run: {e}")
-            return None
-
-    logging.error(f"[assistant] Run timed out after {timeout}s")
-    return None
-
 def format_conversation_history(messages: list) -> str:
     """
     Format Hostaway messages into readable conversation history.
@@ -447,7 +581,7 @@ def format_conversation_history(messages: list) -> str:
     return "\n".join(lines)
 
 
-def analyze_conversation_mood_and_summary(messages: list) -> tuple:
+async def analyze_conversation_mood_and_summary(messages: list) -> tuple:
     """
     Analyze conversation history to determine mood and summary.
     Uses OpenAI to intelligently assess the conversation.
@@ -470,8 +604,9 @@ def analyze_conversation_mood_and_summary(messages: list) -> tuple:
     
     try:
         # Use a simple completion (not assistant) for analysis
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = await atimed_create(
+            client.chat.completions.create,
+            route("summary").model,
             messages=[
                 {
                     "role": "system",
@@ -4,12 +4,12 @@ import logging
 from typing import List, Dict, Any
 from openai import OpenAI
 from openai import AsyncOpenAI
-import os
+
+from src.model_router import atimed_create, route, timed_create
 
 openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
 
@@ -36,8 +36,9 @@ Write a helpful reply:
 """
 
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
+        resp = timed_create(
+            client.chat.completions.create,
+            route("reply", guest_message).model,
             messages=[
                 {"role": "system", "content": sys_prompt},
                 {"role": "user", "content": user_prompt},
@@ -111,8 +112,9 @@ USER'S IMPROVEMENT REQUEST:
 Please rewrite the reply following the user's instructions exactly:"""
 
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
+        resp = timed_create(
+            client.chat.completions.create,
+            route("rewrite", guest_message).model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
@@ -139,8 +141,9 @@ def rewrite_tone(text: str, tone: str = "friendly") -> str:
     )
 
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
+        resp = timed_create(
+            client.chat.completions.create,
+            route("rewrite", text).model,
             messages=[
                 {"role": "system", "content": sys},
                 {"role": "user", "content": text},
@@ -174,8 +177,9 @@ Rewrite with a {tone} tone:
 """
 
     try:
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
+        resp = timed_create(
+            client.chat.completions.create,
+            route("rewrite", guest_message).model,
             messages=[
                 {"role": "system", "content": sys_prompt},
                 {"role": "user", "content": user_prompt},
@@ -198,8 +202,9 @@ async def analyze_conversation_thread(thread: list):
         )
 
         # 🔹 Await the async call correctly
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o-mini",
+        response = await atimed_create(
+            openai_client.chat.completions.create,
+            route("summary").model,
             messages=[
                 {"role": "system", "content": "You are an assistant analyzing Airbnb guest conversations."},
                 {"role": "user", "content": f"Analyze this conversation and provide:\n1. The guest's mood (e.g., happy, confused, frustrated).\n2. A short summary.\n\nConversation:\n{conversation_text}"}
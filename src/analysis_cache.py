@@ -0,0 +1,135 @@
+# file: src/analysis_cache.py
+"""
+Mood/Summary Analysis Cache
+---------------------------
+Handles:
+- Caching each conversation's mood/summary under a fingerprint (hash of the
+  message ids and bodies analysed), so duplicate webhooks and re-posts reuse it
+- Incremental updates: when only a few messages arrived since the last
+  analysis, the model gets the previous mood/summary plus just those
+- Single-flight: concurrent requests for the same conversation and
+  fingerprint share one call
+- Hit rate and model calls saved, for admin metrics
+"""
+
+import os
+import asyncio
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.single_flight import single_flight
+
+ANALYSIS_CACHE_MAX = int(os.getenv("ANALYSIS_CACHE_MAX", "1000"))  # Conversations kept
+ANALYSIS_INCREMENTAL_MAX = 3  # New messages folded incrementally; more means a full re-analysis
+
+Analysis = Tuple[str, str]  # (mood, summary)
+FullAnalyzer = Callable[[List[Dict[str, Any]]], Awaitable[Optional[Analysis]]]
+IncrementalAnalyzer = Callable[[Analysis, List[Dict[str, Any]]], Awaitable[Optional[Analysis]]]
+
+
+def message_key(message: Dict[str, Any]) -> str:
+    """Identity of one message: id plus a hash of its body (edits count as changes)."""
+    body = (message.get("body") or "").encode("utf-8")
+    return f"{message.get('id')}:{hashlib.sha1(body).hexdigest()[:12]}"
+
+
+def fingerprint(messages: List[Dict[str, Any]]) -> str:
+    """Hash of the message set being analysed."""
+    return hashlib.sha1("|".join(message_key(m) for m in messages).encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """Per-conversation mood/summary keyed by message-set fingerprint."""
+
+    def __init__(self, full: FullAnalyzer, incremental: IncrementalAnalyzer, max_size: int = ANALYSIS_CACHE_MAX):
+        self.full = full
+        self.incremental = incremental
+        self.max_size = max_size
+        # conversation_id -> {"fingerprint", "last_key", "result"}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}  # (conversation_id, fingerprint)
+        self._stats: Counter = Counter()
+
+    async def get(self, conversation_id: str, messages: List[Dict[str, Any]]) -> Optional[Analysis]:
+        """
+        Mood/summary for this exact message set, computing only what's new.
+
+        Returns:
+            (mood, summary), or None if the model call failed (nothing cached)
+        """
+        fp = fingerprint(messages)
+        entry = self._entries.get(conversation_id)
+        if entry and entry["fingerprint"] == fp:
+            self._entries.move_to_end(conversation_id)
+            self._stats["hits"] += 1
+            return entry["result"]
+
+        async def compute() -> Optional[Analysis]:
+            result = await self._compute(entry, messages)
+            if result:
+                self._store(conversation_id, fp, messages, result)
+            return result
+
+        return await single_flight(self._inflight, (conversation_id, fp), compute, self._count_coalesced)
+
+    def _count_coalesced(self) -> None:
+        self._stats["coalesced"] += 1
+
+    async def _compute(self, entry: Optional[Dict[str, Any]], messages: List[Dict[str, Any]]) -> Optional[Analysis]:
+        new = self._new_since(entry, messages)
+        if new:
+            self._stats["incremental"] += 1
+            result = await self.incremental(entry["result"], new)
+            if result:
+                return result
+            self._stats["incremental_failures"] += 1
+        self._stats["full"] += 1
+        return await self.full(messages)
+
+    @staticmethod
+    def _new_since(entry: Optional[Dict[str, Any]], messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Messages after the last analysed one, if few enough to fold incrementally."""
+        if not entry:
+            return []
+        keys = [message_key(m) for m in messages]
+        # Search from the end: the history window slides, so the start moves
+        for i in range(len(keys) - 1, -1, -1):
+            if keys[i] == entry["last_key"]:
+                new = messages[i + 1:]
+                return new if 0 < len(new) <= ANALYSIS_INCREMENTAL_MAX else []
+        return []
+
+    def _store(self, conversation_id: str, fp: str, messages: List[Dict[str, Any]], result: Analysis) -> None:
+        self._entries[conversation_id] = {
+            "fingerprint": fp,
+            "last_key": message_key(messages[-1]) if messages else "",
+            "result": result,
+        }
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def put(self, conversation_id: str, messages: List[Dict[str, Any]], result: Analysis) -> None:
+        """Store a mood/summary produced elsewhere (e.g. the combined reply call) for this message set."""
+        self._store(conversation_id, fingerprint(messages), messages, result)
+
+    def peek(self, conversation_id: str) -> Optional[Analysis]:
+        """Last stored mood/summary for the conversation (any message set), without computing."""
+        entry = self._entries.get(conversation_id)
+        return entry["result"] if entry else None
+
+    def stats(self) -> Dict[str, Any]:
+        computed = self._stats["incremental"] + self._stats["full"] - self._stats["incremental_failures"]
+        lookups = self._stats["hits"] + self._stats["coalesced"] + computed
+        saved = self._stats["hits"] + self._stats["coalesced"]
+        return {
+            "size": len(self._entries),
+            "hits": self._stats["hits"],
+            "coalesced": self._stats["coalesced"],
+            "incremental": self._stats["incremental"],
+            "incremental_failures": self._stats["incremental_failures"],
+            "full": self._stats["full"],
+            "hit_rate": round(saved / lookups, 3) if lookups else 0.0,
+            "model_calls_saved": saved,
+        }
@@ -4,36 +4,46 @@ API Client for Hostaway Integration
 Handles:
 - Sending replies to guest conversations via Hostaway API
 - Fetching reservation, listing, and conversation data
+- All calls go through the shared pooled client in hostaway_http
 """
 
 import os
 import logging
-import requests
+from typing import Optional
 
-HOSTAWAY_API_BASE = os.getenv("HOSTAWAY_API_BASE", "https://api.hostaway.com/v1")
-HOSTAWAY_ACCESS_TOKEN = os.getenv("HOSTAWAY_ACCESS_TOKEN")
+from src.hostaway_http import hostaway_request, token_manager
+from src.ttl_cache import AsyncTTLCache
+
+# Listing cache: listings rarely change between guest messages
+LISTING_CACHE_TTL = float(os.getenv("LISTING_CACHE_TTL", "900"))              # fresh for 15 min
+LISTING_CACHE_STALE_TTL = float(os.getenv("LISTING_CACHE_STALE_TTL", "3600"))  # then served stale while refreshing
+LISTING_CACHE_MAX = int(os.getenv("LISTING_CACHE_MAX", "500"))
+
+# Reservation cache: kept current by reservation webhooks (see reservation_events);
+# the TTL is only a safety net for missed events
+RESERVATION_CACHE_TTL = float(os.getenv("RESERVATION_CACHE_TTL", "3600"))
+RESERVATION_CACHE_MAX = int(os.getenv("RESERVATION_CACHE_MAX", "2000"))
 
 
 # ---------------------------------------------------------------------
 # Send Reply
 # ---------------------------------------------------------------------
-def send_hostaway_reply(conversation_id: int, message: str) -> bool:
+async def send_hostaway_reply(conversation_id: int, message: str) -> bool:
     """
     Sends a reply message to a Hostaway guest conversation.
     """
-    if not (HOSTAWAY_ACCESS_TOKEN and conversation_id and message):
-        logging.warning("[send_hostaway_reply] Missing token, conversation_id, or message.")
+    if not (token_manager.configured and conversation_id and message):
+        logging.warning("[send_hostaway_reply] Missing credentials, conversation_id, or message.")
         return False
 
-    url = f"{HOSTAWAY_API_BASE}/conversations/{conversation_id}/messages"
-    headers = {
-        "Authorization": f"Bearer {HOSTAWAY_ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
+    headers = {"Content-Type": "application/json"}
     payload = {"body": message}
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
+        resp = await hostaway_request(
+            "POST", f"/conversations/{conversation_id}/messages", "send_message",
+            headers=headers, json=payload,
+        )
         if resp.status_code == 200:
             logging.info(f"[Hostaway] Reply sent successfully to conversation {conversation_id}")
             return True
@@ -48,75 +58,75 @@ def send_hostaway_reply(conversation_id: int, message: str) -> bool:
 # ---------------------------------------------------------------------
 # Fetchers (for message_handler)
 # ---------------------------------------------------------------------
-def fetch_hostaway_reservation(reservation_id: int):
-    """Fetch reservation details by ID from Hostaway API."""
+async def fetch_hostaway_reservation(reservation_id: int):
+    """Fetch reservation details by ID (served from the reservation cache)."""
     if not reservation_id:
         return {}
-    url = f"{HOSTAWAY_API_BASE}/reservations/{reservation_id}"
-    headers = {"Authorization": f"Bearer {HOSTAWAY_ACCESS_TOKEN}"}
+    return await reservation_cache.get(str(reservation_id))
+
+
+async def _fetch_hostaway_reservation_uncached(reservation_id: str):
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        return resp.json()
+        resp = await hostaway_request("GET", f"/reservations/{reservation_id}", "reservation")
+        data = resp.json()
+        return data if resp.status_code == 200 and data.get("result") else {}
     except Exception as e:
         logging.error(f"[api_client] fetch_hostaway_reservation failed: {e}")
         return {}
 
 
-def fetch_hostaway_listing(listing_id: int):
-    """Fetch listing details by ID."""
+async def fetch_hostaway_listing(listing_id: int):
+    """Fetch listing details by ID (served from the listing cache)."""
     if not listing_id:
         return {}
-    url = f"{HOSTAWAY_API_BASE}/listings/{listing_id}"
-    headers = {"Authorization": f"Bearer {HOSTAWAY_ACCESS_TOKEN}"}
+    return await listing_cache.get(str(listing_id))
+
+
+async def _fetch_hostaway_listing_uncached(listing_id: str):
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        return resp.json()
+        resp = await hostaway_request("GET", f"/listings/{listing_id}", "listing")
+        data = resp.json()
+        # Only successful payloads are worth caching
+        return data if resp.status_code == 200 and data.get("result") else {}
     except Exception as e:
         logging.error(f"[api_client] fetch_hostaway_listing failed: {e}")
         return {}
 
 
-def fetch_hostaway_conversation(conversation_id: int):
-    """Fetch conversation thread by ID."""
-    if not conversation_id:
-        return {}
-    url = f"{HOSTAWAY_API_BASE}/conversations/{conversation_id}"
-    headers = {"Authorization": f"Bearer {HOSTAWAY_ACCESS_TOKEN}"}
-    try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        return resp.json()
-    except Exception as e:
-        logging.error(f"[api_client] fetch_hostaway_conversation failed: {e}")
-        return {}
+listing_cache = AsyncTTLCache(
+    "listings",
+    _fetch_hostaway_listing_uncached,
+    ttl=LISTING_CACHE_TTL,
+    stale_ttl=LISTING_CACHE_STALE_TTL,
+    max_size=LISTING_CACHE_MAX,
+)
+
+reservation_cache = AsyncTTLCache(
+    "reservations",
+    _fetch_hostaway_reservation_uncached,
+    ttl=RESERVATION_CACHE_TTL,
+    stale_ttl=0,
+    max_size=RESERVATION_CACHE_MAX,
+    version=lambda payload: (payload.get("result") or {}).get("updatedOn"),
+)
 
-def fetch_conversation_messages(conversation_id: int, limit: int = 50) -> list:
+
+async def fetch_conversation_messages_page(conversation_id: int, limit: int, offset: int = 0) -> Optional[list]:
     """
-    Fetch all messages from a Hostaway conversation.
-    
-    Returns list of messages sorted by date (oldest first).
+    Fetch one page of a conversation's messages, newest first (Hostaway's order).
+
+    Returns:
+        The page's messages, or None if the request failed
     """
-    url = f"{HOSTAWAY_API_BASE}/conversations/{conversation_id}/messages"
-    headers = {"Authorization": f"Bearer {HOSTAWAY_ACCESS_TOKEN}"}
-    
     try:
-        response = requests.get(
-            url, 
-            headers=headers,
-            params={"limit": limit, "includeScheduledMessages": 0},
-            timeout=10
+        response = await hostaway_request(
+            "GET", f"/conversations/{conversation_id}/messages", "messages",
+            params={"limit": limit, "offset": offset, "includeScheduledMessages": 0},
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            messages = data.get("result", [])
-            
-            # Sort by insertedOn (oldest first)
-            messages.sort(key=lambda m: m.get("insertedOn", ""))
-            
-            return messages
-        else:
-            logging.error(f"Failed to fetch messages: {response.status_code}")
-            return []
+        if response.status_code != 200:
+            logging.error(f"[api_client] Failed to fetch messages page: {response.status_code}")
+            return None
+        return response.json().get("result") or []
     except Exception as e:
-        logging.error(f"Error fetching messages: {e}")
-        return []
+        logging.error(f"[api_client] Error fetching messages page: {e}")
+        return None
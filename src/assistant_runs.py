@@ -0,0 +1,353 @@
+# file: src/assistant_runs.py
+"""
+Assistants API Run Execution
+----------------------------
+Handles:
+- Streaming runs that resolve as soon as the assistant's message is complete
+- Adaptive-backoff polling as a fallback (or when ASSISTANT_RUN_MODE=poll)
+- Single streamed Chat Completions calls (the stateless reply engine)
+- Time-to-first-token, time-to-complete and token usage per run (cached vs.
+  uncached input tokens included), for admin metrics
+
+Shared by src/ai_assistant.py and src/ai_assistant_enhanced.py.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from src.model_router import cached_tokens, estimate_cost, record_call, record_tokens
+from src.percentiles import percentile
+
+ASSISTANT_RUN_MODE = os.getenv("ASSISTANT_RUN_MODE", "stream")  # stream | poll
+RUN_TIMEOUT = 30  # seconds
+
+# Polling backoff: start fast so short runs are picked up quickly, then back off
+POLL_INITIAL_DELAY = 0.1
+POLL_MAX_DELAY = 1.0
+POLL_BACKOFF = 1.5
+
+RUN_SAMPLE_SIZE = 200  # Recent runs kept per label for percentiles
+_samples: Dict[str, deque] = {}
+_counts: Counter = Counter()
+_tokens: Dict[str, Counter] = {}  # "label:engine" -> prompt/cached/completion token and cost totals
+_stream_tasks: set = set()  # Streams still draining after the text was returned
+
+
+# -------------------- Public Entry Point --------------------
+
+async def run_assistant_to_text(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    label: str = "reply",
+    timeout: float = RUN_TIMEOUT,
+    **run_params: Any,
+) -> Optional[str]:
+    """
+    Run an assistant on a thread and return its reply text.
+
+    Args:
+        client: AsyncOpenAI client
+        thread_id: Thread to run on
+        assistant_id: Assistant to run
+        label: Name used for timing metrics (e.g., "reply", "analysis")
+        timeout: Maximum seconds to wait for the text
+        **run_params: Extra run parameters (additional_instructions, ...)
+
+    Returns:
+        The assistant's text, or None on failure/timeout
+    """
+    started = time.perf_counter()
+    model = run_params.get("model")  # Per-run override picked by src/model_router.py
+    try:
+        text = await _run_to_text(client, thread_id, assistant_id, label, timeout, started, run_params)
+    except Exception:
+        if model:
+            record_call(model, None)
+        raise
+    if model:
+        record_call(model, time.perf_counter() - started if text else None)
+    return text
+
+
+async def _run_to_text(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    label: str,
+    timeout: float,
+    started: float,
+    run_params: Dict[str, Any],
+) -> Optional[str]:
+    if ASSISTANT_RUN_MODE == "stream":
+        try:
+            return await _run_streaming(client, thread_id, assistant_id, label, timeout, started, run_params)
+        except _StreamUnavailable as e:
+            _counts["stream_fallbacks"] += 1
+            logging.warning(f"[runs] Streaming failed ({e.cause}) - falling back to polling")
+            remaining = max(1.0, timeout - (time.perf_counter() - started))
+            if e.run_id:
+                return await _poll_run(client, thread_id, e.run_id, label, remaining, started)
+            run = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, **run_params)
+            return await _poll_run(client, thread_id, run.id, label, remaining, started)
+
+    run = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, **run_params)
+    return await _poll_run(client, thread_id, run.id, label, timeout, started)
+
+
+# -------------------- Streaming --------------------
+
+class _StreamUnavailable(Exception):
+    """Stream broke before producing text; run_id is set if the run was created."""
+
+    def __init__(self, cause: Exception, run_id: Optional[str]):
+        super().__init__(str(cause))
+        self.cause = cause
+        self.run_id = run_id
+
+
+async def _run_streaming(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    label: str,
+    timeout: float,
+    started: float,
+    run_params: Dict[str, Any],
+) -> Optional[str]:
+    loop = asyncio.get_running_loop()
+    text_ready: asyncio.Future = loop.create_future()
+    state: Dict[str, Any] = {"run_id": None, "ttft": None}
+
+    async def consume() -> None:
+        try:
+            async with client.beta.threads.runs.stream(
+                thread_id=thread_id, assistant_id=assistant_id, **run_params
+            ) as stream:
+                async for event in stream:
+                    if event.event == "thread.run.created":
+                        state["run_id"] = event.data.id
+                    elif event.event == "thread.message.delta" and state["ttft"] is None:
+                        state["ttft"] = time.perf_counter() - started
+                    elif event.event == "thread.message.completed" and not text_ready.done():
+                        text_ready.set_result(_message_text(event.data))
+                    elif event.event == "thread.run.completed":
+                        _record_usage(label, "assistants", getattr(event.data, "usage", None), getattr(event.data, "model", None))
+                    elif event.event in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired"):
+                        logging.error(f"[runs] Run {event.event.rsplit('.', 1)[-1]}: {getattr(event.data, 'last_error', 'N/A')}")
+                        if not text_ready.done():
+                            text_ready.set_result(None)
+            # Stream ended (run finished) without a completed message
+            if not text_ready.done():
+                text_ready.set_result(None)
+        except Exception as e:
+            if not text_ready.done():
+                text_ready.set_exception(_StreamUnavailable(e, state["run_id"]))
+            else:
+                logging.warning(f"[runs] Stream closed with error after text was returned: {e}")
+
+    # The stream keeps draining in the background until the run is marked
+    # completed, so the thread is free for the next run; we don't wait for it.
+    task = asyncio.create_task(consume())
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+
+    try:
+        text = await asyncio.wait_for(asyncio.shield(text_ready), timeout)
+    except asyncio.TimeoutError:
+        task.cancel()
+        _record(label, "stream", state["ttft"], None)
+        logging.error(f"[runs] Streaming run timed out after {timeout}s")
+        return None
+
+    _record(label, "stream", state["ttft"], time.perf_counter() - started if text else None)
+    return text
+
+
+# -------------------- Polling --------------------
+
+async def _poll_run(
+    client: AsyncOpenAI,
+    thread_id: str,
+    run_id: str,
+    label: str,
+    timeout: float,
+    started: float,
+) -> Optional[str]:
+    """Poll a run with adaptive backoff until it finishes, then fetch its message."""
+    deadline = time.perf_counter() + timeout
+    delay = POLL_INITIAL_DELAY
+
+    while time.perf_counter() < deadline:
+        try:
+            run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+            _counts["polls"] += 1
+
+            if run.status == "completed":
+                _record_usage(label, "assistants", getattr(run, "usage", None), getattr(run, "model", None))
+                messages = await client.beta.threads.messages.list(thread_id=thread_id, order="desc", limit=1)
+                text = None
+                if messages.data and messages.data[0].role == "assistant":
+                    text = _message_text(messages.data[0])
+                if text is None:
+                    logging.warning("[runs] Run completed but no assistant message found")
+                elapsed = time.perf_counter() - started
+                # Polling can't see tokens arrive; first token == completion
+                _record(label, "poll", elapsed if text else None, elapsed if text else None)
+                return text
+
+            if run.status in ("failed", "cancelled", "expired"):
+                logging.error(f"[runs] Run {run.status}: {getattr(run, 'last_error', 'N/A')}")
+                _record(label, "poll", None, None)
+                return None
+
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.perf_counter())))
+            delay = min(POLL_MAX_DELAY, delay * POLL_BACKOFF)
+
+        except Exception as e:
+            logging.error(f"[runs] Error checking run status: {e}")
+            _record(label, "poll", None, None)
+            return None
+
+    logging.error(f"[runs] Run timed out after {timeout:.0f}s")
+    _record(label, "poll", None, None)
+    return None
+
+
+# -------------------- Chat Completions --------------------
+
+async def chat_to_text(
+    client: AsyncOpenAI,
+    messages: List[Dict[str, Any]],
+    model: str,
+    label: str = "reply",
+    timeout: float = RUN_TIMEOUT,
+    **params: Any,
+) -> Optional[str]:
+    """
+    One streamed Chat Completions call: no thread, message or run round trips.
+
+    Args:
+        client: AsyncOpenAI client
+        messages: Chat messages (system + user)
+        model: Model name
+        label: Name used for timing metrics
+        timeout: Maximum seconds to wait for the text
+        **params: Extra completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+        The reply text, or None on failure/timeout
+    """
+    started = time.perf_counter()
+    state: Dict[str, Any] = {"ttft": None}
+
+    async def consume() -> Optional[str]:
+        stream = await client.chat.completions.create(
+            model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+        )
+        chunks = []
+        async for chunk in stream:
+            if chunk.usage:
+                _record_usage(label, "chat", chunk.usage, model)
+            if chunk.choices and chunk.choices[0].delta.content:
+                if state["ttft"] is None:
+                    state["ttft"] = time.perf_counter() - started
+                chunks.append(chunk.choices[0].delta.content)
+        return "".join(chunks) or None
+
+    try:
+        text = await asyncio.wait_for(consume(), timeout)
+    except asyncio.TimeoutError:
+        logging.error(f"[runs] Chat completion timed out after {timeout}s")
+        _record(label, "chat", state["ttft"], None)
+        record_call(model, None)
+        return None
+    except Exception as e:
+        logging.error(f"[runs] Chat completion failed: {e}")
+        _record(label, "chat", None, None)
+        record_call(model, None)
+        return None
+
+    elapsed = time.perf_counter() - started
+    _record(label, "chat", state["ttft"], elapsed if text else None)
+    record_call(model, elapsed if text else None)
+    return text
+
+
+# -------------------- Helpers --------------------
+
+def _message_text(message: Any) -> Optional[str]:
+    for block in getattr(message, "content", None) or []:
+        if block.type == "text":
+            return block.text.value
+    return None
+
+
+def _record(label: str, mode: str, ttft: Optional[float], total: Optional[float]) -> None:
+    _counts[f"{label}:{mode}"] += 1
+    if total is None:
+        _counts[f"{label}:failed"] += 1
+        return
+    _samples.setdefault(label, deque(maxlen=RUN_SAMPLE_SIZE)).append((ttft or total, total))
+    logging.info(
+        f"[runs] {label} via {mode}: first token {1000 * (ttft or total):.0f} ms, complete {1000 * total:.0f} ms"
+    )
+
+
+def _record_usage(label: str, engine: str, usage: Any, model: Optional[str] = None) -> None:
+    if usage is None:
+        return
+    if model:
+        record_tokens(model, usage)
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    cached = cached_tokens(usage)
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    totals = _tokens.setdefault(f"{label}:{engine}", Counter())
+    totals["calls"] += 1
+    totals["prompt_tokens"] += prompt
+    totals["cached_prompt_tokens"] += cached
+    totals["completion_tokens"] += completion
+    # Priced per call: the router picks the model per reply, so one engine mixes models
+    cost = estimate_cost(model, prompt, cached, completion) if model else None
+    if cost is None:
+        totals["unpriced_calls"] += 1
+    else:
+        totals["est_cost_usd"] += cost
+
+
+def token_usage() -> Dict[str, Dict[str, Any]]:
+    """Prompt (cached and uncached)/completion token and estimated cost (USD) totals per "label:engine"."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for key, totals in _tokens.items():
+        out[key] = dict(totals)
+        prompt = totals["prompt_tokens"]
+        out[key]["prompt_cache_rate"] = round(totals["cached_prompt_tokens"] / prompt, 3) if prompt else 0.0
+        out[key]["est_cost_usd"] = round(totals["est_cost_usd"], 6)
+    return out
+
+
+def run_stats() -> Dict[str, Any]:
+    """Per-label run counts and TTFT / time-to-complete percentiles (ms)."""
+    stats: Dict[str, Any] = {
+        "mode": ASSISTANT_RUN_MODE,
+        "stream_fallbacks": _counts["stream_fallbacks"],
+        "polls": _counts["polls"],
+        "tokens": token_usage(),
+    }
+    for label, samples in _samples.items():
+        ttfts = [s[0] for s in samples]
+        totals = [s[1] for s in samples]
+        stats[label] = {
+            "runs": {k.split(":", 1)[1]: v for k, v in _counts.items() if k.startswith(f"{label}:")},
+            "ttft_p50_ms": round(1000 * percentile(ttfts, 0.50), 1),
+            "ttft_p95_ms": round(1000 * percentile(ttfts, 0.95), 1),
+            "complete_p50_ms": round(1000 * percentile(totals, 0.50), 1),
+            "complete_p95_ms": round(1000 * percentile(totals, 0.95), 1),
+        }
+    return stats
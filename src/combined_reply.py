@@ -0,0 +1,119 @@
+# file: src/combined_reply.py
+"""
+Combined Reply + Analysis Call
+------------------------------
+Handles:
+- One Chat Completions call (JSON mode) returning reply, mood, summary and
+  intent together, instead of a separate analysis call and reply run that
+  each re-send the conversation
+- Validating that JSON with pydantic (same approach as AIResponse in
+  legacy/assistant_core_smart.py); None on any failure so the caller can
+  fall back to the split path
+
+Enabled with REPLY_MODE=combined.
+"""
+
+import os
+import json
+import logging
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from src import ai_assistant_enhanced as enhanced
+from src.assistant_runs import chat_to_text
+from src.model_router import route
+from src.request_context import GuestMessageContext
+
+REPLY_MODE = os.getenv("REPLY_MODE", "split")  # split | combined
+
+COMBINED_OUTPUT_INSTRUCTIONS = """
+OUTPUT FORMAT:
+Return only a JSON object with these keys:
+- "reply": your reply to the guest's new message, following everything above
+- "mood": the guest's current mood, one word (happy, excited, confused, frustrated, concerned, neutral, urgent)
+- "summary": the conversation so far in one sentence (max 15 words), for the host
+- "intent": one of {intents}
+""".strip()
+
+
+class Intent(str, Enum):
+    question = "question"
+    early_check_in = "early_check_in"
+    late_checkout = "late_checkout"
+    extend_stay = "extend_stay"
+    price_quote = "price_quote"
+    discount_request = "discount_request"
+    issue_report = "issue_report"
+    directions = "directions"
+    amenities = "amenities"
+    rules = "rules"
+    checkin_help = "checkin_help"
+    checkout_help = "checkout_help"
+    food_recs = "food_recs"
+    other = "other"
+
+
+class CombinedReply(BaseModel):
+    reply: str = Field(min_length=1)
+    mood: str = Field(min_length=1, max_length=30)
+    summary: str = Field(min_length=1, max_length=300)
+    intent: Intent
+
+
+def _coerce(d: Dict[str, Any]) -> Dict[str, Any]:
+    out = {key: "" if d.get(key) is None else str(d.get(key)).strip() for key in ("reply", "mood", "summary")}
+    out["mood"] = out["mood"].split()[0].strip(".,").capitalize() if out["mood"] else "Neutral"
+    intent = str(d.get("intent") or "other").lower().replace("-", "_").replace(" ", "_")
+    out["intent"] = intent if intent in {i.value for i in Intent} else "other"
+    return out
+
+
+async def generate_combined_reply(ctx: GuestMessageContext, mood: Optional[str] = None) -> Optional[CombinedReply]:
+    """
+    Reply, mood, summary and intent for a guest message in one model call.
+
+    Args:
+        ctx: Request-scoped context already loaded for this webhook
+        mood: Guest's last known mood, if any (negative moods route to the strong model)
+
+    Returns:
+        Validated CombinedReply, or None if the call or validation failed
+    """
+    if not enhanced.client:
+        return None
+
+    try:
+        prompt = await enhanced.build_reply_prompt(ctx)
+        system = enhanced.YOUR_VOICE_INSTRUCTIONS + "\n\n" + COMBINED_OUTPUT_INSTRUCTIONS.format(
+            intents=", ".join(i.value for i in Intent)
+        )
+        raw = await chat_to_text(
+            enhanced.client,
+            [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            route("reply", ctx.guest_message, mood=mood).model,
+            label="combined",
+            temperature=0.5,
+            response_format={"type": "json_object"},
+        )
+    except Exception as e:
+        logging.error(f"[combined] Call failed: {e}")
+        return None
+
+    if not raw:
+        return None
+    try:
+        result = CombinedReply(**_coerce(json.loads(raw)))
+    except ValidationError as ve:
+        logging.error(f"[combined] JSON validation error: {ve.errors()}; raw={raw[:300]}")
+        return None
+    except Exception as e:
+        logging.error(f"[combined] JSON parse error: {e}; raw={raw[:300]}")
+        return None
+
+    logging.info(f"[combined] Mood: {result.mood}, intent: {result.intent.value}, summary: {result.summary}")
+    return result
@@ -0,0 +1,257 @@
+# file: src/conversation_context.py
+"""
+Compact Conversation Context for Reply Generation
+-------------------------------------------------
+Handles:
+- A rolling per-conversation summary of older turns, folded forward in the
+  background as the conversation grows (stored in the message store)
+- Only the last few messages go to the model verbatim
+- A per-call token budget: the oldest raw messages are dropped first,
+  then the summary is trimmed
+- Tokens sent vs. the old "full history every time" layout, per conversation
+
+The old layout appended the full history to the same Assistants thread on
+every guest message, so each run re-read every earlier copy. Reply runs now
+only read the latest thread message (see CONTEXT_THREAD_MESSAGES), which
+carries this compact context.
+"""
+
+import os
+import asyncio
+import logging
+import contextvars
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from src.message_store import get_summary, save_summary
+from src.model_router import atimed_create, route
+from src.tokens import count_tokens, estimate_tokens, truncate_tokens
+
+CONTEXT_RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "6"))  # Sent verbatim
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))     # Whole reply prompt
+CONTEXT_THREAD_MESSAGES = int(os.getenv("CONTEXT_THREAD_MESSAGES", "1"))  # Thread messages a run reads
+SUMMARY_BATCH = 6           # Fold older messages once this many are unsummarized
+SUMMARY_MAX_TOKENS = 250
+LEGACY_LINE_TOKENS = 12     # "[2025-01-15 10:30] Guest: " prefix per message in the old layout
+MAX_TRACKED_CONVERSATIONS = 500
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+_usage: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+_stats: Counter = Counter()
+_summarizing: set = set()
+_summary_tasks: set = set()
+
+
+# -------------------- Public API --------------------
+
+async def build_compact_history(
+    conversation_id: Any,
+    messages: List[Dict[str, Any]],
+    guest_message: str = "",
+    reserved_tokens: int = 0,
+) -> str:
+    """
+    Summary of older turns plus the most recent messages, within budget.
+
+    Args:
+        conversation_id: Hostaway conversation ID
+        messages: Conversation messages, oldest first
+        guest_message: The message being answered (left out of the history)
+        reserved_tokens: Tokens already used by the rest of the prompt
+
+    Returns:
+        Formatted history block for the reply prompt
+    """
+    conv = str(conversation_id)
+    if messages and guest_message and (messages[-1].get("body") or "").strip() == guest_message.strip():
+        messages = messages[:-1]
+
+    stored = await _load_summary(conv)
+    summary = stored["summary"] if stored else ""
+    through = (stored["through_inserted_on"], stored["through_message_id"]) if stored else None
+    unsummarized = [m for m in messages if through is None or _key(m) > through]
+
+    # Anything older than the verbatim window that the summary doesn't cover yet
+    # still goes in raw (budget permitting) until the background fold catches up.
+    older = unsummarized[:-CONTEXT_RECENT_MESSAGES] if CONTEXT_RECENT_MESSAGES else unsummarized
+    if len(older) >= SUMMARY_BATCH:
+        _schedule_summary(conv, summary, older)
+
+    budget = max(0, CONTEXT_TOKEN_BUDGET - reserved_tokens)
+    lines: List[str] = []
+    used = 0
+    newest_first = list(reversed(unsummarized))
+    for i, msg in enumerate(newest_first):
+        line = _format_message(msg)
+        if not line:
+            continue
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            # Stop here rather than skip: the raw window stays contiguous and
+            # everything older than this message is dropped
+            _stats["messages_dropped"] += len(newest_first) - i
+            break
+        lines.append(line)
+        used += cost
+    lines.reverse()
+
+    parts = []
+    if summary:
+        summary = _trim_to_tokens(summary, budget - used)
+        if summary:
+            parts.append(f"=== EARLIER IN THIS CONVERSATION (summary) ===\n{summary}")
+    if lines:
+        parts.append("=== RECENT MESSAGES ===\n" + "\n".join(lines))
+    return "\n\n".join(parts) if parts else "No previous messages in this conversation."
+
+
+def legacy_layout_tokens(messages: List[Dict[str, Any]], fixed_tokens: int) -> int:
+    """
+    Estimated size of the message the old layout would have appended: the
+    full history plus the recent-messages block on top of the fixed sections
+    (fixed_tokens, already counted). Estimated from message lengths rather
+    than rendered and tokenized - it only feeds the savings report.
+    """
+    bodies = [(m.get("body") or "").strip() for m in messages]
+    history = sum(estimate_tokens(b) + LEGACY_LINE_TOKENS for b in bodies if b)
+    recent = sum(min(estimate_tokens(b), 50) + LEGACY_LINE_TOKENS for b in bodies[-5:] if b)  # capped at 50 there
+    return fixed_tokens + history + recent
+
+
+def record_usage(conversation_id: Any, sent: int, legacy: int) -> None:
+    """
+    Account one reply call: tokens actually sent vs. the old layout.
+
+    legacy is the size of the message the old layout would have appended
+    (see legacy_layout_tokens). Because that layout replayed every earlier
+    copy in the thread, its baseline for this call is the running sum of all
+    legacy messages so far.
+    """
+    conv = str(conversation_id)
+    usage = _usage.pop(conv, None) or {"calls": 0, "sent": 0, "legacy_thread": 0, "baseline": 0}
+    usage["legacy_thread"] += legacy
+    usage["calls"] += 1
+    usage["sent"] += sent
+    usage["baseline"] += usage["legacy_thread"]
+    _usage[conv] = usage
+    while len(_usage) > MAX_TRACKED_CONVERSATIONS:
+        _usage.popitem(last=False)
+
+    _stats["calls"] += 1
+    _stats["sent_tokens"] += sent
+    _stats["baseline_tokens"] += usage["legacy_thread"]
+    if sent > CONTEXT_TOKEN_BUDGET:
+        _stats["over_budget"] += 1
+    logging.info(
+        f"[context] Conversation {conv}: sent {sent} tokens "
+        f"(old layout {usage['legacy_thread']}, saved {usage['legacy_thread'] - sent})"
+    )
+
+
+def truncation_strategy() -> Dict[str, Any]:
+    """Run parameter limiting how much of the thread a reply run reads."""
+    return {"type": "last_messages", "last_messages": CONTEXT_THREAD_MESSAGES}
+
+
+def context_stats() -> Dict[str, Any]:
+    """Token savings overall and for the most active recent conversations."""
+    top = sorted(_usage.items(), key=lambda kv: kv[1]["baseline"] - kv[1]["sent"], reverse=True)[:10]
+    return {
+        "token_budget": CONTEXT_TOKEN_BUDGET,
+        "calls": _stats["calls"],
+        "sent_tokens": _stats["sent_tokens"],
+        "baseline_tokens": _stats["baseline_tokens"],
+        "tokens_saved": _stats["baseline_tokens"] - _stats["sent_tokens"],
+        "over_budget": _stats["over_budget"],
+        "messages_dropped": _stats["messages_dropped"],
+        "summaries_updated": _stats["summaries_updated"],
+        "summary_failures": _stats["summary_failures"],
+        "conversations": {
+            conv: {**usage, "saved": usage["baseline"] - usage["sent"]} for conv, usage in top
+        },
+    }
+
+
+# -------------------- Rolling Summary --------------------
+
+def _schedule_summary(conversation_id: str, summary: str, older: List[Dict[str, Any]]) -> None:
+    if not client or conversation_id in _summarizing:
+        return
+    _summarizing.add(conversation_id)
+    # Fresh context: the fold isn't part of the webhook that triggered it
+    task = asyncio.create_task(_fold_summary(conversation_id, summary, older), context=contextvars.Context())
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+
+
+async def _fold_summary(conversation_id: str, summary: str, older: List[Dict[str, Any]]) -> None:
+    """Merge older raw messages into the stored summary."""
+    try:
+        transcript = "\n".join(line for line in (_format_message(m) for m in older) if line)
+        response = await atimed_create(
+            client.chat.completions.create,
+            route("summary").model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You maintain a running summary of a guest conversation for a property host. "
+                        "Keep facts that matter for future replies: guest names, dates, requests, "
+                        "promises made, problems and whether they were resolved. Be terse."
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"Current summary:\n{summary or '(none)'}\n\n"
+                        f"New messages:\n{transcript}\n\n"
+                        f"Return the updated summary (max {SUMMARY_MAX_TOKENS // 2} words)."
+                    ),
+                },
+            ],
+            temperature=0.2,
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+        updated = (response.choices[0].message.content or "").strip()
+        if updated:
+            await save_summary(conversation_id, updated, older[-1])
+            _stats["summaries_updated"] += 1
+            logging.info(f"[context] Folded {len(older)} messages into summary for {conversation_id}")
+    except Exception as e:
+        _stats["summary_failures"] += 1
+        logging.error(f"[context] Summary update for {conversation_id} failed: {e}")
+    finally:
+        _summarizing.discard(conversation_id)
+
+
+async def _load_summary(conversation_id: str) -> Optional[Dict[str, str]]:
+    try:
+        return await get_summary(conversation_id)
+    except Exception as e:
+        logging.error(f"[context] Could not read summary for {conversation_id}: {e}")
+        return None
+
+
+# -------------------- Helpers --------------------
+
+def _key(message: Dict[str, Any]) -> Tuple[str, str]:
+    # Same ordering the message store uses
+    return (message.get("insertedOn") or "", str(message.get("id")))
+
+
+def _format_message(message: Dict[str, Any]) -> str:
+    body = (message.get("body") or "").strip()
+    if not body:
+        return ""
+    sender = "Guest" if message.get("isIncoming") == 1 else "You (Host)"
+    timestamp = message.get("insertedOn") or ""
+    return f"[{timestamp[:16] or 'Unknown'}] {sender}: {body}"
+
+
+def _trim_to_tokens(text: str, max_tokens: int) -> str:
+    # Keep the end: later parts of the summary are the most recent
+    return truncate_tokens(text, max_tokens, marker="...", keep_end=True)
@@ -5,22 +5,30 @@ Database Module for Hostaway AutoReply
 Handles:
 - Duplicate detection for webhook events
 - Logging AI exchanges for learning/debugging
-- Simple in-memory storage (can be upgraded to SQLite/PostgreSQL later)
+- Persisting the assistant record and conversation -> thread mappings on disk
+  (SQLite on /var/data), so restarts reuse the assistant and threads
+- Simple in-memory storage for events and exchanges (can be upgraded later)
 """
 
 import os
 import logging
-from typing import Optional
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 from datetime import datetime, timedelta
 
 # In-memory storage for processed events (consider using Redis or SQLite for production)
 _processed_events = set()
 _ai_exchanges = []
-_thread_mappings = {}  # Maps Hostaway conversation_id -> OpenAI thread_id
+_thread_mappings: Dict[str, str] = {}  # Hostaway conversation_id -> OpenAI thread_id (write-through cache)
+_threads_loaded = False
+_threads_lock = threading.Lock()  # callers run these in worker threads (asyncio.to_thread)
 
 # Configuration
 MAX_PROCESSED_EVENTS = 10000  # Prevent memory overflow
 EVENT_TTL_HOURS = 24  # How long to keep processed event IDs
+ASSISTANT_STATE_PATH = os.getenv("ASSISTANT_STATE_PATH", "/var/data/assistant_state.db")
 
 
 def already_processed(event_key: str) -> bool:
@@ -109,11 +117,109 @@ def clear_old_processed_events() -> None:
     logging.info("[db] Cleared all processed events")
 
 
+# -------------------- Assistant State (persistent) --------------------
+
+def _state_db_path() -> str:
+    directory = os.path.dirname(ASSISTANT_STATE_PATH)
+    if directory and not os.path.isdir(directory):
+        logging.warning(f"[db] {directory} missing - using ./assistant_state.db")
+        return "assistant_state.db"
+    return ASSISTANT_STATE_PATH
+
+
+_STATE_DB_PATH = _state_db_path()
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """Connection that commits (or rolls back) and is closed when the block exits."""
+    conn = sqlite3.connect(_STATE_DB_PATH, timeout=10)
+    try:
+        with conn:
+            _create_schema(conn)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS threads (
+               conversation_id TEXT PRIMARY KEY,
+               thread_id TEXT NOT NULL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS assistants (
+               name TEXT PRIMARY KEY,
+               assistant_id TEXT NOT NULL,
+               instructions_hash TEXT NOT NULL,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )"""
+    )
+
+
+def get_assistant_record(name: str) -> Optional[Dict[str, Any]]:
+    """
+    The persisted assistant for name.
+
+    Returns:
+        {"assistant_id", "instructions_hash"}, or None if there is none (or the disk is unreadable)
+    """
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT assistant_id, instructions_hash FROM assistants WHERE name = ?", (name,)
+            ).fetchone()
+    except Exception as e:
+        logging.error(f"[db] Failed to read assistant record: {e}")
+        return None
+    return {"assistant_id": row[0], "instructions_hash": row[1]} if row else None
+
+
+def save_assistant_record(name: str, assistant_id: str, instructions_hash: str) -> None:
+    """Persist the assistant id and the hash of the instructions it was created with."""
+    try:
+        with _connect() as conn:
+            conn.execute(
+                """INSERT INTO assistants (name, assistant_id, instructions_hash) VALUES (?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET
+                       assistant_id = excluded.assistant_id,
+                       instructions_hash = excluded.instructions_hash,
+                       updated_at = CURRENT_TIMESTAMP""",
+                (name, assistant_id, instructions_hash),
+            )
+    except Exception as e:
+        logging.error(f"[db] Failed to save assistant record: {e}")
+
+
 # -------------------- Thread Management for Assistants API --------------------
 
+def _load_threads() -> None:
+    """Fill the in-memory map from disk once; later reads never touch the disk."""
+    global _threads_loaded
+    if _threads_loaded:
+        return
+    with _threads_lock:
+        if _threads_loaded:
+            return
+        try:
+            with _connect() as conn:
+                rows = conn.execute("SELECT conversation_id, thread_id FROM threads").fetchall()
+        except Exception as e:
+            logging.error(f"[db] Failed to load thread mappings: {e}")
+            rows = []
+        for conversation_id, thread_id in rows:
+            _thread_mappings.setdefault(conversation_id, thread_id)
+        _threads_loaded = True
+    logging.info(f"[db] Loaded {len(rows)} thread mappings from {_STATE_DB_PATH}")
+
+
 def get_thread_id(conversation_id: str) -> Optional[str]:
     """
-    Get the OpenAI thread ID for a Hostaway conversation.
+    Get the OpenAI thread ID for a Hostaway conversation. The first call reads
+    the disk, so async callers run it with asyncio.to_thread.
 
     Args:
         conversation_id: Hostaway conversation ID
@@ -121,18 +227,29 @@ def get_thread_id(conversation_id: str) -> Optional[str]:
     Returns:
         OpenAI thread ID if exists, None otherwise
     """
+    _load_threads()
     return _thread_mappings.get(str(conversation_id))
 
 
 def save_thread_id(conversation_id: str, thread_id: str) -> None:
     """
-    Store the mapping between Hostaway conversation and OpenAI thread.
+    Store the mapping between Hostaway conversation and OpenAI thread
+    (blocking SQLite write: async callers run it with asyncio.to_thread).
 
     Args:
         conversation_id: Hostaway conversation ID
         thread_id: OpenAI thread ID
     """
+    _load_threads()
     _thread_mappings[str(conversation_id)] = thread_id
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO threads (conversation_id, thread_id) VALUES (?, ?)",
+                (str(conversation_id), thread_id),
+            )
+    except Exception as e:
+        logging.error(f"[db] Failed to persist thread mapping (kept in memory): {e}")
     logging.info(f"[db] Saved thread mapping: conversation {conversation_id} -> thread {thread_id}")
 
 
@@ -143,22 +260,6 @@ def get_all_threads() -> dict:
     Returns:
         Dictionary of conversation_id -> thread_id mappings
     """
+    _load_threads()
     return _thread_mappings.copy()
 
-
-# TODO: Implement persistent storage with SQLite or PostgreSQL
-# Example SQLite schema:
-# CREATE TABLE processed_events (
-#     event_key TEXT PRIMARY KEY,
-#     processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-# );
-#
-# CREATE TABLE ai_exchanges (
-#     id INTEGER PRIMARY KEY AUTOINCREMENT,
-#     conversation_id TEXT,
-#     guest_message TEXT,
-#     ai_suggestion TEXT,
-#     intent TEXT,
-#     metadata TEXT,
-#     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-# );
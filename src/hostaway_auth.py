@@ -0,0 +1,237 @@
+# file: src/hostaway_auth.py
+"""
+Hostaway OAuth Token Manager
+----------------------------
+Handles:
+- Client-credentials tokens from HOSTAWAY_CLIENT_ID / HOSTAWAY_CLIENT_SECRET
+- Proactive background refresh shortly before expiry
+- Single-flight: concurrent callers share one token request
+- Invalidation after a 401 (only the token that failed, so a burst of 401s
+  triggers one refresh, not one per request)
+- Falls back to a static HOSTAWAY_ACCESS_TOKEN when no client credentials are set
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+from src.upstream import count_upstream_call
+
+HOSTAWAY_CLIENT_ID = os.getenv("HOSTAWAY_CLIENT_ID")
+HOSTAWAY_CLIENT_SECRET = os.getenv("HOSTAWAY_CLIENT_SECRET")
+HOSTAWAY_ACCESS_TOKEN = os.getenv("HOSTAWAY_ACCESS_TOKEN")
+
+TOKEN_REFRESH_MARGIN = float(os.getenv("HOSTAWAY_TOKEN_REFRESH_MARGIN", "300"))  # seconds before expiry
+DEFAULT_TOKEN_TTL = 3480          # Used when the response has no expires_in (~58 minutes)
+REFRESH_RETRY_DELAY = 30          # Seconds between background retries after a failed refresh
+
+
+class HostawayTokenManager:
+    """
+    Holds the current Hostaway access token for the process.
+
+    The async and sync paths share the token; each has its own lock so a
+    refresh is never run twice concurrently on the same path.
+    """
+
+    def __init__(
+        self,
+        async_client: Callable[[], httpx.AsyncClient],
+        sync_client: Callable[[], httpx.Client],
+        client_id: Optional[str] = HOSTAWAY_CLIENT_ID,
+        client_secret: Optional[str] = HOSTAWAY_CLIENT_SECRET,
+        static_token: Optional[str] = HOSTAWAY_ACCESS_TOKEN,
+    ):
+        self._async_client = async_client
+        self._sync_client = sync_client
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.static_token = static_token
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._sync_lock = threading.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_timer: Optional[threading.Timer] = None  # Sync-only processes (legacy/)
+        self._stats: Counter = Counter()
+
+    @property
+    def uses_client_credentials(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+
+    @property
+    def configured(self) -> bool:
+        return self.uses_client_credentials or bool(self.static_token)
+
+    def _valid(self) -> bool:
+        return bool(self._token) and time.time() < self._expires_at
+
+    # -------------------- Async --------------------
+
+    async def get_token(self) -> Optional[str]:
+        """Return a valid access token, fetching one if needed (single-flight)."""
+        if not self.uses_client_credentials:
+            return self.static_token
+        if self._valid():
+            return self._token
+
+        async with self._lock:
+            # Another caller may have refreshed while we waited
+            if self._valid():
+                self._stats["coalesced"] += 1
+                return self._token
+            await self._fetch()
+        return self._token if self._valid() else None
+
+    async def _fetch(self) -> None:
+        """Request a new token. Caller holds self._lock."""
+        count_upstream_call("access_token")
+        self._stats["fetches"] += 1
+        try:
+            resp = await self._async_client().post(
+                "/accessTokens",
+                data=self._token_request(),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=15,
+            )
+            resp.raise_for_status()
+            self._store(resp.json())
+            remaining = self._expires_at - time.time()
+            # Short-lived tokens: refresh at half-life rather than immediately
+            self._schedule_refresh(max(remaining - TOKEN_REFRESH_MARGIN, remaining / 2))
+        except Exception as e:
+            self._stats["fetch_failures"] += 1
+            logging.error(f"[hostaway_auth] Token request failed: {e}")
+
+    def _schedule_refresh(self, delay: float) -> None:
+        current = self._refresh_task
+        if current is not None and not current.done() and current is not asyncio.current_task():
+            current.cancel()
+        # Fresh context so refresh calls aren't counted against whichever webhook triggered the fetch
+        self._refresh_task = asyncio.create_task(
+            self._refresh_later(max(0.0, delay)), context=contextvars.Context()
+        )
+
+    async def _refresh_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        async with self._lock:
+            self._stats["proactive_refreshes"] += 1
+            before = self._token
+            await self._fetch()
+            failed = self._token == before
+        # Keep retrying while the old token still works
+        if failed and self._valid():
+            self._schedule_refresh(REFRESH_RETRY_DELAY)
+
+    def invalidate(self, token: Optional[str]) -> None:
+        """Drop token after a 401, unless it has already been replaced."""
+        if token and token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+            self._stats["invalidations"] += 1
+            logging.warning("[hostaway_auth] Access token rejected (401) - invalidated")
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+    # -------------------- Sync --------------------
+
+    def get_token_sync(self) -> Optional[str]:
+        """Sync counterpart of get_token() for callers outside the event loop."""
+        if not self.uses_client_credentials:
+            return self.static_token
+        if self._valid():
+            return self._token
+
+        with self._sync_lock:
+            if self._valid():
+                self._stats["coalesced"] += 1
+                return self._token
+            self._fetch_sync()
+        return self._token if self._valid() else None
+
+    def _fetch_sync(self) -> None:
+        """Request a new token over the sync client. Caller holds self._sync_lock."""
+        count_upstream_call("access_token")
+        self._stats["fetches"] += 1
+        try:
+            resp = self._sync_client().post(
+                "/accessTokens",
+                data=self._token_request(),
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=15,
+            )
+            resp.raise_for_status()
+            self._store(resp.json())
+            remaining = self._expires_at - time.time()
+            self._schedule_refresh_sync(max(remaining - TOKEN_REFRESH_MARGIN, remaining / 2))
+        except Exception as e:
+            self._stats["fetch_failures"] += 1
+            logging.error(f"[hostaway_auth] Token request failed: {e}")
+
+    def _schedule_refresh_sync(self, delay: float) -> None:
+        # Without an event loop (legacy/ processes) the proactive refresh runs on a timer thread
+        try:
+            asyncio.get_running_loop()
+            return  # The async path schedules its own refresh
+        except RuntimeError:
+            pass
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+        self._refresh_timer = threading.Timer(max(0.0, delay), self._refresh_later_sync)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _refresh_later_sync(self) -> None:
+        with self._sync_lock:
+            self._stats["proactive_refreshes"] += 1
+            before = self._token
+            self._fetch_sync()
+            failed = self._token == before
+        # Keep retrying while the old token still works; once it has expired
+        # the next get_token_sync() fetches on demand and restarts the cycle
+        if failed and self._valid():
+            self._schedule_refresh_sync(REFRESH_RETRY_DELAY)
+
+    # -------------------- Helpers --------------------
+
+    def _token_request(self) -> Dict[str, str]:
+        return {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id or "",
+            "client_secret": self.client_secret or "",
+            "scope": "general",
+        }
+
+    def _store(self, body: Dict[str, Any]) -> None:
+        token = body.get("access_token")
+        if not token:
+            raise ValueError("no access_token in response")
+        ttl = float(body.get("expires_in") or DEFAULT_TOKEN_TTL)
+        self._token = token
+        self._expires_at = time.time() + ttl
+        logging.info(f"[hostaway_auth] New access token, expires in {int(ttl)}s")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "client_credentials" if self.uses_client_credentials else "static",
+            "token_valid": self._valid() if self.uses_client_credentials else bool(self.static_token),
+            "expires_in_seconds": max(0, int(self._expires_at - time.time())) if self._token else 0,
+            "fetches": self._stats["fetches"],
+            "fetch_failures": self._stats["fetch_failures"],
+            "coalesced": self._stats["coalesced"],
+            "proactive_refreshes": self._stats["proactive_refreshes"],
+            "invalidations": self._stats["invalidations"],
+        }
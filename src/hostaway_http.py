@@ -0,0 +1,243 @@
+# file: src/hostaway_http.py
+"""
+Shared HTTP Client for the Hostaway API
+---------------------------------------
+Handles:
+- One long-lived, connection-pooled client per process (async and sync)
+- Keep-alive and HTTP/2 (when the h2 package is installed)
+- Per-endpoint timeouts
+- Handshake and connection-reuse statistics
+- Bearer auth from the token manager, with one replay after a 401
+- Client-side rate limiting and 429 retries (see hostaway_rate_limit)
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import httpx
+
+from src.hostaway_auth import HostawayTokenManager
+from src.hostaway_rate_limit import HOSTAWAY_MAX_RETRIES, rate_limiter
+from src.upstream import count_upstream_call, count_upstream_bytes
+
+HOSTAWAY_API_BASE = os.getenv("HOSTAWAY_API_BASE", "https://api.hostaway.com/v1")
+
+# Pool configuration
+HOSTAWAY_POOL_MAX_CONNECTIONS = int(os.getenv("HOSTAWAY_POOL_MAX_CONNECTIONS", "20"))
+HOSTAWAY_POOL_MAX_KEEPALIVE = int(os.getenv("HOSTAWAY_POOL_MAX_KEEPALIVE", "10"))
+HOSTAWAY_KEEPALIVE_EXPIRY = float(os.getenv("HOSTAWAY_KEEPALIVE_EXPIRY", "60"))  # seconds
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+HOSTAWAY_HTTP2 = _H2_AVAILABLE and bool(int(os.getenv("HOSTAWAY_HTTP2", "1")))
+
+# Read timeouts per endpoint family (seconds); connect timeout is shared
+ENDPOINT_TIMEOUTS = {
+    "reservation": 8.0,
+    "listing": 8.0,
+    "conversation": 8.0,
+    "messages": 10.0,
+    "send_message": 15.0,
+}
+DEFAULT_TIMEOUT = float(os.getenv("HOSTAWAY_TIMEOUT", "10"))
+CONNECT_TIMEOUT = float(os.getenv("HOSTAWAY_CONNECT_TIMEOUT", "5"))
+
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+_sync_lock = threading.Lock()
+
+_stats: Counter = Counter()
+
+
+# -------------------- Client Construction --------------------
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HOSTAWAY_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HOSTAWAY_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HOSTAWAY_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout_for(endpoint: str) -> httpx.Timeout:
+    return httpx.Timeout(ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT), connect=CONNECT_TIMEOUT)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the process-wide async Hostaway client, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=HOSTAWAY_API_BASE,
+            http2=HOSTAWAY_HTTP2,
+            limits=_limits(),
+            timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        logging.info(f"[hostaway_http] Created async client (http2={HOSTAWAY_HTTP2})")
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """Return the process-wide sync Hostaway client, for callers outside the event loop."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(
+                base_url=HOSTAWAY_API_BASE,
+                http2=HOSTAWAY_HTTP2,
+                limits=_limits(),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+            logging.info(f"[hostaway_http] Created sync client (http2={HOSTAWAY_HTTP2})")
+    return _sync_client
+
+
+async def close_clients() -> None:
+    """Close pooled connections. Call from the FastAPI shutdown event."""
+    global _async_client, _sync_client
+    await token_manager.close()
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+token_manager = HostawayTokenManager(get_async_client, get_sync_client)
+
+
+# -------------------- Connection Tracing --------------------
+
+def _record_trace(event_name: str) -> None:
+    # httpcore emits these once per new connection, never for reused ones
+    if event_name == "connection.connect_tcp.complete":
+        _stats["tcp_connects"] += 1
+    elif event_name == "connection.start_tls.complete":
+        _stats["tls_handshakes"] += 1
+    elif event_name == "http2.send_request_headers.started":
+        _stats["http2_requests"] += 1
+    elif event_name == "http11.send_request_headers.started":
+        _stats["http11_requests"] += 1
+
+
+async def _async_trace(event_name: str, info: Dict[str, Any]) -> None:
+    _record_trace(event_name)
+
+
+def _sync_trace(event_name: str, info: Dict[str, Any]) -> None:
+    _record_trace(event_name)
+
+
+# -------------------- Requests --------------------
+
+def _with_auth(kwargs: Dict[str, Any], token: Optional[str]) -> Dict[str, Any]:
+    if not token:
+        return kwargs
+    return {**kwargs, "headers": {**(kwargs.get("headers") or {}), "Authorization": f"Bearer {token}"}}
+
+
+async def hostaway_request(
+    method: str, path: str, endpoint: str, priority: Optional[int] = None, **kwargs: Any
+) -> httpx.Response:
+    """
+    Send an authenticated, rate-limited request to the Hostaway API over the
+    shared async client.
+
+    A 401 invalidates the token and the request is replayed once with a fresh
+    one. A 429 is retried up to HOSTAWAY_MAX_RETRIES times after a jittered
+    Retry-After / exponential delay.
+
+    Args:
+        method: HTTP method
+        path: Path relative to HOSTAWAY_API_BASE (e.g., "/listings/123")
+        endpoint: Endpoint family name, used for timeouts, rate limits and stats
+        priority: Rate-limit lane (defaults by endpoint; lower goes first)
+        **kwargs: Passed through to httpx (headers, params, json, ...)
+
+    Returns:
+        The httpx.Response (raises httpx errors on transport failure)
+    """
+    kwargs.setdefault("timeout", _timeout_for(endpoint))
+    auth_replayed, retries = False, 0
+    while True:
+        await rate_limiter.acquire(endpoint, priority)
+        token = await token_manager.get_token()
+        count_upstream_call(endpoint)
+        _stats["requests"] += 1
+        resp = await get_async_client().request(
+            method, path, extensions={"trace": _async_trace}, **_with_auth(kwargs, token)
+        )
+        count_upstream_bytes(endpoint, resp.num_bytes_downloaded)
+        if resp.status_code == 401 and not auth_replayed and token_manager.uses_client_credentials:
+            auth_replayed = True
+            _stats["auth_replays"] += 1
+            token_manager.invalidate(token)
+            continue
+        if resp.status_code == 429:
+            delay = rate_limiter.retry_delay(resp, retries)
+            rate_limiter.record_429(endpoint, delay, gave_up=retries >= HOSTAWAY_MAX_RETRIES)
+            if retries < HOSTAWAY_MAX_RETRIES:
+                retries += 1
+                await asyncio.sleep(delay)
+                continue
+        return resp
+
+
+def hostaway_request_sync(method: str, path: str, endpoint: str, **kwargs: Any) -> httpx.Response:
+    """
+    Sync counterpart of hostaway_request() over the shared sync client.
+    The token buckets are async-only; 429s are still retried with backoff.
+    """
+    kwargs.setdefault("timeout", _timeout_for(endpoint))
+    auth_replayed, retries = False, 0
+    while True:
+        token = token_manager.get_token_sync()
+        count_upstream_call(endpoint)
+        _stats["requests"] += 1
+        resp = get_sync_client().request(
+            method, path, extensions={"trace": _sync_trace}, **_with_auth(kwargs, token)
+        )
+        count_upstream_bytes(endpoint, resp.num_bytes_downloaded)
+        if resp.status_code == 401 and not auth_replayed and token_manager.uses_client_credentials:
+            auth_replayed = True
+            _stats["auth_replays"] += 1
+            token_manager.invalidate(token)
+            continue
+        if resp.status_code == 429:
+            delay = rate_limiter.retry_delay(resp, retries)
+            rate_limiter.record_429(endpoint, delay, gave_up=retries >= HOSTAWAY_MAX_RETRIES)
+            if retries < HOSTAWAY_MAX_RETRIES:
+                retries += 1
+                time.sleep(delay)
+                continue
+        return resp
+
+
+def http_stats() -> Dict[str, Any]:
+    """Pool configuration plus handshake and connection-reuse counters."""
+    requests_sent = _stats["requests"]
+    new_connections = _stats["tcp_connects"]
+    reused = max(0, requests_sent - new_connections)
+    return {
+        "http2_enabled": HOSTAWAY_HTTP2,
+        "max_connections": HOSTAWAY_POOL_MAX_CONNECTIONS,
+        "max_keepalive": HOSTAWAY_POOL_MAX_KEEPALIVE,
+        "requests": requests_sent,
+        "tcp_connects": new_connections,
+        "tls_handshakes": _stats["tls_handshakes"],
+        "reused_connections": reused,
+        "reuse_ratio": round(reused / requests_sent, 3) if requests_sent else 0.0,
+        "http2_requests": _stats["http2_requests"],
+        "http11_requests": _stats["http11_requests"],
+        "auth_replays": _stats["auth_replays"],
+    }
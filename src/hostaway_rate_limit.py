@@ -0,0 +1,198 @@
+# file: src/hostaway_rate_limit.py
+"""
+Client-Side Rate Limiting for the Hostaway API
+----------------------------------------------
+Handles:
+- Token buckets per endpoint family, plus one account-wide bucket
+- Priority lanes: waiting requests are released lowest priority number
+  first, so interactive sends pre-empt background context fetches
+- 429 handling: Retry-After (or exponential backoff) with jitter, and a
+  pause of the affected buckets so the rest of the burst backs off too
+- Throttling stats for the admin metrics endpoint
+"""
+
+import os
+import time
+import random
+import asyncio
+import heapq
+import logging
+import itertools
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Priority lanes (lower number goes first)
+PRIORITY_INTERACTIVE = 0  # A human clicked Send in Slack
+PRIORITY_CONTEXT = 1      # Fetches a webhook is waiting on
+
+ENDPOINT_PRIORITY = {"send_message": PRIORITY_INTERACTIVE}
+
+# Hostaway allows roughly 15 requests per 10 seconds per IP; stay just under.
+# Override with HOSTAWAY_RATE_LIMITS="global=1.5/15,messages=1/5" (requests per second / burst)
+DEFAULT_RATE_LIMITS = "global=1.4/14"
+
+HOSTAWAY_MAX_RETRIES = int(os.getenv("HOSTAWAY_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("HOSTAWAY_RETRY_BASE_DELAY", "1.0"))  # seconds, doubled per retry
+RETRY_MAX_DELAY = 30.0
+
+
+class TokenBucket:
+    """Async token bucket that hands out tokens to waiters in priority order."""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._drainer: Optional[asyncio.Task] = None
+        self._stats: Counter = Counter()
+        self._wait_ms_by_priority: Counter = Counter()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _available(self) -> bool:
+        self._refill()
+        return self._tokens >= 1 and time.monotonic() >= self._paused_until
+
+    async def acquire(self, priority: int = PRIORITY_CONTEXT) -> float:
+        """
+        Wait for a token.
+
+        Returns:
+            Seconds spent waiting
+        """
+        self._stats["acquired"] += 1
+        if not self._waiters and self._available():
+            self._tokens -= 1
+            return 0.0
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain())
+        await future
+
+        waited = time.monotonic() - started
+        self._stats["throttled"] += 1
+        self._stats["wait_ms"] += int(waited * 1000)
+        self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], int(waited * 1000))
+        self._wait_ms_by_priority[priority] += int(waited * 1000)
+        return waited
+
+    async def _drain(self) -> None:
+        """Release waiters one token at a time, highest priority first."""
+        while self._waiters:
+            if self._available():
+                _, _, future = heapq.heappop(self._waiters)
+                if future.done():  # Waiter was cancelled
+                    continue
+                self._tokens -= 1
+                future.set_result(None)
+                continue
+            delay = max((1 - self._tokens) / self.rate, self._paused_until - time.monotonic(), 0.005)
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request on this bucket for `seconds` (after a 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self._stats["pauses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        throttled = self._stats["throttled"]
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "acquired": self._stats["acquired"],
+            "throttled": throttled,
+            "waiting": len(self._waiters),
+            "avg_wait_ms": round(self._stats["wait_ms"] / throttled, 1) if throttled else 0.0,
+            "max_wait_ms": self._stats["max_wait_ms"],
+            "wait_ms_by_priority": dict(self._wait_ms_by_priority),
+            "pauses": self._stats["pauses"],
+        }
+
+
+def _parse_rate_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    limits: Dict[str, Tuple[float, float]] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        try:
+            family, value = part.split("=")
+            rate, burst = value.split("/")
+            limits[family.strip()] = (float(rate), float(burst))
+        except ValueError:
+            logging.warning(f"[rate_limit] Ignoring malformed HOSTAWAY_RATE_LIMITS entry: {part!r}")
+    return limits
+
+
+class HostawayRateLimiter:
+    """One account-wide bucket plus optional per-endpoint-family buckets."""
+
+    def __init__(self, spec: str):
+        limits = _parse_rate_limits(DEFAULT_RATE_LIMITS)
+        limits.update(_parse_rate_limits(spec))
+        self.buckets = {name: TokenBucket(name, rate, burst) for name, (rate, burst) in limits.items()}
+        self._stats: Counter = Counter()
+
+    def _buckets_for(self, endpoint: str) -> List[TokenBucket]:
+        buckets = [self.buckets[endpoint]] if endpoint in self.buckets else []
+        return buckets + [self.buckets["global"]]
+
+    async def acquire(self, endpoint: str, priority: Optional[int] = None) -> None:
+        if priority is None:
+            priority = ENDPOINT_PRIORITY.get(endpoint, PRIORITY_CONTEXT)
+        for bucket in self._buckets_for(endpoint):
+            await bucket.acquire(priority)
+
+    def retry_delay(self, resp: httpx.Response, retry: int) -> float:
+        """Delay before retrying a 429: Retry-After if given, else exponential, both jittered."""
+        delay = _retry_after_seconds(resp.headers.get("Retry-After"))
+        if delay is None:
+            delay = RETRY_BASE_DELAY * (2 ** retry)
+        return min(RETRY_MAX_DELAY, delay) * random.uniform(1.0, 1.25)
+
+    def record_429(self, endpoint: str, delay: float, gave_up: bool) -> None:
+        self._stats["rate_limited"] += 1
+        self._stats["gave_up" if gave_up else "retried"] += 1
+        if gave_up:
+            logging.error(f"[rate_limit] {endpoint}: still 429 after {HOSTAWAY_MAX_RETRIES} retries")
+            return
+        logging.warning(f"[rate_limit] {endpoint}: 429 from Hostaway, backing off {delay:.1f}s")
+        for bucket in self._buckets_for(endpoint):
+            bucket.pause(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "responses_429": self._stats["rate_limited"],
+            "retried": self._stats["retried"],
+            "gave_up": self._stats["gave_up"],
+            "buckets": {name: bucket.stats() for name, bucket in self.buckets.items()},
+        }
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse Retry-After as delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+rate_limiter = HostawayRateLimiter(os.getenv("HOSTAWAY_RATE_LIMITS", ""))
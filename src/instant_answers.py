@@ -0,0 +1,229 @@
+# file: src/instant_answers.py
+"""
+Instant-Answer Tier
+-------------------
+Handles:
+- Indexing host-approved answers per listing: templates in MEMORY_YAML_PATH
+  and the custom_responses table in the learning database (never the sample
+  legacy/memory.yaml shipped with the repo)
+- TF-IDF cosine matching of the guest's message against their questions,
+  through an inverted index so only candidates sharing a term are scored
+- Returning the approved answer as the draft when the best match clears
+  INSTANT_ANSWER_THRESHOLD, so the webhook makes no LLM call
+
+Off unless INSTANT_ANSWERS_ENABLED=1. The index is rebuilt in a background thread every INSTANT_ANSWER_REFRESH
+seconds; matching keeps using the previous index meanwhile.
+"""
+
+import os
+import re
+import math
+import time
+import sqlite3
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+INSTANT_ANSWERS_ENABLED = bool(int(os.getenv("INSTANT_ANSWERS_ENABLED", "0")))
+INSTANT_ANSWER_THRESHOLD = float(os.getenv("INSTANT_ANSWER_THRESHOLD", "0.85"))  # Cosine similarity
+INSTANT_ANSWER_REFRESH = 300  # seconds
+LEARNING_DB_PATH = os.getenv("LEARNING_DB_PATH", "/var/data/learning.db")
+MEMORY_YAML_PATH = os.getenv("MEMORY_YAML_PATH", "/var/data/memory.yaml")
+
+GLOBAL = "*"  # Index bucket for answers that apply to every listing
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a an the is are am was be do does did i we you it to of in on at for and or my our me "
+    "there this that can could would will please hi hello hey thanks thank".split()
+)
+
+
+@dataclass
+class InstantAnswer:
+    answer: str
+    question: str     # The approved question that matched
+    score: float      # Cosine similarity
+    source: str       # "template" or "custom_response"
+    intent: str = "general"
+
+
+@dataclass
+class _Entry:
+    question: str
+    answer: str
+    source: str
+    intent: str
+    vector: Dict[str, float]
+
+
+def _tokens(text: str) -> List[str]:
+    # "what's" -> "what", "guests'" -> "guests"
+    words = (t.split("'", 1)[0] for t in _TOKEN_RE.findall((text or "").lower()))
+    return [w for w in words if w and w not in _STOPWORDS]
+
+
+class _Index:
+    """TF-IDF vectors of approved questions with a per-listing inverted index."""
+
+    def __init__(self, rows: List[Tuple[str, str, str, str, str]]):
+        # rows: (listing_id, question, answer, source, intent)
+        docs = [(row, Counter(_tokens(row[1]))) for row in rows if row[1] and row[2]]
+        df = Counter(term for _, tf in docs for term in tf)
+        n = len(docs)
+        self.idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        self.entries: List[_Entry] = []
+        self.postings: Dict[Tuple[str, str], List[int]] = defaultdict(list)  # (listing, term) -> entry ids
+        for (listing_id, question, answer, source, intent), tf in docs:
+            vector = self._normalize({t: c * self.idf[t] for t, c in tf.items()})
+            if not vector:
+                continue
+            entry_id = len(self.entries)
+            self.entries.append(_Entry(question, answer, source, intent, vector))
+            for term in vector:
+                self.postings[(listing_id, term)].append(entry_id)
+
+    @staticmethod
+    def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {t: w / norm for t, w in vector.items()} if norm else {}
+
+    def best(self, listing_id: str, text: str) -> Optional[Tuple[float, _Entry]]:
+        # Unknown terms get the highest idf: they make a match less likely, as they should
+        max_idf = max(self.idf.values(), default=1.0)
+        query = self._normalize({t: c * self.idf.get(t, max_idf) for t, c in Counter(_tokens(text)).items()})
+        scores: Dict[int, float] = defaultdict(float)
+        for term, weight in query.items():
+            for bucket in (listing_id, GLOBAL):
+                for entry_id in self.postings.get((bucket, term), ()):
+                    scores[entry_id] += weight * self.entries[entry_id].vector[term]
+        if not scores:
+            return None
+        entry_id = max(scores, key=scores.get)
+        return scores[entry_id], self.entries[entry_id]
+
+
+# -------------------- Loading --------------------
+
+def _load_templates() -> List[Tuple[str, str, str, str, str]]:
+    if not os.path.exists(MEMORY_YAML_PATH):
+        return []
+    try:
+        with open(MEMORY_YAML_PATH, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except Exception as e:
+        logging.warning(f"[instant] Could not read {MEMORY_YAML_PATH}: {e}")
+        return []
+    return [
+        (
+            str(t.get("listing_id") or GLOBAL),
+            str(t.get("question") or ""),
+            str(t.get("answer") or ""),
+            "template",
+            str(t.get("intent") or "general"),
+        )
+        for t in data.get("templates") or []
+        if isinstance(t, dict)
+    ]
+
+
+def _load_custom_responses() -> List[Tuple[str, str, str, str, str]]:
+    if not os.path.exists(LEARNING_DB_PATH):
+        return []
+    try:
+        conn = sqlite3.connect(f"file:{LEARNING_DB_PATH}?mode=ro", uri=True, timeout=5)
+        try:
+            rows = conn.execute("SELECT listing_id, question_text, response_text FROM custom_responses").fetchall()
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.warning(f"[instant] Could not read custom_responses: {e}")
+        return []
+    return [(str(r[0] or GLOBAL), r[1] or "", r[2] or "", "custom_response", "general") for r in rows]
+
+
+def _build_index() -> _Index:
+    started = time.perf_counter()
+    index = _Index(_load_templates() + _load_custom_responses())
+    logging.info(
+        f"[instant] Indexed {len(index.entries)} approved answers in {1000 * (time.perf_counter() - started):.1f} ms"
+    )
+    return index
+
+
+# -------------------- Matching --------------------
+
+_index: Optional[_Index] = None
+_built_at = 0.0
+_rebuild_task: Optional[asyncio.Task] = None
+_stats: Counter = Counter()
+_match_ms: List[float] = []
+
+
+async def _current_index() -> _Index:
+    global _index, _built_at, _rebuild_task
+    if _index is None:
+        _index = await asyncio.to_thread(_build_index)
+        _built_at = time.monotonic()
+    elif time.monotonic() - _built_at > INSTANT_ANSWER_REFRESH and (_rebuild_task is None or _rebuild_task.done()):
+        _built_at = time.monotonic()
+        _rebuild_task = asyncio.create_task(_rebuild())
+    return _index
+
+
+async def _rebuild() -> None:
+    global _index
+    try:
+        _index = await asyncio.to_thread(_build_index)
+    except Exception as e:
+        logging.error(f"[instant] Index rebuild failed: {e}")
+
+
+async def match_instant_answer(listing_id: Any, guest_message: str) -> Optional[InstantAnswer]:
+    """
+    Approved answer for this message, if one matches confidently enough.
+
+    Args:
+        listing_id: Hostaway listing ID (answers for other listings are ignored)
+        guest_message: The guest's message
+
+    Returns:
+        InstantAnswer, or None if disabled or below INSTANT_ANSWER_THRESHOLD
+    """
+    if not INSTANT_ANSWERS_ENABLED or not guest_message:
+        return None
+    try:
+        index = await _current_index()
+        started = time.perf_counter()
+        best = index.best(str(listing_id) if listing_id is not None else GLOBAL, guest_message)
+        _match_ms.append(1000 * (time.perf_counter() - started))
+        del _match_ms[:-200]
+    except Exception as e:
+        logging.error(f"[instant] Matching failed: {e}")
+        return None
+
+    if best is None or best[0] < INSTANT_ANSWER_THRESHOLD:
+        _stats["misses"] += 1
+        return None
+
+    score, entry = best
+    _stats["hits"] += 1
+    logging.info(f"[instant] Matched '{entry.question}' ({score:.2f}) - skipping the LLM")
+    return InstantAnswer(entry.answer, entry.question, round(score, 3), entry.source, entry.intent)
+
+
+def instant_answer_stats() -> Dict[str, Any]:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "enabled": INSTANT_ANSWERS_ENABLED,
+        "threshold": INSTANT_ANSWER_THRESHOLD,
+        "indexed_answers": len(_index.entries) if _index else 0,
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "llm_skip_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        "avg_match_ms": round(sum(_match_ms) / len(_match_ms), 3) if _match_ms else 0.0,
+    }
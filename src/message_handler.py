@@ -1,44 +1,92 @@
 import os
+import hmac
 import json
+import time
+import base64
+import asyncio
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Awaitable, List, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, Request
-from slack_sdk import WebClient
+from fastapi.responses import JSONResponse
+from slack_sdk.web.async_client import AsyncWebClient
 
 # Local imports
-from src.api_client import (
-    fetch_hostaway_reservation,
-    fetch_hostaway_listing,
-    fetch_hostaway_conversation,
-)
 from src.ai_assistant_enhanced import generate_smart_reply
-from src.ai_assistant import analyze_conversation_thread
+from src.ai_assistant import analysis_cache, analyze_conversation_thread
+from src.combined_reply import REPLY_MODE, generate_combined_reply
 from src.db import already_processed, mark_processed, log_ai_exchange
+from src.instant_answers import InstantAnswer, match_instant_answer
 from src.places import should_fetch_local_recs, build_local_recs
+from src.request_context import GuestMessageContext
+from src.reservation_events import is_reservation_event, apply_reservation_event
+from src.upstream import finish_upstream_tracking
+from src.webhook_queue import (
+    WEBHOOK_DEADLINE, WEBHOOK_QUEUE_ENABLED, WEBHOOK_REPLY_MIN, enqueue, record_skipped, record_stage, timed_stage,
+)
 
 # --- Setup ---
 message_handler_bp = APIRouter()
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "")
 SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "")
-client = WebClient(token=SLACK_BOT_TOKEN) if SLACK_BOT_TOKEN else None
+client = AsyncWebClient(token=SLACK_BOT_TOKEN) if SLACK_BOT_TOKEN else None
 
 logging.basicConfig(level=logging.INFO)
 
+# HTTP Basic credentials set on the Hostaway unified webhook. Reservation
+# events write the facts replies are built from, so they are only applied
+# when these are configured (and match).
+HOSTAWAY_WEBHOOK_LOGIN = os.getenv("HOSTAWAY_WEBHOOK_LOGIN", "")
+HOSTAWAY_WEBHOOK_PASSWORD = os.getenv("HOSTAWAY_WEBHOOK_PASSWORD", "")
+
+# Draft posted when the reply doesn't arrive in time (the card notes it was skipped)
+REPLY_TIMEOUT_FALLBACK = "Thanks for reaching out! Let me look into that and get back to you shortly."
+
 
 # -------------------------------------------------------------------
 # 🔹 Unified Webhook Endpoint
 # -------------------------------------------------------------------
+def webhook_auth_configured() -> bool:
+    return bool(HOSTAWAY_WEBHOOK_LOGIN and HOSTAWAY_WEBHOOK_PASSWORD)
+
+
+def verify_webhook_auth(authorization: Optional[str]) -> bool:
+    """Check the webhook's Basic Authorization header against the configured login/password."""
+    scheme, _, encoded = (authorization or "").partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        login, _, password = base64.b64decode(encoded).decode("utf-8").partition(":")
+    except Exception:
+        return False
+    login_ok = hmac.compare_digest(login, HOSTAWAY_WEBHOOK_LOGIN)
+    password_ok = hmac.compare_digest(password, HOSTAWAY_WEBHOOK_PASSWORD)
+    return login_ok and password_ok
+
+
 @message_handler_bp.post("/unified-webhook")
 async def unified_webhook(request: Request):
+    if webhook_auth_configured() and not verify_webhook_auth(request.headers.get("Authorization")):
+        logging.warning("[webhook] Rejected webhook with missing or wrong credentials")
+        return JSONResponse({"status": "unauthorized"}, status_code=401)
+
     payload = await request.json()
     logging.info(f"🧩 DEBUG WEBHOOK PAYLOAD:\n{json.dumps(payload, indent=2)}")
 
+    # Reservation created/updated/cancelled: refresh the local reservation cache
+    if is_reservation_event(payload):
+        if not webhook_auth_configured():
+            # Unauthenticated events could overwrite reservation facts; reads go to Hostaway instead
+            logging.warning("[webhook] HOSTAWAY_WEBHOOK_LOGIN/PASSWORD not set - reservation event ignored")
+            return {"status": "ignored"}
+        return {"status": apply_reservation_event(payload)}
+
     if payload.get("object") != "conversationMessage" or payload.get("event") != "message.received":
         return {"status": "ignored"}
 
     data = payload.get("data", {})
+    data["_received_at"] = time.monotonic()  # The deadline runs from here, queue wait included
     event_key = f"{data.get('id')}:{data.get('conversationId')}"
     if already_processed(event_key):
         return {"status": "duplicate"}
@@ -48,74 +96,215 @@ async def unified_webhook(request: Request):
         mark_processed(event_key)
         return {"status": "ignored"}
 
-    conv_id = data.get("conversationId")
-    reservation_id = data.get("reservationId")
-    listing_id = data.get("listingMapId")
+    # Queue mode: ack immediately, a background worker runs the pipeline
+    if WEBHOOK_QUEUE_ENABLED:
+        if not enqueue(data):
+            # Not marked processed, so Hostaway's retry gets another chance
+            return JSONResponse({"status": "busy"}, status_code=503)
+        mark_processed(event_key)
+        return JSONResponse({"status": "queued"}, status_code=202)
+
+    await process_guest_message(data)
+    mark_processed(event_key)
+    return {"status": "ok"}
+
+
+async def process_guest_message(data: Dict[str, Any]) -> None:
+    """
+    Run the full reply pipeline for one guest message and post the card to Slack.
+
+    The deadline is WEBHOOK_DEADLINE seconds from when the webhook was
+    received, so time spent queued counts. Mood/summary and nearby places run
+    alongside the reply and are dropped to placeholders if they'd push the
+    Slack post past it; the reply gets whatever is left (at least
+    WEBHOOK_REPLY_MIN seconds) and falls back to a holding message.
+
+    Args:
+        data: The "data" section of a Hostaway message.received webhook
+    """
+    received_at = data.pop("_received_at", None) or time.monotonic()
+    deadline = received_at + WEBHOOK_DEADLINE
+    skipped: List[str] = []
 
     # -------------------------------------------------------------------
-    # Fetch reservation + listing + conversation context
+    # Fetch reservation + listing + conversation context (once, concurrently)
     # -------------------------------------------------------------------
-    reservation = fetch_hostaway_reservation(reservation_id) or {}
-    res_data = reservation.get("result", {})
-    listing = fetch_hostaway_listing(listing_id) or {}
-    listing_data = listing.get("result", {})
-    conversation = fetch_hostaway_conversation(conv_id) or {}
-    messages = conversation.get("result", {}).get("conversationMessages", [])
+    with timed_stage("fetch"):
+        ctx = await GuestMessageContext.load(data)
+
+    conv_id = ctx.conversation_id
+    guest_message = ctx.guest_message
+    lat, lng = ctx.listing.get("lat"), ctx.listing.get("lng")
 
     # -------------------------------------------------------------------
-    # Extract details (INCLUDING GUEST PHOTO 📸)
+    # Optional: Nearby Recommendations (runs alongside the AI calls)
     # -------------------------------------------------------------------
-    guest_name = res_data.get("guestFirstName") or res_data.get("guestName") or "Guest"
-    guest_photo = res_data.get("guestPicture")  # 🆕 Extract guest photo URL
-    check_in = res_data.get("arrivalDate")
-    check_out = res_data.get("departureDate")
-    guest_count = res_data.get("numberOfGuests") or res_data.get("adults") or "?"
-    status = res_data.get("status", "unknown").capitalize()
-    platform = res_data.get("channelName") or "Hostaway"
-    property_name = listing_data.get("name") or "Unnamed Property"
-    property_address = listing_data.get("address") or "Unknown Address"
-    lat, lng = listing_data.get("lat"), listing_data.get("lng")
+    places_task = None
+    if should_fetch_local_recs(guest_message):
+        places_task = asyncio.create_task(_timed("places", build_local_recs(lat, lng, guest_message)))
 
     # -------------------------------------------------------------------
-    # AI: Analyze mood + summary using Assistants API
+    # Instant answer: a host-approved FAQ answer, no LLM call at all
     # -------------------------------------------------------------------
-    try:
-        mood, summary = analyze_conversation_thread(str(conv_id), messages)
-    except Exception as e:
-        logging.error(f"[AI] analyze_conversation_thread failed: {e}")
-        mood, summary = "Neutral", "Summary unavailable."
+    with timed_stage("instant"):
+        instant = await match_instant_answer(ctx.listing_id, guest_message)
 
     # -------------------------------------------------------------------
-    # AI: Generate reply using Enhanced Assistants API with Hostaway data
+    # AI: Reply + mood + summary + intent in one structured call
     # -------------------------------------------------------------------
-    # Enhanced context with IDs so AI can fetch real Hostaway data
-    enhanced_context = {
-        "conversation_id": conv_id,
-        "reservation_id": reservation_id,
-        "listing_id": listing_id,
-        "guest_name": guest_name,
-    }
-    
-    # Use the smart reply that fetches real data
-    ai_reply = generate_smart_reply(str(conv_id), guest_message, enhanced_context)
+    # Mood from the previous analysis of this conversation (this one runs
+    # alongside the reply), so an upset guest's reply routes to the strong model
+    previous = analysis_cache.peek(str(conv_id))
+    prior_mood = previous[0] if previous else None
+
+    combined = None
+    if not instant and REPLY_MODE == "combined":
+        with timed_stage("combined"):
+            combined = await _required_stage(generate_combined_reply(ctx, mood=prior_mood), "reply", deadline, skipped, None)
+
+    if instant:
+        ai_reply, intent = instant.answer, instant.intent
+        mood, summary = "Neutral", f"Known question: {instant.question}"
+    elif combined:
+        ai_reply, mood, summary, intent = combined.reply, combined.mood, combined.summary, combined.intent.value
+        analysis_cache.put(str(conv_id), ctx.messages, (mood, summary))
+    elif "reply" in skipped:
+        # Combined call ran out of time: no budget left for the split path
+        ai_reply, mood, summary, intent = REPLY_TIMEOUT_FALLBACK, "Neutral", "Summary unavailable.", "general"
+    else:
+        if REPLY_MODE == "combined":
+            logging.warning(f"[AI] Combined call failed for conversation {conv_id} - using split path")
+
+        # Split path: mood + summary via the Assistants API, concurrently with
+        # the reply from the enhanced assistant
+        analyze_task = asyncio.create_task(
+            _timed("analyze", analyze_conversation_thread(str(conv_id), ctx.messages))
+        )
+        with timed_stage("reply"):
+            ai_reply = await _required_stage(
+                generate_smart_reply(ctx, mood=prior_mood), "reply", deadline, skipped, REPLY_TIMEOUT_FALLBACK
+            )
+        mood, summary = await _optional_stage(
+            analyze_task, "mood/summary", deadline, skipped, ("Neutral", "Summary unavailable.")
+        )
+        intent = "general"
 
     # Log exchange
     log_ai_exchange(
         conversation_id=str(conv_id),
         guest_message=guest_message,
         ai_suggestion=ai_reply,
-        intent="general",
+        intent=intent,
     )
 
+    nearby_places = []
+    if places_task:
+        nearby_places = await _optional_stage(places_task, "nearby places", deadline, skipped, [])
+
+    blocks = build_slack_blocks(ctx, ai_reply, mood, summary, nearby_places, skipped, instant)
+    guest_photo = ctx.reservation.get("guestPicture")
+
     # -------------------------------------------------------------------
-    # Optional: Nearby Recommendations
+    # Post to Slack
     # -------------------------------------------------------------------
-    nearby_places = []
-    if should_fetch_local_recs(guest_message):
+    if client and SLACK_CHANNEL:
         try:
-            nearby_places = build_local_recs(lat, lng, guest_message)
+            with timed_stage("slack"):
+                await client.chat_postMessage(channel=SLACK_CHANNEL, blocks=blocks, text="New guest message")
+            record_stage("received_to_post", time.monotonic() - received_at)
+            logging.info(f"✅ Posted conversation {conv_id} to Slack (with guest photo: {bool(guest_photo)})")
         except Exception as e:
-            logging.warning(f"[places] Failed to build local recs: {e}")
+            logging.error(f"[Slack] Failed to post: {e}")
+    else:
+        logging.warning("⚠️ Slack client or channel not configured.")
+
+    finish_upstream_tracking(ctx.upstream_calls, f"conversation {conv_id}")
+
+
+async def _timed(stage: str, coro: Awaitable[Any]) -> Any:
+    """Await coro, recording its wall time under stage (for concurrent tasks)."""
+    with timed_stage(stage):
+        return await coro
+
+
+async def _optional_stage(
+    task: "asyncio.Task",
+    stage: str,
+    deadline: float,
+    skipped: List[str],
+    placeholder: Any,
+) -> Any:
+    """
+    Result of an optional stage, or placeholder if it fails or isn't done by
+    the deadline (the task is cancelled and the stage listed as skipped).
+    """
+    remaining = deadline - time.monotonic()
+    try:
+        return await asyncio.wait_for(task, max(0.0, remaining))
+    except asyncio.TimeoutError:
+        logging.warning(f"[deadline] Skipped {stage} to stay within {WEBHOOK_DEADLINE:.0f}s")
+        skipped.append(stage)
+        record_skipped(stage)
+    except Exception as e:
+        logging.error(f"[deadline] {stage} failed: {e}")
+    return placeholder
+
+
+async def _required_stage(
+    coro: Awaitable[Any],
+    stage: str,
+    deadline: float,
+    skipped: List[str],
+    fallback: Any,
+) -> Any:
+    """
+    Result of a required stage, bounded by what's left of the deadline but
+    never less than WEBHOOK_REPLY_MIN seconds; fallback if it runs out.
+    """
+    timeout = max(deadline - time.monotonic(), WEBHOOK_REPLY_MIN)
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        logging.warning(f"[deadline] {stage} not ready after {timeout:.1f}s - posting a fallback")
+        skipped.append(stage)
+        record_skipped(stage)
+        return fallback
+
+
+def build_slack_blocks(
+    ctx: GuestMessageContext,
+    ai_reply: str,
+    mood: str,
+    summary: str,
+    nearby_places: List[Dict[str, Any]],
+    skipped: Optional[List[str]] = None,
+    instant: Optional[InstantAnswer] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Build the Slack card for a guest message from the request context.
+    skipped lists optional stages cut to meet the latency budget; instant is
+    set when the draft is a host-approved answer rather than AI-generated.
+
+    Returns:
+        Slack Block Kit blocks
+    """
+    res = ctx.reservation
+    listing = ctx.listing
+    conv_id = ctx.conversation_id
+    guest_message = ctx.guest_message
+
+    # -------------------------------------------------------------------
+    # Extract details (INCLUDING GUEST PHOTO 📸)
+    # -------------------------------------------------------------------
+    guest_name = ctx.guest_name
+    guest_photo = res.get("guestPicture")  # 🆕 Extract guest photo URL
+    check_in = res.get("arrivalDate")
+    check_out = res.get("departureDate")
+    guest_count = res.get("numberOfGuests") or res.get("adults") or "?"
+    status = res.get("status", "unknown").capitalize()
+    platform = res.get("channelName") or "Hostaway"
+    property_name = listing.get("name") or "Unnamed Property"
+    property_address = listing.get("address") or "Unknown Address"
 
     # -------------------------------------------------------------------
     # Format Slack Message (emoji-rich) WITH GUEST PHOTO 📸
@@ -140,6 +329,11 @@ async def unified_webhook(request: Request):
     )
 
     suggestion_text = f"💡 *Suggested Reply:*\n{ai_reply}"
+    if instant:
+        suggestion_text = (
+            f"⚡ *Instant Draft* (approved answer, no AI call):\n{ai_reply}\n"
+            f"_Matched \"{instant.question}\" ({instant.score:.0%} similar)_"
+        )
 
     # Add local recs (optional)
     if nearby_places:
@@ -176,6 +370,16 @@ async def unified_webhook(request: Request):
             "text": {"type": "mrkdwn", "text": header_text}
         })
     
+    # Note stages that were cut, so placeholders aren't mistaken for analysis
+    if skipped:
+        blocks.append({
+            "type": "context",
+            "elements": [{
+                "type": "mrkdwn",
+                "text": f"⏱️ Skipped to post within {WEBHOOK_DEADLINE:.0f}s: {', '.join(skipped)}",
+            }],
+        })
+
     # Add divider and suggestion
     blocks.extend([
         {"type": "divider"},
@@ -223,7 +427,7 @@ async def unified_webhook(request: Request):
                     "action_id": "send_guest_portal",
                     "value": json.dumps({
                         "conversation_id": conv_id,
-                        "guest_portal_url": res_data.get("guestPortalUrl"),
+                        "guest_portal_url": res.get("guestPortalUrl"),
                         "status": status,
                     }),
                 },
@@ -231,17 +435,4 @@ async def unified_webhook(request: Request):
         },
     ])
 
-    # -------------------------------------------------------------------
-    # Post to Slack
-    # -------------------------------------------------------------------
-    if client and SLACK_CHANNEL:
-        try:
-            client.chat_postMessage(channel=SLACK_CHANNEL, blocks=blocks, text="New guest message")
-            logging.info(f"✅ Posted conversation {conv_id} to Slack (with guest photo: {bool(guest_photo)})")
-        except Exception as e:
-            logging.error(f"[Slack] Failed to post: {e}")
-    else:
-        logging.warning("⚠️ Slack client or channel not configured.")
-
-    mark_processed(event_key)
-    return {"status": "ok"}
+    return blocks
@@ -0,0 +1,231 @@
+# file: src/message_store.py
+"""
+Local Conversation Message Store
+--------------------------------
+Handles:
+- SQLite copy of every Hostaway conversation we've seen
+- Incremental sync: only messages at or after the stored insertedOn
+  watermark are fetched, paging past Hostaway's per-request limit
+- Serving conversation history to the AI and summary layers from disk
+- Persisting each conversation's rolling summary (see conversation_context)
+"""
+
+import os
+import json
+import asyncio
+import logging
+import sqlite3
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.api_client import fetch_conversation_messages_page
+
+MESSAGE_STORE_PATH = os.getenv("MESSAGE_STORE_PATH", "/var/data/messages.db")
+MESSAGE_HISTORY_LIMIT = int(os.getenv("MESSAGE_HISTORY_LIMIT", "50"))  # Messages handed to the AI layers
+SYNC_PAGE_SIZE = 100        # Page size for the first sync of a conversation and follow-up pages
+INCREMENTAL_PAGE_SIZE = 10  # First page when we already have history; usually all that's needed
+MAX_SYNC_PAGES = 20         # Safety cap (2,000 messages) per sync
+
+# One sync at a time per conversation; a lock lives only while someone holds or awaits it
+_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_stats: Counter = Counter()
+
+
+def _db_path() -> str:
+    directory = os.path.dirname(MESSAGE_STORE_PATH)
+    if directory and not os.path.isdir(directory):
+        logging.warning(f"[message_store] {directory} missing - using ./messages.db")
+        return "messages.db"
+    return MESSAGE_STORE_PATH
+
+
+_DB_PATH = _db_path()
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """Connection that commits (or rolls back) and is closed when the block exits."""
+    conn = sqlite3.connect(_DB_PATH, timeout=10)
+    try:
+        with conn:
+            _create_schema(conn)
+            yield conn
+    finally:
+        conn.close()
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS messages (
+               conversation_id TEXT NOT NULL,
+               message_id TEXT NOT NULL,
+               inserted_on TEXT NOT NULL,
+               payload TEXT NOT NULL,
+               PRIMARY KEY (conversation_id, message_id)
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS sync_state (
+               conversation_id TEXT PRIMARY KEY,
+               watermark TEXT NOT NULL,
+               synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS summaries (
+               conversation_id TEXT PRIMARY KEY,
+               summary TEXT NOT NULL,
+               through_inserted_on TEXT NOT NULL,
+               through_message_id TEXT NOT NULL,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )"""
+    )
+
+
+# -------------------- Disk access (run in a thread) --------------------
+
+def _read_watermark(conversation_id: str) -> Optional[str]:
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT watermark FROM sync_state WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def _write_messages(conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+    rows = [
+        (conversation_id, str(m.get("id")), m.get("insertedOn") or "", json.dumps(m))
+        for m in messages
+        if m.get("id") is not None
+    ]
+    watermark = max((r[2] for r in rows), default="")
+    with _connect() as conn:
+        conn.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)", rows)
+        conn.execute(
+            """INSERT INTO sync_state (conversation_id, watermark) VALUES (?, ?)
+               ON CONFLICT(conversation_id) DO UPDATE SET
+                   watermark = MAX(watermark, excluded.watermark),
+                   synced_at = CURRENT_TIMESTAMP""",
+            (conversation_id, watermark),
+        )
+
+
+def _read_messages(conversation_id: str, limit: int) -> List[Dict[str, Any]]:
+    with _connect() as conn:
+        rows = conn.execute(
+            """SELECT payload FROM messages WHERE conversation_id = ?
+               ORDER BY inserted_on DESC, message_id DESC LIMIT ?""",
+            (conversation_id, limit),
+        ).fetchall()
+    return [json.loads(r[0]) for r in reversed(rows)]
+
+
+def _read_summary(conversation_id: str) -> Optional[Dict[str, str]]:
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT summary, through_inserted_on, through_message_id FROM summaries WHERE conversation_id = ?",
+            (conversation_id,),
+        ).fetchone()
+    if not row:
+        return None
+    return {"summary": row[0], "through_inserted_on": row[1], "through_message_id": row[2]}
+
+
+def _write_summary(conversation_id: str, summary: str, through_inserted_on: str, through_message_id: str) -> None:
+    with _connect() as conn:
+        conn.execute(
+            """INSERT OR REPLACE INTO summaries
+                   (conversation_id, summary, through_inserted_on, through_message_id)
+               VALUES (?, ?, ?, ?)""",
+            (conversation_id, summary, through_inserted_on, through_message_id),
+        )
+
+
+async def get_summary(conversation_id: Any) -> Optional[Dict[str, str]]:
+    """Stored rolling summary: {"summary", "through_inserted_on", "through_message_id"}."""
+    return await asyncio.to_thread(_read_summary, str(conversation_id))
+
+
+async def save_summary(conversation_id: Any, summary: str, through: Dict[str, Any]) -> None:
+    """Store the rolling summary, covering messages up to and including `through`."""
+    await asyncio.to_thread(
+        _write_summary, str(conversation_id), summary, through.get("insertedOn") or "", str(through.get("id"))
+    )
+
+
+# -------------------- Sync --------------------
+
+async def sync_conversation(conversation_id: Any) -> int:
+    """
+    Pull messages newer than the stored watermark into the store.
+
+    Hostaway returns messages newest first, so paging stops at the first
+    page that reaches back past the watermark. Messages stamped exactly at
+    the watermark are re-fetched and de-duplicated by id, so two messages
+    sharing a timestamp can't be skipped.
+
+    Returns:
+        Number of messages written (new or updated)
+    """
+    conv = str(conversation_id)
+    lock = _locks.get(conv)
+    if lock is None:
+        lock = _locks[conv] = asyncio.Lock()
+    async with lock:
+        watermark = await asyncio.to_thread(_read_watermark, conv)
+        limit = INCREMENTAL_PAGE_SIZE if watermark else SYNC_PAGE_SIZE
+        offset, fetched = 0, []
+
+        for _ in range(MAX_SYNC_PAGES):
+            page = await fetch_conversation_messages_page(int(conversation_id), limit, offset)
+            if page is None:
+                _stats["sync_errors"] += 1
+                break
+            _stats["pages"] += 1
+            fetched.extend(m for m in page if not watermark or (m.get("insertedOn") or "") >= watermark)
+            reached_watermark = watermark and any((m.get("insertedOn") or "") < watermark for m in page)
+            if len(page) < limit or reached_watermark:
+                break
+            offset += len(page)
+            limit = SYNC_PAGE_SIZE
+        else:
+            logging.warning(f"[message_store] Conversation {conv} hit the {MAX_SYNC_PAGES}-page sync cap")
+
+        if fetched:
+            await asyncio.to_thread(_write_messages, conv, fetched)
+        _stats["syncs"] += 1
+        _stats["messages_fetched"] += len(fetched)
+        return len(fetched)
+
+
+async def get_conversation_history(conversation_id: Any, limit: int = MESSAGE_HISTORY_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Sync the conversation, then return its most recent messages from disk.
+
+    Args:
+        conversation_id: Hostaway conversation ID
+        limit: Maximum messages to return
+
+    Returns:
+        Messages oldest first (same shape as Hostaway's API)
+    """
+    try:
+        await sync_conversation(conversation_id)
+    except Exception as e:
+        # Serve whatever we have on disk rather than nothing
+        _stats["sync_errors"] += 1
+        logging.error(f"[message_store] Sync of conversation {conversation_id} failed: {e}")
+    return await asyncio.to_thread(_read_messages, str(conversation_id), limit)
+
+
+def message_store_stats() -> Dict[str, Any]:
+    return {
+        "path": _DB_PATH,
+        "syncs": _stats["syncs"],
+        "pages_fetched": _stats["pages"],
+        "messages_fetched": _stats["messages_fetched"],
+        "avg_pages_per_sync": round(_stats["pages"] / _stats["syncs"], 2) if _stats["syncs"] else 0.0,
+        "sync_errors": _stats["sync_errors"],
+    }
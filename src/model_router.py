@@ -0,0 +1,204 @@
+# file: src/model_router.py
+"""
+Model Router
+------------
+Handles:
+- Picking the model per call: classification and summaries always go to the
+  cheap model (OPENAI_MODEL_ROUTER); replies and rewrites go to the cheap
+  model too unless the message is complex (long, a sensitive intent, or an
+  upset guest), in which case they go to the strong model (OPENAI_MODEL_REPLY)
+- Logging each routing decision with its reason
+- Per-model call counts, latency, tokens (cached vs. uncached input) and
+  estimated cost, for admin metrics
+
+Stdlib only, so the legacy modules can share it.
+"""
+
+import os
+import re
+import time
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from src.percentiles import percentile
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+CHEAP_MODEL = os.getenv("OPENAI_MODEL_ROUTER") or "gpt-4o-mini"
+STRONG_MODEL = os.getenv("OPENAI_MODEL_REPLY") or OPENAI_MODEL
+ROUTER_LONG_MESSAGE_WORDS = int(os.getenv("ROUTER_LONG_MESSAGE_WORDS", "80"))
+
+TASKS = ("classification", "summary", "reply", "rewrite")
+ALWAYS_CHEAP = {"classification", "summary"}
+
+# Intents where a weak answer costs more than the extra tokens
+ESCALATE_INTENTS = {
+    "complaint", "refund", "refund_request", "cancellation", "damage", "emergency",
+    "safety", "maintenance_issue", "accessibility", "dispute",
+}
+NEGATIVE_MOODS = {"angry", "upset", "frustrated", "annoyed", "disappointed", "anxious", "worried", "furious"}
+_ESCALATE_WORDS = re.compile(
+    r"\b(refund|cancel\w*|complain\w*|unacceptable|disappoint\w*|terrible|awful|dirty|broken|"
+    r"bed ?bugs?|mold|leak\w*|flood\w*|injur\w*|police|lawyer|chargeback|emergency|unsafe)\b",
+    re.I,
+)
+
+# USD per 1M tokens (input, cached input, output); longest matching prefix wins
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+}
+
+LATENCY_SAMPLE_SIZE = 200  # Recent calls kept per model
+
+
+@dataclass
+class Route:
+    model: str
+    task: str
+    reason: str
+
+
+def route(
+    task: str,
+    text: str = "",
+    intent: Optional[str] = None,
+    mood: Optional[str] = None,
+) -> Route:
+    """
+    Model for one call.
+
+    Args:
+        task: "classification", "summary", "reply" or "rewrite"
+        text: The guest message (or text being rewritten), for complexity signals
+        intent: Detected intent, if already known
+        mood: Guest mood, if already known
+
+    Returns:
+        Route with the model name and the reason it was picked
+    """
+    if task in ALWAYS_CHEAP:
+        decision = Route(CHEAP_MODEL, task, "task")
+    else:
+        words = len((text or "").split())
+        intent_key = (intent or "").lower().replace("-", "_").replace(" ", "_")
+        mood_words = (mood or "").lower().split()
+        mood_key = mood_words[0].strip(".,") if mood_words else ""
+        if intent_key in ESCALATE_INTENTS:
+            decision = Route(STRONG_MODEL, task, f"intent={intent_key}")
+        elif mood_key in NEGATIVE_MOODS:
+            decision = Route(STRONG_MODEL, task, f"mood={mood_key}")
+        elif words > ROUTER_LONG_MESSAGE_WORDS:
+            decision = Route(STRONG_MODEL, task, f"long ({words} words)")
+        elif _ESCALATE_WORDS.search(text or ""):
+            decision = Route(STRONG_MODEL, task, "sensitive wording")
+        else:
+            decision = Route(CHEAP_MODEL, task, "simple")
+
+    _routes[f"{decision.task}:{decision.model}"] += 1
+    logging.info(f"[router] {decision.task} -> {decision.model} ({decision.reason})")
+    return decision
+
+
+# -------------------- Metrics --------------------
+
+_calls: Dict[str, Counter] = {}  # model -> calls/errors/prompt_tokens/cached_prompt_tokens/completion_tokens
+_latency: Dict[str, deque] = {}
+_routes: Counter = Counter()  # "task:model" -> decisions
+
+
+def record_call(model: str, latency_s: Optional[float], usage: Any = None) -> None:
+    """Record one completed (or failed, latency None) call to model."""
+    totals = _calls.setdefault(model, Counter())
+    totals["calls"] += 1
+    if latency_s is None:
+        totals["errors"] += 1
+    else:
+        _latency.setdefault(model, deque(maxlen=LATENCY_SAMPLE_SIZE)).append(latency_s)
+    if usage is not None:
+        record_tokens(model, usage)
+
+
+def cached_tokens(usage: Any) -> int:
+    """Prompt tokens the provider served from its prompt cache (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+
+
+def record_tokens(model: str, usage: Any) -> None:
+    """Add a response's usage to model's token totals (streams report it separately from timing)."""
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    cached = cached_tokens(usage)
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    totals = _calls.setdefault(model, Counter())
+    totals["prompt_tokens"] += prompt
+    totals["cached_prompt_tokens"] += cached
+    totals["completion_tokens"] += completion
+    logging.info(f"[router] {model} usage: input {prompt} ({cached} cached, {prompt - cached} uncached), output {completion}")
+
+
+def timed_create(create: Any, model: str, **params: Any) -> Any:
+    """Call a sync client.chat.completions.create and record latency/usage for model."""
+    started = time.perf_counter()
+    try:
+        response = create(model=model, **params)
+    except Exception:
+        record_call(model, None)
+        raise
+    record_call(model, time.perf_counter() - started, getattr(response, "usage", None))
+    return response
+
+
+async def atimed_create(create: Any, model: str, **params: Any) -> Any:
+    """Async version of timed_create."""
+    started = time.perf_counter()
+    try:
+        response = await create(model=model, **params)
+    except Exception:
+        record_call(model, None)
+        raise
+    record_call(model, time.perf_counter() - started, getattr(response, "usage", None))
+    return response
+
+
+def _price(model: str) -> Optional[tuple]:
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> Optional[float]:
+    """USD for a call's tokens at model's MODEL_PRICES rates (None for an unpriced model)."""
+    price = _price(model)
+    if not price:
+        return None
+    return ((prompt_tokens - cached_tokens) * price[0] + cached_tokens * price[1] + completion_tokens * price[2]) / 1e6
+
+
+def router_stats() -> Dict[str, Any]:
+    """Routing decisions and per-model calls, latency (ms), tokens and estimated cost (USD)."""
+    models: Dict[str, Any] = {}
+    for model, totals in _calls.items():
+        samples = list(_latency.get(model) or [])
+        cached, prompt = totals["cached_prompt_tokens"], totals["prompt_tokens"]
+        cost = estimate_cost(model, prompt, cached, totals["completion_tokens"])
+        models[model] = {
+            "calls": totals["calls"],
+            "errors": totals["errors"],
+            "prompt_tokens": prompt,
+            "cached_prompt_tokens": cached,
+            "prompt_cache_rate": round(cached / prompt, 3) if prompt else 0.0,
+            "completion_tokens": totals["completion_tokens"],
+            "est_cost_usd": round(cost, 4) if cost is not None else None,
+            "p50_ms": round(1000 * percentile(samples, 0.50)) if samples else None,
+            "p95_ms": round(1000 * percentile(samples, 0.95)) if samples else None,
+        }
+    return {
+        "cheap_model": CHEAP_MODEL,
+        "strong_model": STRONG_MODEL,
+        "decisions": dict(_routes),
+        "models": models,
+    }
@@ -0,0 +1,18 @@
+# file: src/percentiles.py
+"""
+Percentiles
+-----------
+Handles:
+- The one percentile formula behind every latency stat (webhook stages,
+  assistant runs, model calls), so their p50/p95 figures compare like for like
+"""
+
+from typing import Iterable
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Nearest-rank percentile of values (pct in 0..1); 0.0 when there are none."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
@@ -9,10 +9,13 @@ Handles:
 """
 
 import os
+import asyncio
 import logging
-import requests
+import httpx
 from typing import List, Dict, Optional
 
+from src.upstream import count_upstream_call, count_upstream_bytes
+
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 GOOGLE_DISTANCE_MATRIX_API_KEY = os.getenv("GOOGLE_DISTANCE_MATRIX_API_KEY")
 GOOGLE_PLACES_BASE_URL = "https://maps.googleapis.com/maps/api/place"
@@ -45,7 +48,7 @@ def should_fetch_local_recs(message: str) -> bool:
     return any(keyword in message_lower for keyword in keywords)
 
 
-def build_local_recs(
+async def build_local_recs(
     lat: Optional[float],
     lng: Optional[float],
     guest_message: str,
@@ -83,7 +86,10 @@ def build_local_recs(
             "key": GOOGLE_PLACES_API_KEY,
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        count_upstream_call("places")
+        async with httpx.AsyncClient(timeout=10) as http:
+            response = await http.get(url, params=params)
+        count_upstream_bytes("places", response.num_bytes_downloaded)
         response.raise_for_status()
         data = response.json()
 
@@ -93,6 +99,7 @@ def build_local_recs(
 
         # Extract and format results
         results = []
+        distance_lookups = []
         for place in data.get("results", [])[:5]:  # Limit to top 5
             place_data = {
                 "name": place.get("name", "Unknown"),
@@ -108,13 +115,18 @@ def build_local_recs(
                 place_lng = place_location.get("lng")
                 
                 if place_lat and place_lng:
-                    distance_info = get_distance_matrix(lat, lng, place_lat, place_lng)
-                    if distance_info:
-                        place_data["travel_time"] = distance_info.get("duration", "")
-                        place_data["distance"] = distance_info.get("distance", "")
+                    distance_lookups.append((place_data, get_distance_matrix(lat, lng, place_lat, place_lng)))
             
             results.append(place_data)
 
+        # Resolve travel times concurrently rather than one place at a time
+        if distance_lookups:
+            infos = await asyncio.gather(*(coro for _, coro in distance_lookups))
+            for (place_data, _), distance_info in zip(distance_lookups, infos):
+                if distance_info:
+                    place_data["travel_time"] = distance_info.get("duration", "")
+                    place_data["distance"] = distance_info.get("distance", "")
+
         logging.info(f"[places] Found {len(results)} nearby places of type '{place_type}'")
         return results
 
@@ -154,7 +166,7 @@ def _determine_place_type(message: str) -> str:
     return "point_of_interest"
 
 
-def get_distance_matrix(
+async def get_distance_matrix(
     origin_lat: float,
     origin_lng: float,
     dest_lat: float,
@@ -186,7 +198,10 @@ def get_distance_matrix(
             "key": api_key,
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        count_upstream_call("distance_matrix")
+        async with httpx.AsyncClient(timeout=10) as http:
+            response = await http.get(url, params=params)
+        count_upstream_bytes("distance_matrix", response.num_bytes_downloaded)
         response.raise_for_status()
         data = response.json()
 
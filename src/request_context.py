@@ -0,0 +1,85 @@
+# file: src/request_context.py
+"""
+Request-Scoped Context for Hostaway AutoReply
+---------------------------------------------
+Handles:
+- Loading reservation, listing and conversation messages once per webhook,
+  concurrently (messages come from the local message store)
+- Carrying that data to the assistant, summary and Slack formatting layers
+  so nothing downstream fetches it again
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from src.api_client import fetch_hostaway_reservation, fetch_hostaway_listing
+from src.message_store import get_conversation_history
+from src.upstream import track_upstream_calls
+
+
+@dataclass
+class GuestMessageContext:
+    """Everything we know about one inbound guest message."""
+
+    conversation_id: Any
+    reservation_id: Any
+    listing_id: Any
+    guest_message: str
+    reservation: Dict[str, Any] = field(default_factory=dict)  # Hostaway "result" payload
+    listing: Dict[str, Any] = field(default_factory=dict)      # Hostaway "result" payload
+    messages: List[Dict[str, Any]] = field(default_factory=list)  # Oldest first
+    upstream_calls: Counter = field(default_factory=Counter)
+
+    @classmethod
+    async def load(cls, data: Dict[str, Any]) -> "GuestMessageContext":
+        """
+        Build the context for a message.received webhook, fetching
+        reservation, listing and message history concurrently.
+
+        Args:
+            data: The "data" section of the webhook payload
+
+        Returns:
+            Populated GuestMessageContext (empty sections if a fetch failed)
+        """
+        ctx = cls(
+            conversation_id=data.get("conversationId"),
+            reservation_id=data.get("reservationId"),
+            listing_id=data.get("listingMapId"),
+            guest_message=data.get("body", ""),
+        )
+        ctx.upstream_calls = track_upstream_calls()
+
+        reservation, listing, messages = await asyncio.gather(
+            fetch_hostaway_reservation(ctx.reservation_id),
+            fetch_hostaway_listing(ctx.listing_id),
+            _fetch_messages(ctx.conversation_id),
+        )
+        ctx.reservation = (reservation or {}).get("result") or {}
+        ctx.listing = (listing or {}).get("result") or {}
+        ctx.messages = messages or []
+
+        # Webhook without listingMapId: fall back to the reservation's listing
+        if not ctx.listing_id and ctx.reservation.get("listingMapId"):
+            ctx.listing_id = ctx.reservation["listingMapId"]
+            ctx.listing = ((await fetch_hostaway_listing(ctx.listing_id)) or {}).get("result") or {}
+
+        logging.info(
+            f"[context] Loaded conversation {ctx.conversation_id}: "
+            f"reservation={bool(ctx.reservation)}, listing={bool(ctx.listing)}, messages={len(ctx.messages)}"
+        )
+        return ctx
+
+    @property
+    def guest_name(self) -> str:
+        r = self.reservation
+        return r.get("guestFirstName") or r.get("guestName") or "Guest"
+
+
+async def _fetch_messages(conversation_id: Optional[Any]) -> List[Dict[str, Any]]:
+    if not conversation_id:
+        return []
+    return await get_conversation_history(conversation_id)
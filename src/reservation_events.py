@@ -0,0 +1,60 @@
+# file: src/reservation_events.py
+"""
+Reservation Webhooks for Hostaway AutoReply
+-------------------------------------------
+Handles:
+- Applying Hostaway reservation created/updated/cancelled webhooks to the
+  local reservation cache, so reply generation reads reservation state
+  without calling Hostaway
+- Ignoring out-of-order events (older updatedOn than what we hold)
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict
+
+from src.api_client import reservation_cache
+
+RESERVATION_EVENTS = {"reservation.created", "reservation.updated", "reservation.cancelled"}
+
+_stats: Counter = Counter()
+
+
+def is_reservation_event(payload: Dict[str, Any]) -> bool:
+    return payload.get("event") in RESERVATION_EVENTS
+
+
+def apply_reservation_event(payload: Dict[str, Any]) -> str:
+    """
+    Write the reservation carried by a webhook into the cache.
+
+    Args:
+        payload: Full webhook payload ({"object", "event", "data"})
+
+    Returns:
+        "applied", "stale" (older than the cached copy) or "ignored"
+    """
+    event = payload.get("event")
+    reservation = dict(payload.get("data") or {})
+    reservation_id = reservation.get("id")
+    if not reservation_id:
+        _stats["ignored"] += 1
+        logging.warning(f"[reservations] {event} without reservation id - ignored")
+        return "ignored"
+
+    if event == "reservation.cancelled" and not reservation.get("status"):
+        reservation["status"] = "cancelled"
+
+    # Same shape as GET /reservations/{id} so readers don't care where it came from
+    if not reservation_cache.set(str(reservation_id), {"status": "success", "result": reservation}):
+        _stats["stale"] += 1
+        logging.info(f"[reservations] {event} for {reservation_id} is older than cached copy - skipped")
+        return "stale"
+
+    _stats[event] += 1
+    logging.info(f"[reservations] {event} applied to reservation {reservation_id} (status={reservation.get('status')})")
+    return "applied"
+
+
+def reservation_event_stats() -> Dict[str, int]:
+    return dict(_stats)
@@ -0,0 +1,75 @@
+# file: src/section_cache.py
+"""
+Compiled Prompt Section Cache
+-----------------------------
+Handles:
+- Keeping per-listing prompt sections (text plus token count) compiled once
+  per listing content version instead of re-formatting them every message
+- Versioning by content: a hash of the payloads a section is built from, plus
+  the listing's config file stamps (config/listings/<id>.json), so any change
+  rebuilds the sections on the next message without explicit invalidation
+- A bounded, LRU-evicted key space and hit/miss/rebuild counters for admin metrics
+"""
+
+import os
+import json
+import hashlib
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from config.loader import listing_config_version
+
+SECTION_CACHE_MAX = int(os.getenv("SECTION_CACHE_MAX", "500"))  # Listings kept per cache
+
+
+def content_version(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts (key order doesn't matter)."""
+    blob = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def listing_version(listing_id: Any, *payloads: Any) -> str:
+    """Version of a listing's sections: its payloads plus its config file stamps."""
+    return content_version(listing_config_version(listing_id), *payloads)
+
+
+class SectionCache:
+    """listing_id -> (version, compiled sections), rebuilt when the version changes."""
+
+    def __init__(self, name: str, max_size: int = SECTION_CACHE_MAX):
+        self.name = name
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._stats: Counter = Counter()
+
+    def get(self, key: Hashable, version: str, build: Callable[[], Any]) -> Any:
+        """Compiled value for key at version, building it if missing or outdated."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+        self._stats["rebuilds" if entry is not None else "misses"] += 1
+        value = build()
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["rebuilds"]
+        return {
+            "size": len(self._entries),
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "rebuilds": self._stats["rebuilds"],  # Version changed (listing or config edited)
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
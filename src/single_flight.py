@@ -0,0 +1,55 @@
+# file: src/single_flight.py
+"""
+Single-Flight Calls
+-------------------
+Handles:
+- Sharing one in-flight load between concurrent callers asking for the same key
+- Cancellation handoff: if the caller doing the load is cancelled (e.g. its
+  webhook deadline), the callers waiting on it are released and one of them
+  takes over the load instead of inheriting someone else's cancellation
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+async def single_flight(
+    inflight: Dict[Hashable, asyncio.Future],
+    key: Hashable,
+    load: Callable[[], Awaitable[Any]],
+    on_coalesced: Optional[Callable[[], None]] = None,
+) -> Any:
+    """
+    Result of load() for key, run once however many callers ask concurrently.
+
+    Args:
+        inflight: The caller's key -> future map (one per cache)
+        key: What the load is for
+        load: Coroutine function doing the work (and any caching of its result)
+        on_coalesced: Called each time this caller joins someone else's load
+    """
+    while (pending := inflight.get(key)) is not None:
+        if on_coalesced:
+            on_coalesced()
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled() or asyncio.current_task().cancelling():
+                raise  # We were cancelled ourselves
+            # The leading caller was cancelled mid-load: lead (or join) a new one
+
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        value = await load()
+        future.set_result(value)
+        return value
+    except Exception as e:
+        future.set_exception(e)
+        # Mark retrieved so a future nobody else awaited doesn't log a warning
+        future.exception()
+        raise
+    finally:
+        inflight.pop(key, None)
+        if not future.done():  # Cancelled: release the callers coalesced on us
+            future.cancel()
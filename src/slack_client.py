@@ -5,17 +5,15 @@ Slack Client for Hostaway AutoReply
 - Post message card with Edit/Improve button
 - Open edit modal
 - Build edit modal (with pruned metadata)
-- Send reply to Hostaway
 """
 
 import os
 import json
 import logging
-import requests
 from typing import Any, Dict, Optional
 from datetime import datetime
 
-from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
 
 # If you need AI helpers here, import from ai_engine ONLY (no imports from slack_interactions)
@@ -24,10 +22,8 @@ from src.ai_engine import improve_message_with_ai, rewrite_tone  # ok to keep if
 # --- Environment ---
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "")
 SLACK_CHANNEL = os.getenv("SLACK_CHANNEL", "")
-HOSTAWAY_API_BASE = os.getenv("HOSTAWAY_API_BASE", "https://api.hostaway.com/v1")
-HOSTAWAY_ACCESS_TOKEN = os.getenv("HOSTAWAY_ACCESS_TOKEN")
 
-client = WebClient(token=SLACK_BOT_TOKEN)
+client = AsyncWebClient(token=SLACK_BOT_TOKEN)
 
 # --- Helpers ---
 def _fmt_date(d: Optional[str]) -> str:
@@ -158,12 +154,12 @@ def build_message_blocks(meta: Dict[str, Any], ai_result: Dict[str, str]) -> lis
     ]
     return blocks
 
-def post_message_to_slack(guest_message: str, ai_suggestion: str, meta: Dict[str, Any], mood: Optional[str] = None, summary: Optional[str] = None):
+async def post_message_to_slack(guest_message: str, ai_suggestion: str, meta: Dict[str, Any], mood: Optional[str] = None, summary: Optional[str] = None):
     try:
         ai_result = {"suggested_reply": ai_suggestion, "summary": summary, "mood": mood}
         meta = {**meta, "guest_message": guest_message}
         blocks = build_message_blocks(meta, ai_result)
-        client.chat_postMessage(
+        await client.chat_postMessage(
             channel=SLACK_CHANNEL,
             blocks=blocks,
             text=f"New guest message from {meta.get('guest_name','Guest')}",
@@ -173,11 +169,11 @@ def post_message_to_slack(guest_message: str, ai_suggestion: str, meta: Dict[str
         logging.error(f"[SLACK] Failed to post message: {e}")
         return False
 
-def open_edit_modal(trigger_id: str, payload: Dict[str, Any]):
+async def open_edit_modal(trigger_id: str, payload: Dict[str, Any]):
     """Open the edit modal. Payload is already pruned."""
     try:
         modal = build_edit_modal(payload)
-        client.views_open(trigger_id=trigger_id, view=modal)
+        await client.views_open(trigger_id=trigger_id, view=modal)
     except SlackApiError as e:
         logging.error(f"[SLACK] Failed to open modal: {e}")
 
@@ -266,20 +262,3 @@ def build_edit_modal(payload: Dict[str, Any]) -> Dict[str, Any]:
         ],
     }
     return modal
-
-def send_hostaway_reply(conversation_id: int, message: str) -> bool:
-    if not (HOSTAWAY_ACCESS_TOKEN and conversation_id and message):
-        logging.warning("[send_hostaway_reply] Missing token, conversation_id, or message.")
-        return False
-    url = f"{HOSTAWAY_API_BASE}/conversations/{conversation_id}/messages"
-    headers = {"Authorization": f"Bearer {HOSTAWAY_ACCESS_TOKEN}", "Content-Type": "application/json"}
-    try:
-        resp = requests.post(url, headers=headers, json={"body": message}, timeout=10)
-        if resp.status_code == 200:
-            logging.info(f"[Hostaway] Reply sent successfully to conversation {conversation_id}")
-            return True
-        logging.error(f"[Hostaway] Failed to send reply (status={resp.status_code}): {resp.text}")
-        return False
-    except Exception as e:
-        logging.error(f"[Hostaway] Error sending reply: {e}")
-        return False
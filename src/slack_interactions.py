@@ -15,9 +15,9 @@ import hmac
 import hashlib
 import time
 import uuid
-from typing import Optional, Dict, Any
-from openai import OpenAI
-import threading
+import asyncio
+from typing import Optional, Dict, Any, Set
+from openai import AsyncOpenAI
 
 from fastapi import APIRouter, Request, Header, HTTPException
 from fastapi.responses import JSONResponse
@@ -25,11 +25,15 @@ from fastapi.responses import JSONResponse
 from src.slack_client import (
     client as slack_client,
     open_edit_modal,
-    send_hostaway_reply,
 )
+from src.api_client import send_hostaway_reply
 from src.ai_engine import generate_reply_with_tone, improve_message_with_ai
+from src.model_router import atimed_create, route
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+
+# Strong references to in-flight background tasks so they aren't garbage collected
+_background_tasks: Set[asyncio.Task] = set()
 
 def clean_ai_reply(text: str, guest_msg: str) -> str:
     """Clean up AI-generated reply"""
@@ -70,7 +74,7 @@ def sanitize_ai_reply(text: str, guest_msg: str) -> str:
     return text.strip()
 
 
-def _background_improve_and_update(
+async def _background_improve_and_update(
     view_id: str,
     hash_value: Optional[str],
     meta: dict,
@@ -79,7 +83,7 @@ def _background_improve_and_update(
     guest_name: str,
     guest_msg: str,
 ):
-    """Background thread to improve text with OpenAI and update modal"""
+    """Background task to improve text with OpenAI and update modal"""
 
     logging.info(f"[Background] Starting improvement for conversationId: {meta.get('conv_id') or meta.get('conversationId')}")
 
@@ -139,8 +143,9 @@ Please improve this reply to be clearer, more concise, and more natural. Return
             if coach_prompt_text:
                 logging.info(f"[Background] With instructions: {coach_prompt_text[:100]}...")
 
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = await atimed_create(
+                openai_client.chat.completions.create,
+                route("rewrite", guest_msg).model,
                 messages=[
                     {"role": "system", "content": sys},
                     {"role": "user", "content": user},
@@ -269,9 +274,9 @@ Please improve this reply to be clearer, more concise, and more natural. Return
         try:
             # Try with hash first for optimistic locking
             if hash_value:
-                resp = slack_client.views_update(view_id=view_id, hash=hash_value, view=final_view)
+                resp = await slack_client.views_update(view_id=view_id, hash=hash_value, view=final_view)
             else:
-                resp = slack_client.views_update(view_id=view_id, view=final_view)
+                resp = await slack_client.views_update(view_id=view_id, view=final_view)
 
             if not resp.get("ok"):
                 logging.error(f"[Background] views_update failed: {resp.get('error')}")
@@ -285,7 +290,7 @@ Please improve this reply to be clearer, more concise, and more natural. Return
                 logging.error(f"[Background] views_update error: {e}")
 
             # Retry without hash to force update
-            slack_client.views_update(view_id=view_id, view=final_view)
+            await slack_client.views_update(view_id=view_id, view=final_view)
             logging.info("[Background] Modal updated successfully after retry")
 
     except Exception as e:
@@ -471,7 +476,7 @@ async def _open_edit_modal(payload: dict):
     data["ts"] = message_ts
 
     try:
-        open_edit_modal(trigger_id, data)
+        await open_edit_modal(trigger_id, data)
         return JSONResponse({"ok": True})
     except Exception as e:
         logging.error(f"[Slack] Failed to open edit modal: {e}")
@@ -480,7 +485,6 @@ async def _open_edit_modal(payload: dict):
 # ---------------- Improve with AI ----------------
 async def _improve_with_ai(payload: dict):
     """Handles 'Improve with AI' button — rewrites text in modal."""
-    import threading
 
     try:
         # Extract current data
@@ -539,7 +543,7 @@ async def _improve_with_ai(payload: dict):
                         }
                     ],
                 }
-                slack_client.views_update(view_id=view_id, hash=hash_value, view=error_view)
+                await slack_client.views_update(view_id=view_id, hash=hash_value, view=error_view)
             except Exception as e:
                 logging.error(f"[Slack] Failed to show error modal: {e}")
 
@@ -562,17 +566,17 @@ async def _improve_with_ai(payload: dict):
         }
 
         try:
-            slack_client.views_update(view_id=view_id, hash=hash_value, view=improving_view)
+            await slack_client.views_update(view_id=view_id, hash=hash_value, view=improving_view)
         except Exception as e:
             logging.error(f"[Slack] Error showing improving state: {e}")
 
-        # Start background thread (pass None for hash since we just updated the modal)
-        logging.info("[Slack] Starting background improvement thread...")
-        threading.Thread(
-            target=_background_improve_and_update,
-            args=(view_id, None, meta, current_text, coach_prompt, guest_name, guest_message),
-            daemon=True
-        ).start()
+        # Start background task (pass None for hash since we just updated the modal)
+        logging.info("[Slack] Starting background improvement task...")
+        task = asyncio.create_task(
+            _background_improve_and_update(view_id, None, meta, current_text, coach_prompt, guest_name, guest_message)
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
 
         # Return immediate acknowledgment
         return JSONResponse({"ok": True})
@@ -661,7 +665,7 @@ async def _undo_ai(payload: dict):
             "blocks": blocks,
         }
 
-        slack_client.views_update(
+        await slack_client.views_update(
             view_id=view["id"],
             hash=view.get("hash", ""),
             view=updated_view
@@ -700,9 +704,9 @@ async def _send_reply(payload: dict, action_id: str):
             logging.error(f"[_send_reply] Missing data - conversationId: {conversation_id}, reply_text: {bool(reply_text)}")
             raise ValueError("Missing conversation ID or message")
 
-        send_hostaway_reply(conversation_id=conversation_id, message=reply_text)
+        await send_hostaway_reply(conversation_id=conversation_id, message=reply_text)
 
-        slack_client.chat_postMessage(
+        await slack_client.chat_postMessage(
             channel=os.getenv("SLACK_CHANNEL"),
             text=f"✅ Message sent to guest: \n>{reply_text}",
         )
@@ -746,11 +750,11 @@ async def _handle_modal_submit(payload: dict):
 
         # Send to Hostaway
         logging.info(f"[Slack] Sending message to Hostaway conversation {conversation_id}...")
-        success = send_hostaway_reply(conversation_id, reply_text.strip())
+        success = await send_hostaway_reply(conversation_id, reply_text.strip())
 
         if success:
             # Post confirmation to Slack
-            slack_client.chat_postMessage(
+            await slack_client.chat_postMessage(
                 channel=os.getenv("SLACK_CHANNEL"),
                 text=f"✅ Edited reply sent to guest:\n>{reply_text}",
             )
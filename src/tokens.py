@@ -0,0 +1,77 @@
+# file: src/tokens.py
+"""
+Token Counting
+--------------
+Handles:
+- Counting prompt tokens with tiktoken when it is installed
+- A ~4 characters/token estimate otherwise (close enough for budgets and
+  savings reports, not for billing)
+- Truncating text to a token budget (instead of a character slice)
+
+The encoding is downloaded on first use; the app loads it at startup through
+load_encoding() in a worker thread, so that never happens on the event loop.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_ENCODING = "o200k_base"  # gpt-4o family
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: Optional[str]) -> Optional[Any]:
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        try:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+        except Exception as e:
+            logging.warning(f"[tokens] tiktoken unavailable ({e}) - estimating")
+            return None
+
+
+def load_encoding(model: Optional[str] = None) -> bool:
+    """Load (and on first run download) the encoding; blocking - run it in a thread."""
+    return _encoding(model) is not None
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters/token: for metrics where tokenizing would cost more than it tells."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Number of tokens in text for model (estimated if tiktoken is missing)."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(
+    text: str, max_tokens: int, model: Optional[str] = None, marker: str = "…", keep_end: bool = False
+) -> str:
+    """text cut to at most max_tokens tokens (marker added where it was cut; keep_end keeps the tail)."""
+    if not text or max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        if len(text) <= 4 * max_tokens:
+            return text
+        return marker + text[-4 * max_tokens:].lstrip() if keep_end else text[: 4 * max_tokens].rstrip() + marker
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    if keep_end:
+        return marker + encoding.decode(tokens[-max_tokens:]).lstrip()
+    return encoding.decode(tokens[:max_tokens]).rstrip() + marker
@@ -0,0 +1,162 @@
+# file: src/ttl_cache.py
+"""
+In-Process Read-Through Cache
+-----------------------------
+Handles:
+- TTL expiry with a bounded, LRU-evicted key space
+- Stale-while-revalidate: expired entries are served immediately while a
+  background task refreshes them
+- Single-flight: concurrent misses for the same key share one load
+- Hit/miss/refresh counters for the admin metrics endpoint
+"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+from src.single_flight import single_flight
+
+
+class AsyncTTLCache:
+    """
+    Read-through cache around an async loader.
+
+    An entry younger than `ttl` is fresh. Between `ttl` and `ttl + stale_ttl`
+    it is served as-is and refreshed in the background. Older entries are
+    treated as misses. Empty loader results ({} / [] / None) are not cached,
+    so a failed upstream fetch is retried on the next call.
+
+    If `version` is given it maps a value to something orderable (e.g., an
+    updatedOn timestamp); set() then refuses to replace a newer value with
+    an older one, so a slow load can't clobber a fresher pushed update.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[Hashable], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float,
+        max_size: int,
+        version: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_size = max_size
+        self.version = version
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (stored_at, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._stats: Counter = Counter()
+
+    # -------------------- Reads --------------------
+
+    async def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, loading it on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self._stats["stale_hits"] += 1
+                self._schedule_refresh(key)
+                return entry[1]
+
+        self._stats["misses"] += 1
+        return await self._load(key)
+
+    async def _load(self, key: Hashable) -> Any:
+        """Load key from upstream, sharing the result with concurrent callers."""
+        async def load() -> Any:
+            value = await self.loader(key)
+            if value:
+                self.set(key, value)
+            return value
+
+        return await single_flight(self._inflight, key, load, self._count_coalesced)
+
+    def _count_coalesced(self) -> None:
+        self._stats["coalesced"] += 1
+
+    # -------------------- Background Refresh --------------------
+
+    def _schedule_refresh(self, key: Hashable) -> None:
+        if key in self._inflight:
+            return
+        # Fresh context: the refresh is not part of the webhook that noticed
+        # the stale entry, so its upstream calls shouldn't be billed to it.
+        task = asyncio.create_task(self._refresh(key), context=contextvars.Context())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: Hashable) -> None:
+        self._stats["refreshes"] += 1
+        try:
+            value = await self._load(key)
+            if not value:
+                self._stats["refresh_failures"] += 1
+        except Exception as e:
+            self._stats["refresh_failures"] += 1
+            logging.warning(f"[cache:{self.name}] Background refresh of {key} failed: {e}")
+
+    # -------------------- Writes --------------------
+
+    def set(self, key: Hashable, value: Any) -> bool:
+        """
+        Store value as fresh, evicting the least recently used entry if full.
+
+        Returns:
+            False if the value was older than the cached one and was dropped
+        """
+        if self.version is not None and key in self._entries:
+            current, incoming = self.version(self._entries[key][1]), self.version(value)
+            if current and incoming and incoming < current:
+                self._stats["stale_writes"] += 1
+                return False
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        return True
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value without loading, touching LRU order or stats."""
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    # -------------------- Metrics --------------------
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["stale_hits"] + self._stats["misses"]
+        served = self._stats["hits"] + self._stats["stale_hits"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "hits": self._stats["hits"],
+            "stale_hits": self._stats["stale_hits"],
+            "misses": self._stats["misses"],
+            "coalesced": self._stats["coalesced"],
+            "refreshes": self._stats["refreshes"],
+            "refresh_failures": self._stats["refresh_failures"],
+            "evictions": self._stats["evictions"],
+            "stale_writes": self._stats["stale_writes"],
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,93 @@
+# file: src/upstream.py
+"""
+Upstream Call Accounting for Hostaway AutoReply
+-----------------------------------------------
+Handles:
+- Counting upstream HTTP calls and response bytes for one webhook
+- Aggregating calls- and bytes-per-webhook so regressions show up in admin metrics
+"""
+
+import logging
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+SAMPLE_SIZE = 200  # Recent webhooks kept for averages
+
+# Counter for the webhook currently being processed. Tasks spawned with
+# asyncio.gather inherit the context, so concurrent fetches share it.
+_current: ContextVar[Optional[Counter]] = ContextVar("upstream_calls", default=None)
+_current_bytes: ContextVar[Optional[Counter]] = ContextVar("upstream_bytes", default=None)
+_recent_totals: deque = deque(maxlen=SAMPLE_SIZE)
+_recent_bytes: deque = deque(maxlen=SAMPLE_SIZE)
+_lifetime: Counter = Counter()
+_lifetime_bytes: Counter = Counter()
+
+
+def track_upstream_calls() -> Counter:
+    """
+    Start counting upstream calls for the current webhook.
+
+    Returns:
+        The Counter that count_upstream_call() will update
+    """
+    counter: Counter = Counter()
+    _current.set(counter)
+    _current_bytes.set(Counter())
+    return counter
+
+
+def count_upstream_call(name: str) -> None:
+    """
+    Record one upstream call.
+
+    Args:
+        name: Short endpoint name (e.g., "reservation", "listing", "places")
+    """
+    _lifetime[name] += 1
+    counter = _current.get()
+    if counter is not None:
+        counter[name] += 1
+
+
+def count_upstream_bytes(name: str, num_bytes: int) -> None:
+    """
+    Record response bytes received from an upstream call.
+
+    Args:
+        name: Short endpoint name, as passed to count_upstream_call()
+        num_bytes: Bytes read off the wire
+    """
+    _lifetime_bytes[name] += num_bytes
+    counter = _current_bytes.get()
+    if counter is not None:
+        counter[name] += num_bytes
+
+
+def finish_upstream_tracking(counter: Counter, label: str = "") -> None:
+    """Log the per-webhook breakdown and keep the totals for averages."""
+    total = sum(counter.values())
+    _recent_totals.append(total)
+    breakdown = ", ".join(f"{k}={v}" for k, v in sorted(counter.items()))
+    byte_counter = _current_bytes.get() or Counter()
+    total_bytes = sum(byte_counter.values())
+    _recent_bytes.append(total_bytes)
+    logging.info(
+        f"[upstream] {label} made {total} upstream calls ({breakdown or 'none'}), "
+        f"{total_bytes} bytes received"
+    )
+
+
+def upstream_stats() -> Dict[str, Any]:
+    """Calls per webhook over recent webhooks, plus lifetime per-endpoint counts."""
+    totals = list(_recent_totals)
+    byte_totals = list(_recent_bytes)
+    return {
+        "webhooks": len(totals),
+        "avg_calls_per_webhook": round(sum(totals) / len(totals), 2) if totals else 0.0,
+        "max_calls_per_webhook": max(totals) if totals else 0,
+        "avg_bytes_per_webhook": round(sum(byte_totals) / len(byte_totals)) if byte_totals else 0,
+        "max_bytes_per_webhook": max(byte_totals) if byte_totals else 0,
+        "lifetime_calls": dict(_lifetime),
+        "lifetime_bytes": dict(_lifetime_bytes),
+    }
@@ -0,0 +1,184 @@
+# file: src/webhook_queue.py
+"""
+Webhook Queue for Hostaway AutoReply
+------------------------------------
+Handles:
+- Bounded in-process queue for accepted Hostaway webhook events
+- Pool of async workers that drain the queue with a concurrency limit
+- Queue depth and per-stage timing metrics
+- The per-webhook latency budget and which optional stages it cut
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.percentiles import percentile
+
+# Configuration
+WEBHOOK_QUEUE_ENABLED = bool(int(os.getenv("WEBHOOK_QUEUE_ENABLED", "0")))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))  # Max events processed concurrently
+WEBHOOK_QUEUE_MAX = int(os.getenv("WEBHOOK_QUEUE_MAX", "500"))  # Events waiting before we shed load
+WEBHOOK_DEADLINE = float(os.getenv("WEBHOOK_DEADLINE", "8"))  # Seconds from webhook receipt to Slack post
+WEBHOOK_REPLY_MIN = float(os.getenv("WEBHOOK_REPLY_MIN", "4"))  # Seconds the reply gets even if queueing ate the budget
+STAGE_SAMPLE_SIZE = 200  # Recent samples kept per stage for percentiles
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_in_flight = 0
+_counters = {"enqueued": 0, "rejected": 0, "processed": 0, "failed": 0}
+_stage_samples: Dict[str, deque] = {}
+_skipped_stages: Counter = Counter()
+
+
+# -------------------- Stage Timings --------------------
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Record how long one pipeline stage took.
+
+    Args:
+        stage: Stage name (e.g., "fetch", "reply", "slack")
+        seconds: Elapsed wall time
+    """
+    samples = _stage_samples.setdefault(stage, deque(maxlen=STAGE_SAMPLE_SIZE))
+    samples.append(seconds)
+
+
+@contextmanager
+def timed_stage(stage: str):
+    """Context manager that records the wall time of the wrapped block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def record_skipped(stage: str) -> None:
+    """Count an optional stage dropped to stay within WEBHOOK_DEADLINE."""
+    _skipped_stages[stage] += 1
+
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    """Summarize recent stage timings in milliseconds."""
+    out = {}
+    for stage, samples in _stage_samples.items():
+        values = list(samples)
+        out[stage] = {
+            "samples": len(values),
+            "avg_ms": round(1000 * sum(values) / len(values), 1) if values else 0.0,
+            "p50_ms": round(1000 * percentile(values, 0.50), 1),
+            "p95_ms": round(1000 * percentile(values, 0.95), 1),
+            "max_ms": round(1000 * max(values), 1) if values else 0.0,
+        }
+    return out
+
+
+# -------------------- Queue --------------------
+
+def enqueue(event: Dict[str, Any]) -> bool:
+    """
+    Put an accepted webhook event on the queue.
+
+    Args:
+        event: Webhook payload "data" section plus bookkeeping fields
+
+    Returns:
+        True if queued, False if the queue is full or not running
+    """
+    if _queue is None:
+        logging.error("[queue] Workers not started - cannot enqueue event")
+        _counters["rejected"] += 1
+        return False
+
+    try:
+        # _received_at (monotonic) anchors the webhook deadline, so queue wait counts against it
+        _queue.put_nowait({"_received_at": time.monotonic(), **event, "_enqueued_at": time.perf_counter()})
+    except asyncio.QueueFull:
+        logging.warning(f"[queue] Queue full ({WEBHOOK_QUEUE_MAX}), rejecting event")
+        _counters["rejected"] += 1
+        return False
+
+    _counters["enqueued"] += 1
+    return True
+
+
+async def _worker(worker_id: int, handler: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+    """Drain the queue forever, one event at a time."""
+    global _in_flight
+
+    while True:
+        event = await _queue.get()
+        _in_flight += 1
+        record_stage("queue_wait", time.perf_counter() - event.pop("_enqueued_at", time.perf_counter()))
+        try:
+            with timed_stage("total"):
+                await handler(event)
+            _counters["processed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _counters["failed"] += 1
+            logging.error(f"[queue] Worker {worker_id} failed to process event: {e}", exc_info=True)
+        finally:
+            _in_flight -= 1
+            _queue.task_done()
+
+
+def start_workers(handler: Callable[[Dict[str, Any]], Awaitable[Any]], workers: int = WEBHOOK_WORKERS) -> None:
+    """
+    Create the queue and start the worker pool. Call once from the FastAPI startup event.
+
+    Args:
+        handler: Coroutine function that processes a single event
+        workers: Number of workers (the concurrency limit)
+    """
+    global _queue
+
+    if _workers:
+        logging.info("[queue] Workers already running")
+        return
+
+    _queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_MAX)
+    for i in range(max(1, workers)):
+        _workers.append(asyncio.create_task(_worker(i, handler)))
+    logging.info(f"[queue] Started {len(_workers)} webhook workers (queue max {WEBHOOK_QUEUE_MAX})")
+
+
+async def stop_workers(drain_timeout: float = 10.0) -> None:
+    """Give queued and in-flight events a chance to finish, then cancel the workers."""
+    global _queue
+
+    if _queue is not None:
+        # join() also waits for events a worker has already dequeued, so drain
+        # even when the queue looks empty.
+        try:
+            await asyncio.wait_for(_queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"[queue] Shutdown with {_queue.qsize()} events queued, {_in_flight} in flight")
+
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+def queue_stats() -> Dict[str, Any]:
+    """Current queue depth, worker utilisation, counters and stage timings."""
+    return {
+        "enabled": WEBHOOK_QUEUE_ENABLED,
+        "workers": len(_workers),
+        "depth": _queue.qsize() if _queue is not None else 0,
+        "max_depth": WEBHOOK_QUEUE_MAX,
+        "in_flight": _in_flight,
+        **_counters,
+        "deadline_s": WEBHOOK_DEADLINE,
+        "skipped_stages": dict(_skipped_stages),
+        "stages": stage_stats(),
+    }
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# src/ and ai/ import as packages from the repo root; legacy/ modules import each
+# other top-level; scripts/ holds the fake Hostaway API
+sys.path[:0] = [ROOT, os.path.join(ROOT, "legacy"), os.path.join(ROOT, "scripts")]
+
+# Keep the SQLite stores the app opens at import time out of the working tree
+_STATE_DIR = tempfile.mkdtemp(prefix="autoreply_tests_")
+for _name, _file in (("MESSAGE_STORE_PATH", "messages.db"), ("ASSISTANT_STATE_PATH", "assistant_state.db")):
+    os.environ.setdefault(_name, os.path.join(_STATE_DIR, _file))
@@ -0,0 +1,34 @@
+import amenities_index
+from amenities_index import AmenitiesIndex
+
+LISTING = {
+    "id": 77,
+    "updatedOn": "2026-01-15 10:30:00",
+    "description": "Hot tub on the balcony, wifi throughout, free driveway parking.",
+    "wifiUsername": "Villa",
+    "listingAmenities": [{"amenityName": "Coffee maker"}, {"amenityName": "Smart TV"}],
+    "customFieldValues": [{"name": "Door code", "value": "4821"}],
+}
+
+
+def test_substring_expansion_matches_a_term_scan():
+    idx = AmenitiesIndex(LISTING)
+    for tok in ("w", "wi", "wif", "wifi", "offee", "tub", "door", "4821", "82", "xyz", "coffeemaker"):
+        scanned = sorted(term for term in idx._postings if tok in term)
+        assert sorted(idx._terms_containing(tok)) == scanned, tok
+
+
+def test_memo_evicts_oldest_token_only(monkeypatch):
+    monkeypatch.setattr(amenities_index, "_EXPANDED_MAX", 2)
+    idx = AmenitiesIndex(LISTING)
+    for tok in ("wifi", "tub", "door"):
+        idx._rows_for(tok)
+    assert list(idx._expanded) == ["tub", "door"]
+
+
+def test_for_listing_reuses_index_for_the_same_version(tmp_path):
+    first = AmenitiesIndex.for_listing(LISTING, str(tmp_path), version=LISTING["updatedOn"])
+    changed = dict(LISTING, description="No pets.")
+
+    assert AmenitiesIndex.for_listing(changed, str(tmp_path), version=LISTING["updatedOn"]) is first
+    assert AmenitiesIndex.for_listing(changed, str(tmp_path), version="2026-02-01 09:00:00") is not first
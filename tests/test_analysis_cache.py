@@ -0,0 +1,93 @@
+import asyncio
+
+from src.analysis_cache import AnalysisCache
+
+HISTORY = [
+    {"id": 1, "body": "Hi, is early check-in possible?"},
+    {"id": 2, "body": "We land at 10am."},
+]
+
+
+class FakeModel:
+    """Stands in for the mood/summary model: records calls, can be held open."""
+
+    def __init__(self):
+        self.full_calls = []
+        self.incremental_calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def full(self, messages):
+        self.full_calls.append([m["id"] for m in messages])
+        await self.gate.wait()
+        return "curious", f"{len(messages)} messages about arrival."
+
+    async def incremental(self, previous, new):
+        self.incremental_calls.append([m["id"] for m in new])
+        return previous[0], previous[1] + f" +{len(new)}"
+
+
+def test_repeat_webhook_for_the_same_messages_is_a_hit():
+    async def scenario():
+        model = FakeModel()
+        cache = AnalysisCache(model.full, model.incremental)
+        first = await cache.get("conv", HISTORY)
+        second = await cache.get("conv", HISTORY)
+        return model, cache, first, second
+
+    model, cache, first, second = asyncio.run(scenario())
+    assert first == second == ("curious", "2 messages about arrival.")
+    assert model.full_calls == [[1, 2]]
+    assert cache.stats()["hits"] == 1
+
+
+def test_new_message_is_folded_incrementally():
+    async def scenario():
+        model = FakeModel()
+        cache = AnalysisCache(model.full, model.incremental)
+        await cache.get("conv", HISTORY)
+        result = await cache.get("conv", HISTORY + [{"id": 3, "body": "Thanks!"}])
+        return model, result
+
+    model, result = asyncio.run(scenario())
+    assert result == ("curious", "2 messages about arrival. +1")
+    assert model.incremental_calls == [[3]]
+
+
+def test_concurrent_duplicate_webhooks_share_one_call_and_survive_a_cancelled_leader():
+    async def scenario():
+        model = FakeModel()
+        model.gate.clear()
+        cache = AnalysisCache(model.full, model.incremental)
+
+        leader = asyncio.create_task(cache.get("conv", HISTORY))
+        await asyncio.sleep(0)
+        duplicate = asyncio.create_task(cache.get("conv", HISTORY))
+        await asyncio.sleep(0)
+        assert cache.stats()["coalesced"] == 1
+
+        leader.cancel()  # its webhook deadline passed
+        await asyncio.sleep(0)
+        model.gate.set()
+        result = await asyncio.wait_for(duplicate, timeout=1)
+        return model, cache, leader, result
+
+    model, cache, leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == ("curious", "2 messages about arrival.")
+    assert model.full_calls == [[1, 2], [1, 2]]  # the duplicate redid the cancelled call
+    assert cache.peek("conv") == result
+    assert not cache._inflight
+
+
+def test_identical_message_sets_in_different_conversations_are_not_shared():
+    async def scenario():
+        model = FakeModel()
+        cache = AnalysisCache(model.full, model.incremental)
+        await asyncio.gather(cache.get("a", []), cache.get("b", []))
+        return model, cache
+
+    model, cache = asyncio.run(scenario())
+    assert model.full_calls == [[], []]
+    assert cache.stats()["coalesced"] == 0
+    assert cache.peek("a") and cache.peek("b")
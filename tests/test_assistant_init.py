@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from src import ai_assistant_enhanced as enhanced
+from src import db
+
+
+def test_ensure_assistant_retries_failed_initialization(monkeypatch):
+    attempts = []
+
+    async def initialize():
+        attempts.append(1)
+        if len(attempts) > 1:
+            enhanced.ASSISTANT_ID = "asst_123"
+        return enhanced.ASSISTANT_ID
+
+    monkeypatch.setattr(enhanced, "initialize_enhanced_assistant", initialize)
+    monkeypatch.setattr(enhanced, "ASSISTANT_ID", None)
+    monkeypatch.setattr(enhanced, "ASSISTANT_INIT_RETRY", 0)
+
+    async def main():
+        enhanced._start_init_task()
+        assert await enhanced.ensure_assistant(timeout=1) is None
+        return await enhanced.ensure_assistant(timeout=1)
+
+    assert asyncio.run(main()) == "asst_123"
+    assert len(attempts) == 2
+
+
+def test_ensure_assistant_waits_between_retries(monkeypatch):
+    attempts = []
+
+    async def initialize():
+        attempts.append(1)
+        return None
+
+    monkeypatch.setattr(enhanced, "initialize_enhanced_assistant", initialize)
+    monkeypatch.setattr(enhanced, "ASSISTANT_ID", None)
+
+    async def main():
+        enhanced._start_init_task()
+        await enhanced.ensure_assistant(timeout=1)
+        return await enhanced.ensure_assistant(timeout=1)
+
+    assert asyncio.run(main()) is None
+    assert len(attempts) == 1
+
+
+def test_state_db_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(db, "_STATE_DB_PATH", str(tmp_path / "state.db"))
+    monkeypatch.setattr(db.sqlite3, "connect", connect)
+    db.save_assistant_record("reply", "asst_1", "abc")
+    assert db.get_assistant_record("reply") == {"assistant_id": "asst_1", "instructions_hash": "abc"}
+
+    assert len(opened) == 2
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
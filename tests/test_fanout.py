@@ -0,0 +1,56 @@
+import threading
+import time
+
+from fanout import Step, run_steps
+
+
+def test_steps_run_concurrently_in_dependency_order():
+    seen = {}
+
+    def reservation(_results):
+        time.sleep(0.05)
+        return {"id": 7}
+
+    def upsells(results):
+        seen["reservation"] = results.get("reservation")
+        return ["late checkout"]
+
+    started = time.perf_counter()
+    results = run_steps("test", {
+        "reservation": Step(reservation),
+        "price": Step(lambda _r: (time.sleep(0.05), 120)[1]),
+        "upsells": Step(upsells, after=("reservation",)),
+        "orphan": Step(lambda _r: 1, after=("missing",), default="none"),
+    })
+
+    assert results == {"reservation": {"id": 7}, "price": 120, "upsells": ["late checkout"], "orphan": "none"}
+    assert seen["reservation"] == {"id": 7}
+    assert time.perf_counter() - started < 0.09  # reservation and price overlapped
+
+
+def test_hung_steps_do_not_starve_later_runs():
+    release = threading.Event()
+
+    def hang(_results):
+        release.wait(5)
+        return "late"
+
+    try:
+        # More hung steps than the old shared pool had workers
+        hung = run_steps("hung", {f"s{i}": Step(hang, timeout=0.05, default="timeout") for i in range(10)})
+        assert set(hung.values()) == {"timeout"}
+
+        started = time.perf_counter()
+        later = run_steps("later", {"fast": Step(lambda _r: "ok", timeout=0.5, default="timeout")})
+        assert later == {"fast": "ok"}
+        assert time.perf_counter() - started < 0.2
+    finally:
+        release.set()
+
+
+def test_timeout_counts_from_when_the_step_starts():
+    results = run_steps("deps", {
+        "slow": Step(lambda _r: (time.sleep(0.15), "slow")[1], timeout=1),
+        "after_slow": Step(lambda _r: (time.sleep(0.1), "done")[1], after=("slow",), timeout=0.2, default="timeout"),
+    })
+    assert results == {"slow": "slow", "after_slow": "done"}
@@ -0,0 +1,29 @@
+import asyncio
+
+from src import instant_answers
+
+
+def test_bundled_sample_templates_are_never_indexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(instant_answers, "MEMORY_YAML_PATH", str(tmp_path / "missing.yaml"))
+    monkeypatch.setattr(instant_answers, "LEARNING_DB_PATH", str(tmp_path / "missing.db"))
+    assert instant_answers._load_templates() == []
+
+
+def test_matches_only_configured_templates(tmp_path, monkeypatch):
+    memory = tmp_path / "memory.yaml"
+    memory.write_text(
+        "templates:\n"
+        "  - listing_id: 42\n"
+        "    question: What is the wifi password?\n"
+        "    answer: It is on the fridge.\n"
+    )
+    monkeypatch.setattr(instant_answers, "MEMORY_YAML_PATH", str(memory))
+    monkeypatch.setattr(instant_answers, "LEARNING_DB_PATH", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(instant_answers, "INSTANT_ANSWERS_ENABLED", True)
+    monkeypatch.setattr(instant_answers, "_index", None)
+
+    hit = asyncio.run(instant_answers.match_instant_answer(42, "what is the wifi password"))
+    miss = asyncio.run(instant_answers.match_instant_answer(7, "what is the wifi password"))
+
+    assert hit is not None and hit.answer == "It is on the fridge."
+    assert miss is None
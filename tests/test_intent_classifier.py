@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import intent_classifier
+from intent_classifier import IntentClassifier, classify
+
+EXAMPLES = [
+    ("can we check in early tomorrow", "early_check_in"),
+    ("is an early check in possible", "early_check_in"),
+    ("could we arrive early and check in at noon", "early_check_in"),
+    ("can we check out late on sunday", "late_checkout"),
+    ("is a late checkout possible", "late_checkout"),
+    ("could we leave late and check out at 2pm", "late_checkout"),
+    ("what is the wifi password", "amenities"),
+    ("do you have a hair dryer and an iron", "amenities"),
+    ("is there a coffee maker in the kitchen", "amenities"),
+    ("where can we park the car", "parking"),
+    ("is there parking at the house", "parking"),
+    ("can we park on the street", "parking"),
+]
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    path = tmp_path / "intent_model.json"
+    path.write_text(json.dumps(IntentClassifier.train(EXAMPLES).to_json()))
+    monkeypatch.setattr(intent_classifier, "INTENT_MODEL_PATH", str(path))
+    return path
+
+
+def test_train_keeps_labels_with_enough_examples():
+    clf = IntentClassifier.train(EXAMPLES + [("hello there", "greeting")])
+    assert clf.labels == ["amenities", "early_check_in", "late_checkout", "parking"]
+
+
+def test_train_without_enough_examples_raises():
+    with pytest.raises(ValueError):
+        IntentClassifier.train([("hi", "greeting")])
+
+
+@pytest.mark.parametrize("text, label", [
+    ("can we check in early", "early_check_in"),
+    ("late checkout possible?", "late_checkout"),
+    ("wifi password please", "amenities"),
+    ("where do we park", "parking"),
+])
+def test_predict(text, label):
+    assert IntentClassifier.train(EXAMPLES).predict(text)[0] == label
+
+
+def test_predict_confidence_is_a_posterior():
+    clf = IntentClassifier.train(EXAMPLES)
+    _, everything = clf.predict("can we check in early")
+    _, two = clf.predict("can we check in early", ["early_check_in", "parking"])
+    assert 0 < everything <= two <= 1
+
+
+def test_classify_applies_the_threshold(model):
+    assert classify("can we check in early", threshold=0.5) == "early_check_in"
+    assert classify("can we check in early", threshold=1.01) is None
+    assert classify("banana", threshold=0.9) is None  # no signal: the prior alone
+
+
+def test_classify_renormalises_over_the_callers_labels(model):
+    # Best overall is early_check_in; among the caller's labels it is late_checkout
+    allowed = {"late_checkout", "parking", "some_label_never_trained"}
+    assert classify("can we check in early", allowed=allowed, threshold=0.5) == "late_checkout"
+    assert classify("can we check in early", threshold=0.5) == "early_check_in"
+
+
+def test_classify_needs_two_trained_labels_in_the_set(model):
+    assert classify("can we check in early", allowed={"parking", "other"}, threshold=0.1) is None
+
+
+def test_classify_without_a_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "INTENT_MODEL_PATH", str(tmp_path / "missing.json"))
+    assert classify("can we check in early") is None
@@ -0,0 +1,52 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from src import message_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(message_store, "_DB_PATH", str(tmp_path / "messages.db"))
+    return message_store
+
+
+def test_connections_are_closed(store, monkeypatch):
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(store.sqlite3, "connect", connect)
+    store._write_messages("c1", [{"id": 1, "insertedOn": "2026-01-01 10:00:00", "body": "hi"}])
+    assert [m["id"] for m in store._read_messages("c1", 10)] == [1]
+    assert store._read_watermark("c1") == "2026-01-01 10:00:00"
+
+    assert len(opened) == 3
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_failed_write_rolls_back(store):
+    with pytest.raises(RuntimeError):
+        with store._connect() as conn:
+            conn.execute("INSERT INTO sync_state (conversation_id, watermark) VALUES ('c1', 'x')")
+            raise RuntimeError("boom")
+    assert store._read_watermark("c1") is None
+
+
+def test_sync_locks_are_not_kept_per_conversation(store, monkeypatch):
+    async def page(conversation_id, limit, offset):
+        return [{"id": conversation_id, "insertedOn": "2026-01-01 10:00:00", "body": "hi"}] if offset == 0 else []
+
+    monkeypatch.setattr(store, "fetch_conversation_messages_page", page)
+
+    async def main():
+        await asyncio.gather(*(store.sync_conversation(i) for i in range(50)))
+
+    asyncio.run(main())
+    assert len(store._locks) == 0
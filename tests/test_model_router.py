@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from src import assistant_runs
+from src.model_router import CHEAP_MODEL, route
+from src.percentiles import percentile
+
+
+def test_blank_mood_routes_like_no_mood():
+    decision = route("reply", "Is there parking?", mood="   ")
+
+    assert decision.model == CHEAP_MODEL
+
+
+def test_percentile_uses_nearest_rank():
+    values = [5, 1, 4, 2, 3]
+
+    assert percentile(values, 0.0) == 1
+    assert percentile(values, 0.5) == 3
+    assert percentile(values, 1.0) == 5
+    assert percentile([], 0.95) == 0.0
+
+
+def test_reply_usage_is_priced_by_the_model_each_call_used():
+    usage = SimpleNamespace(prompt_tokens=1_000_000, completion_tokens=0, prompt_tokens_details=None)
+    assistant_runs._record_usage("bench", "chat", usage, "gpt-4o-mini")
+    assistant_runs._record_usage("bench", "chat", usage, "gpt-4o")
+
+    totals = assistant_runs.token_usage()["bench:chat"]
+    assert totals["calls"] == 2
+    assert totals["est_cost_usd"] == 0.15 + 2.50
@@ -0,0 +1,40 @@
+from ai.prompt_builder import Section, assemble_sections, build_full_prompt
+
+
+def _lines(label: str, n: int) -> str:
+    return "\n\n" + label.upper() + ":\n" + "\n".join(f"{label} line {i} with a few words" for i in range(n))
+
+
+def test_volatile_sections_are_cut_before_static_ones():
+    amenities = _lines("amenity", 20)
+    sections = [
+        Section("amenities", amenities, priority=4, static=True),
+        Section("thread", _lines("message", 40), priority=3, keep="tail"),
+        Section("guest_message", "\n\nGuest: hi\n", priority=0),
+    ]
+    text, report = assemble_sections(sections, budget=400)
+    rows = {r["section"]: r for r in report}
+
+    assert rows["amenities"]["action"] == "kept"
+    assert rows["thread"]["action"] == "compressed"
+    assert text.startswith(amenities)
+    assert sum(r["tokens"] for r in report) <= 400
+
+
+def test_static_sections_are_cut_once_volatile_ones_are_gone():
+    sections = [
+        Section("amenities", _lines("amenity", 40), priority=4, static=True),
+        Section("calendar", _lines("night", 3), priority=3),
+        Section("guest_message", "\n\nGuest: hi\n", priority=0),
+    ]
+    _, report = assemble_sections(sections, budget=200)
+    rows = {r["section"]: r for r in report}
+
+    assert rows["calendar"]["action"] == "dropped"
+    assert rows["amenities"]["action"] == "compressed"
+
+
+def test_full_prompt_accepts_a_response_with_no_result():
+    prompt = build_full_prompt("Hi", [], None, {"result": None}, None, None, None)
+
+    assert "Hi" in prompt["user"]
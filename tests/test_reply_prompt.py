@@ -0,0 +1,78 @@
+import asyncio
+
+from ai import prompt_builder
+from src import ai_assistant_enhanced as enhanced
+from src.request_context import GuestMessageContext
+
+
+def _ctx(messages):
+    return GuestMessageContext(
+        conversation_id="c1",
+        reservation_id="r1",
+        listing_id=5,
+        guest_message="Is there parking?",
+        reservation={"guestFirstName": "Ana", "arrivalDate": "2026-02-02", "departureDate": "2026-02-06"},
+        listing={"name": "Harbor Loft", "city": "Portland", "houseRules": "No parties."},
+        messages=messages,
+    )
+
+
+def test_reply_prompt_goes_through_the_section_budget(monkeypatch):
+    async def history(*_args, **_kwargs):
+        return "=== RECENT MESSAGES ===\n" + "\n".join(f"Guest: question number {i} about the stay" for i in range(400))
+
+    monkeypatch.setattr(enhanced, "build_compact_history", history)
+    monkeypatch.setattr(enhanced, "record_usage", lambda *args: None)
+    monkeypatch.setattr(enhanced, "CONTEXT_TOKEN_BUDGET", 600)
+    before = prompt_builder.prompt_section_stats()["prompts"]
+
+    prompt = asyncio.run(enhanced.build_reply_prompt(_ctx([])))
+
+    assert prompt.startswith("=== PROPERTY DETAILS ===")
+    assert "Guest: question number 399" in prompt
+    assert "Guest: question number 0 " not in prompt
+    assert prompt.rstrip().endswith("use actual details.")
+    stats = prompt_builder.prompt_section_stats()
+    assert stats["prompts"] == before + 1
+    assert stats["sections"]["history"]["compressed"] >= 1
+    assert stats["sections"]["listing"]["cut_tokens"] == 0
+
+
+def test_usage_baseline_is_estimated_without_rendering_the_old_layout(monkeypatch):
+    async def history(*_args, **_kwargs):
+        return "=== RECENT MESSAGES ===\nGuest: hi"
+
+    def render(*_args):
+        raise AssertionError("the old layout must not be rendered per reply")
+
+    recorded = []
+    monkeypatch.setattr(enhanced, "build_compact_history", history)
+    monkeypatch.setattr(enhanced, "format_conversation_history", render)
+    monkeypatch.setattr(enhanced, "record_usage", lambda *args: recorded.append(args))
+    messages = [{"id": i, "body": "x" * 400, "isIncoming": 1} for i in range(30)]
+
+    asyncio.run(enhanced.build_reply_prompt(_ctx(messages)))
+
+    (conversation_id, sent, legacy), = recorded
+    assert conversation_id == "c1"
+    assert 0 < sent < legacy
+    assert legacy > 30 * 100
+
+
+def test_listing_block_is_rebuilt_only_when_the_listing_is_updated(monkeypatch):
+    builds = []
+
+    def fmt(prop):
+        builds.append(prop["name"])
+        return "=== PROPERTY DETAILS ===\n" + prop["name"]
+
+    monkeypatch.setattr(enhanced, "_format_listing_context", fmt)
+    enhanced.listing_context_cache.clear()
+    listing = {"name": "Harbor Loft", "updatedOn": "2026-01-01 10:00:00"}
+
+    first = enhanced.build_listing_section(7, listing)
+    assert enhanced.build_listing_section(7, dict(listing)) is first
+    assert first.tokens > 0 and first.static
+    enhanced.build_listing_section(7, {**listing, "name": "Harbor Loft II", "updatedOn": "2026-01-02 08:00:00"})
+
+    assert builds == ["Harbor Loft", "Harbor Loft II"]
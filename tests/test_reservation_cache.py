@@ -0,0 +1,143 @@
+"""Reservation cache vs. reservation webhooks, against scripts/fake_hostaway.py."""
+import asyncio
+import base64
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from fake_hostaway import FakeHostaway
+from src import hostaway_http, message_handler
+from src.api_client import fetch_hostaway_reservation, reservation_cache
+
+RESERVATION_ID = 4242
+CREDENTIALS = ("hostaway", "webhook-secret")
+
+
+def _basic(login, password):
+    return "Basic " + base64.b64encode(f"{login}:{password}".encode()).decode()
+
+
+class Harness:
+    """The real webhook route wired to a fake Hostaway that emits reservation webhooks."""
+
+    def __init__(self, authorization=_basic(*CREDENTIALS)):
+        app = FastAPI()
+        app.include_router(message_handler.message_handler_bp, prefix="/webhook")
+        self.webhook_http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app")
+        self.authorization = authorization
+        self.statuses = []
+        self.fake = FakeHostaway(deliver=self.deliver, latency=0)
+        hostaway_http._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.fake.app), base_url="http://fake-hostaway"
+        )
+
+    async def deliver(self, payload):
+        headers = {"Authorization": self.authorization} if self.authorization else {}
+        resp = await self.webhook_http.post("/webhook/unified-webhook", json=payload, headers=headers)
+        self.statuses.append(resp.json().get("status"))
+
+    async def reservation(self, reservation_id=RESERVATION_ID):
+        return ((await fetch_hostaway_reservation(reservation_id)) or {}).get("result") or {}
+
+    async def close(self):
+        await self.webhook_http.aclose()
+        await hostaway_http.close_clients()
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    monkeypatch.setattr(message_handler, "HOSTAWAY_WEBHOOK_LOGIN", CREDENTIALS[0])
+    monkeypatch.setattr(message_handler, "HOSTAWAY_WEBHOOK_PASSWORD", CREDENTIALS[1])
+    monkeypatch.setattr(hostaway_http.token_manager, "static_token", "local-test")
+    reservation_cache.clear()
+    yield
+    reservation_cache.clear()
+
+
+def run(scenario, **harness_kwargs):
+    async def main():
+        harness = Harness(**harness_kwargs)
+        try:
+            return await scenario(harness)
+        finally:
+            await harness.close()
+
+    return asyncio.run(main())
+
+
+def test_webhooks_keep_the_cache_current_without_upstream_reads():
+    async def scenario(h):
+        await h.fake.create_reservation(RESERVATION_ID, listingMapId=7, numberOfGuests=2)
+        created = await h.reservation()
+        await h.fake.update_reservation(RESERVATION_ID, numberOfGuests=4)
+        updated = await h.reservation()
+        await h.fake.cancel_reservation(RESERVATION_ID)
+        cancelled = await h.reservation()
+        return created, updated, cancelled, h.fake.requests["reservation"]
+
+    created, updated, cancelled, upstream = run(scenario)
+    assert created["numberOfGuests"] == 2
+    assert updated["numberOfGuests"] == 4
+    assert cancelled["status"] == "cancelled"
+    assert upstream == 0
+
+
+def test_out_of_order_event_is_skipped():
+    async def scenario(h):
+        await h.fake.create_reservation(RESERVATION_ID, numberOfGuests=4)
+        old = {**h.fake.reservations[str(RESERVATION_ID)], "numberOfGuests": 1, "updatedOn": "2000-01-01 00:00:00"}
+        await h.deliver({"object": "reservation", "event": "reservation.updated", "data": old})
+        return h.statuses[-1], await h.reservation()
+
+    status, reservation = run(scenario)
+    assert status == "stale"
+    assert reservation["numberOfGuests"] == 4
+
+
+def test_missed_webhook_is_caught_by_the_ttl(monkeypatch):
+    async def scenario(h):
+        await h.fake.create_reservation(RESERVATION_ID, numberOfGuests=2)
+        h.fake.update_silently(RESERVATION_ID, numberOfGuests=6)
+        monkeypatch.setattr(reservation_cache, "ttl", 0)
+        monkeypatch.setattr(reservation_cache, "stale_ttl", 0)
+        return await h.reservation(), h.fake.requests["reservation"]
+
+    reservation, upstream = run(scenario)
+    assert reservation["numberOfGuests"] == 6
+    assert upstream == 1
+
+
+def test_concurrent_cold_reads_collapse_into_one_request():
+    async def scenario(h):
+        await h.fake.create_reservation(RESERVATION_ID, numberOfGuests=3)
+        reservation_cache.invalidate(str(RESERVATION_ID))
+        h.fake.latency = 0.01
+        await asyncio.gather(*[fetch_hostaway_reservation(RESERVATION_ID) for _ in range(10)])
+        return h.fake.requests["reservation"]
+
+    assert run(scenario) == 1
+
+
+@pytest.mark.parametrize("authorization", [None, _basic("hostaway", "guess"), "Bearer webhook-secret"])
+def test_forged_reservation_event_is_rejected(authorization):
+    async def scenario(h):
+        await h.fake.create_reservation(RESERVATION_ID, numberOfGuests=2)
+        return h.statuses, h.fake.requests["reservation"], await h.reservation()
+
+    statuses, upstream_before_read, reservation = run(scenario, authorization=authorization)
+    assert statuses == ["unauthorized"]
+    assert upstream_before_read == 0
+    assert reservation["numberOfGuests"] == 2  # read through from Hostaway, not from the event
+
+
+def test_reservation_events_are_ignored_without_configured_credentials(monkeypatch):
+    monkeypatch.setattr(message_handler, "HOSTAWAY_WEBHOOK_LOGIN", "")
+
+    async def scenario(h):
+        await h.fake.create_reservation(RESERVATION_ID, numberOfGuests=2)
+        return h.statuses, reservation_cache.stats()["size"]
+
+    statuses, size = run(scenario, authorization=None)
+    assert statuses == ["ignored"]
+    assert size == 0
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+
+from rule_planner import RULE_PLANNER_MIN_CONFIDENCE, rule_plan
+
+TODAY = date(2026, 2, 2)  # A Monday
+CORE = {"check_out": "2026-02-06"}
+
+# (message, expected plan fields, whether the rule plan is confident enough to skip the LLM planner)
+CASES = [
+    # Availability / booking with explicit dates
+    ("Is the house available March 10-14?",
+     {"wants_availability": True, "wants_price_quote": False, "dates": {"start": "2026-03-10", "end": "2026-03-14"}}, True),
+    ("is Dec 20 - 23 open?",
+     {"wants_availability": True, "dates": {"start": "2026-12-20", "end": "2026-12-23"}}, True),
+    ("Can we book next Friday through Sunday?",
+     {"wants_availability": True, "dates": {"start": "2026-02-06", "end": "2026-02-08"}}, True),
+    # Rates / price, nights from a start date, adults + children combined
+    ("How much for 3 nights from March 10?",
+     {"wants_price_quote": True, "dates": {"start": "2026-03-10", "end": "2026-03-13"}}, True),
+    ("What would it cost for 2 adults and 2 kids, June 5 to June 8?",
+     {"wants_price_quote": True, "guests": 4, "dates": {"start": "2026-06-05", "end": "2026-06-08"}}, True),
+    # Extensions start at the current check-out
+    ("Could we extend one more night?",
+     {"wants_availability": True, "dates": {"start": "2026-02-06", "end": "2026-02-07"}}, True),
+    # Distance with the raw destination text
+    ("How far is the beach from the house?",
+     {"wants_distance": True, "destinations": [{"text": "beach"}]}, True),
+    # Local recommendations
+    ("Any restaurants you recommend nearby?", {"wants_recommendations": True}, True),
+    # Info questions
+    ("How many bedrooms and bathrooms are there?", {"info_questions": ["bedrooms", "bathrooms"]}, True),
+    ("What time is checkout?", {"info_questions": ["check_out"]}, True),
+    ("Can we check in early on the 12th?",
+     {"info_questions": ["check_in"], "dates": {"start": "2026-02-12", "end": None}}, True),
+    ("We are a group of 6, is that ok?", {"guests": 6}, True),
+    # Keywords only match whole words: "rate" is not in "grateful"
+    ("We are so grateful! Arriving March 3 to March 5",
+     {"wants_price_quote": False, "wants_availability": False, "dates": {"start": "2026-03-03", "end": "2026-03-05"}}, False),
+    # "May" as the verb, not the month
+    ("May 2 of us check in early?",
+     {"guests": 2, "dates": {"start": None, "end": None}, "info_questions": ["check_in"]}, True),
+    ("We are 2 may we bring a dog?", {"guests": 2, "dates": {"start": None, "end": None}}, True),
+    ("what is the rate for May 2-5?",
+     {"wants_price_quote": True, "dates": {"start": "2026-05-02", "end": "2026-05-05"}}, True),
+    # "open"/"free" only mean availability next to dates
+    ("Do you have free parking?", {"wants_availability": False}, True),
+    # Dates with no recognised question, or several possible readings: defer to the LLM
+    ("We may arrive late tonight", {"dates": {"start": "2026-02-02", "end": None}}, False),
+    ("weekend of the 14th available?", {"wants_availability": True}, False),
+    ("How far is it?", {"wants_distance": True, "destinations": []}, False),
+]
+
+
+@pytest.mark.parametrize("message,expected,confident", CASES, ids=[c[0] for c in CASES])
+def test_rule_plan(message, expected, confident):
+    plan, confidence = rule_plan(message, CORE, today=TODAY)
+    assert {key: plan[key] for key in expected} == expected
+    assert (confidence >= RULE_PLANNER_MIN_CONFIDENCE) is confident, f"confidence {confidence}"
+
+
+def test_plan_has_planner_system_shape():
+    plan, _ = rule_plan("hi", CORE, today=TODAY)
+    assert set(plan) == {
+        "wants_availability", "wants_price_quote", "dates", "guests", "wants_distance",
+        "destinations", "wants_recommendations", "info_questions", "clarifications",
+    }
@@ -0,0 +1,56 @@
+import asyncio
+
+from src.ttl_cache import AsyncTTLCache
+
+
+def test_waiter_loads_itself_when_leader_is_cancelled():
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def loader(key):
+            calls.append(key)
+            await release.wait()
+            return {"key": key}
+
+        cache = AsyncTTLCache("test", loader, ttl=60, stale_ttl=60, max_size=10)
+        leader = asyncio.create_task(cache.get("k"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("k"))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        value = await asyncio.wait_for(waiter, timeout=1)
+
+        assert leader.cancelled()
+        assert value == {"key": "k"}
+        assert calls == ["k", "k"]
+        assert not cache._inflight
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_the_leader():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def loader(key):
+            await release.wait()
+            return {"key": key}
+
+        cache = AsyncTTLCache("test", loader, ttl=60, stale_ttl=60, max_size=10)
+        leader = asyncio.create_task(cache.get("k"))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("k"))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.wait_for(leader, timeout=1) == {"key": "k"}
+        assert waiter.cancelled()
+
+    asyncio.run(scenario())
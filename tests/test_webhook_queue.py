@@ -0,0 +1,21 @@
+import asyncio
+
+from src import webhook_queue
+
+
+def test_stop_workers_drains_in_flight_event():
+    done = []
+
+    async def handler(event):
+        await asyncio.sleep(0.05)
+        done.append(event["id"])
+
+    async def main():
+        webhook_queue.start_workers(handler, workers=1)
+        assert webhook_queue.enqueue({"id": 1})
+        await asyncio.sleep(0.01)  # the worker has dequeued it: the queue is empty
+        assert webhook_queue._queue.empty()
+        await webhook_queue.stop_workers(drain_timeout=1.0)
+
+    asyncio.run(main())
+    assert done == [1]